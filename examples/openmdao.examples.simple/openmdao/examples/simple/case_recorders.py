@@ -27,8 +27,9 @@ if __name__ == "__main__":
     # Run analysis
     #-----------------------------
     import os
-    if os.path.exists('doe.json'):
-        os.remove('doe.json')
+    for filename in ('doe.json', 'doe.json.idx'):
+        if os.path.exists(filename):
+            os.remove(filename)
 
     from openmdao.lib.casehandlers.api import CaseDataset
 
@@ -10,7 +10,11 @@ except ImportError:
     import logging
     logging.error('No sqlite3 support for DBCaseIterator or DBCaseRecorder')
 
+import os
+import threading
 import time
+import multiprocessing
+import Queue
 from cPickle import dumps, loads, HIGHEST_PROTOCOL, UnpicklingError
 from optparse import OptionParser
 
@@ -129,20 +133,39 @@ class DBCaseIterator(object):
 class DBCaseRecorder(object):
     """Records Cases to a relational DB (sqlite). Values other than floats,
     ints or strings are pickled and are opaque to SQL queries.
+
+    Cases are written `batch_size` at a time, each batch in a single
+    transaction. If `wal` is True a file DB uses write-ahead logging, which
+    lets readers work while cases are being recorded.
+
+    If `multiprocess` is True, :meth:`record` puts cases on a queue which is
+    emptied by a writer thread in the process that created the recorder,
+    so processes forked from it (concurrent workers for example) can share
+    the recorder safely. Cases recorded in a forked process are written by
+    that writer thread, so :meth:`flush` and :meth:`close` there don't wait
+    for it.
     """
 
     implements(ICaseRecorder)
 
-    def __init__(self, dbfile=':memory:', model_id='', append=False):
+    def __init__(self, dbfile=':memory:', model_id='', append=False,
+                 batch_size=1, wal=False, multiprocess=False):
+        self._multiprocess = multiprocess
         self.dbfile = dbfile  # this creates the connection
         self.model_id = model_id
+        self.batch_size = max(1, batch_size)
         self._cfg_map = {}
+        self._pending = []
 
         if append:
             exstr = 'if not exists'
         else:
             exstr = ''
 
+        if wal and dbfile != ':memory:':
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+
         self._connection.execute("""
         create table %s cases(
          id INTEGER PRIMARY KEY,
@@ -162,6 +185,20 @@ class DBCaseRecorder(object):
          value BLOB
          )""" % exstr)
 
+        _create_indexes(self._connection)
+
+        self._queue = None
+        self._writer = None
+        if multiprocess:
+            self._queue = multiprocessing.Queue()
+            self._flushed = threading.Event()
+            self._error = None
+            self._writer = threading.Thread(target=self._run_writer,
+                                            name='db-case-writer')
+            self._writer.daemon = True
+            self._writer.start()
+            self._writer_pid = os.getpid()
+
     @property
     def dbfile(self):
         """The name of the database. This can be a filename or :memory: for
@@ -173,7 +210,10 @@ class DBCaseRecorder(object):
     def dbfile(self, value):
         """Set the DB file and connect to it."""
         self._dbfile = value
-        self._connection = sqlite3.connect(value)
+        # With a writer thread the connection is used from two threads,
+        # but never at the same time.
+        self._connection = sqlite3.connect(value,
+                               check_same_thread=not self._multiprocess)
         self._iter_conn = sqlite3.connect(value)
 
     def startup(self):
@@ -193,51 +233,109 @@ class DBCaseRecorder(object):
         if self._connection is None:
             raise RuntimeError('Attempt to record on closed recorder')
 
-        cur = self._connection.cursor()
-
         msg = '' if exc is None else str(exc)
-        cur.execute("""insert into cases(id,uuid,parent,msg,model_id,timeEnter)
-                           values (?,?,?,?,?,DATETIME('NOW'))""",
-                    (None, case_uuid, parent_uuid, msg, self.model_id))
-
-        case_id = cur.lastrowid
-        # insert the inputs and outputs into the vars table.  Pickle them if
-        # they're not one of the built-in types int, float, or str.
-
-        v = (None, 'timestamp', case_id, None, time.time())
-        cur.execute("insert into casevars(var_id,name,case_id,sense,value) values(?,?,?,?,?)",
-                    v)
+        case = (case_uuid, parent_uuid, msg, self.model_id)
 
+        # Pickle the inputs and outputs if they're not one of the built-in
+        # types int, float, or str.
+        var_rows = [('timestamp', None, time.time(), False)]
         in_names, out_names = self._cfg_map[driver]
+        for sense, names, values in (('i', in_names, inputs),
+                                     ('o', out_names, outputs)):
+            for name, value in zip(names, values):
+                if isinstance(value, (float, int, str)):
+                    var_rows.append((name, sense, value, False))
+                else:
+                    if isinstance(value, TraitDictObject):
+                        value = dict(value)
+                    elif isinstance(value, TraitListObject):
+                        value = list(value)
+                    var_rows.append((name, sense,
+                                     dumps(value, HIGHEST_PROTOCOL), True))
+
+        if self._queue is not None:
+            self._queue.put((case, var_rows))
+        else:
+            self._pending.append((case, var_rows))
+            if len(self._pending) >= self.batch_size:
+                self._write(self._pending)
+                self._pending = []
 
-        for name, value in zip(in_names, inputs):
-            if isinstance(value, (float, int, str)):
-                v = (None, name, case_id, 'i', value)
-            else:
-                if isinstance(value, TraitDictObject):
-                    value = dict(value)
-                elif isinstance(value, TraitListObject):
-                    value = list(value)
-                v = (None, name, case_id, 'i',
-                     sqlite3.Binary(dumps(value, HIGHEST_PROTOCOL)))
-            cur.execute("insert into casevars(var_id,name,case_id,sense,value) values(?,?,?,?,?)",
-                        v)
-        for name, value in zip(out_names, outputs):
-            if isinstance(value, (float, int, str)):
-                v = (None, name, case_id, 'o', value)
-            else:
-                if isinstance(value, TraitDictObject):
-                    value = dict(value)
-                elif isinstance(value, TraitListObject):
-                    value = list(value)
-                v = (None, name, case_id, 'o',
-                     sqlite3.Binary(dumps(value, HIGHEST_PROTOCOL)))
-            cur.execute("insert into casevars(var_id,name,case_id,sense,value) values(?,?,?,?,?)",
-                        v)
+    def _write(self, cases):
+        """Insert `cases` in a single transaction."""
+        cur = self._connection.cursor()
+        rows = []
+        for case, var_rows in cases:
+            cur.execute("""insert into cases(id,uuid,parent,msg,model_id,timeEnter)
+                               values (?,?,?,?,?,DATETIME('NOW'))""",
+                        (None,)+case)
+            case_id = cur.lastrowid
+            for name, sense, value, pickled in var_rows:
+                if pickled:
+                    value = sqlite3.Binary(value)
+                rows.append((None, name, case_id, sense, value))
+        cur.executemany("insert into casevars(var_id,name,case_id,sense,value) values(?,?,?,?,?)",
+                        rows)
         self._connection.commit()
 
+    def _run_writer(self):
+        """Writer thread, records queued cases until it gets None."""
+        while True:
+            items = [self._queue.get()]
+            while isinstance(items[-1], tuple) and \
+                  len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except Queue.Empty:
+                    break
+
+            cases = [item for item in items if isinstance(item, tuple)]
+            if cases and self._error is None:
+                try:
+                    self._write(cases)
+                except Exception as exc:
+                    self._error = exc
+
+            if items[-1] == 'flush':
+                self._flushed.set()
+            elif items[-1] is None:
+                return
+
+    def _owns_writer(self):
+        """Return True if the writer thread runs in this process."""
+        return self._writer is not None and os.getpid() == self._writer_pid
+
+    def _stop_writer(self):
+        """Stop the writer thread once it has written all queued cases.
+        Later cases are written directly."""
+        self._queue.put(None)
+        self._writer.join()
+        self._writer = None
+        self._queue = None
+
+    def flush(self):
+        """Write any cases not yet in the DB."""
+        if self._queue is not None and self._owns_writer():
+            self._flushed.clear()
+            self._queue.put('flush')
+            self._flushed.wait()
+            if self._error is not None:
+                exc, self._error = self._error, None
+                raise RuntimeError('Case recording failed: %s' % exc)
+        elif self._pending:
+            self._write(self._pending)
+            self._pending = []
+
     def close(self):
         """Commit and close DB connection if not using ``:memory:``."""
+        if self._connection is not None:
+            self.flush()
+        if self._writer is not None:
+            if not self._owns_writer():
+                # The connection and writer belong to the parent process.
+                self._connection = None
+                return
+            self._stop_writer()
         if self._connection is not None and self._dbfile != ':memory:':
             self._connection.commit()
             self._connection.close()
@@ -245,9 +343,20 @@ class DBCaseRecorder(object):
 
     def get_iterator(self):
         """Return a DBCaseIterator that points to our current DB."""
+        if self._connection is not None:
+            self.flush()
         return DBCaseIterator(dbfile=self._dbfile, connection=self._connection)
 
 
+def _create_indexes(connection):
+    """Create the indexes used to look up case variables."""
+    connection.execute("create index if not exists casevars_case_name"
+                       " on casevars(case_id, name)")
+    connection.execute("create index if not exists casevars_name"
+                       " on casevars(name)")
+    connection.commit()
+
+
 """
 Utility functions related to plotting data
 """
@@ -295,6 +404,10 @@ def case_db_to_dict(dbname, varnames, case_sql='', var_sql='', include_errors=Fa
 
     """
     connection = sqlite3.connect(dbname)
+    try:
+        _create_indexes(connection)
+    except sqlite3.OperationalError:
+        pass  # Read-only DB, do without.
     vardict = dict([(name, []) for name in varnames])
 
     sql = ["SELECT id FROM cases"]
@@ -306,47 +419,44 @@ def case_db_to_dict(dbname, varnames, case_sql='', var_sql='', include_errors=Fa
 
     if qlist:
         sql.append("WHERE %s" % ' AND '.join(qlist))
+    case_query = ' '.join(sql)
 
-    casecur = connection.cursor()
-    casecur.execute(' '.join(sql))
-
-    sql = ["SELECT name, value from casevars WHERE case_id=%s"]
-    vars_added = False
-    for i, name in enumerate(vardict.keys()):
-        if i == 0:
-            sql.append("AND (")
-        else:
-            sql.append("OR")
-        sql.append("name='%s'" % name)
-        vars_added = True
-    if vars_added:
-        sql.append(")")
-
+    # Fetch all the variables in one pass, grouped by case.
+    sql = ["SELECT case_id, name, value from casevars WHERE case_id IN (%s)"
+           % case_query]
+    if vardict:
+        sql.append("AND name IN (%s)" % ','.join('?' * len(vardict)))
     if var_sql:
         sql.append(" AND %s" % var_sql)
-    combined = ' '.join(sql)
+    sql.append("ORDER BY case_id, var_id")
 
     varcur = connection.cursor()
+    varcur.execute(' '.join(sql), vardict.keys())
 
-    for case_id in casecur:
-        casedict = {}
-        varcur.execute(combined % case_id)
-        for vname, value in varcur:
-            if not isinstance(value, (float, int, str)):
-                try:
-                    value = loads(str(value))
-                except UnpicklingError as err:
-                    raise UnpicklingError("can't unpickle value '%s' from"
-                                          " database: %s" % (vname, str(err)))
-            casedict[vname] = value
-
+    def add_case(casedict):
         if len(casedict) != len(vardict):
-            continue   # case doesn't contain a complete set of specified vars,
-                       # so skip it to avoid data mismatches
+            return   # case doesn't contain a complete set of specified vars,
+                     # so skip it to avoid data mismatches
 
         for name, value in casedict.items():
             vardict[name].append(value)
 
+    casedict = {}
+    current = None
+    for case_id, vname, value in varcur:
+        if case_id != current:
+            add_case(casedict)
+            casedict = {}
+            current = case_id
+        if not isinstance(value, (float, int, str)):
+            try:
+                value = loads(str(value))
+            except UnpicklingError as err:
+                raise UnpicklingError("can't unpickle value '%s' from"
+                                      " database: %s" % (vname, str(err)))
+        casedict[vname] = value
+    add_case(casedict)
+
     return vardict
 
 
@@ -5,6 +5,7 @@ HDF5 Case Recording.
 import sys
 import os
 import time
+from copy import deepcopy
 from uuid import uuid1
 import numpy as np
 
@@ -130,22 +131,194 @@ def write_groups_to_hdf5( group, name, value ):
         dset = group.create_dataset(name, (), dtype=np.bool)
 
 
+metadata_names = ['_driver_id', '_driver_name', '_id', '_parent_id',
+                  '_itername', 'error_message', 'error_status', 'timestamp']
+
+metadata_dtype = np.dtype([
+    ('_driver_id', 'i8'),
+    ('_driver_name', np.str_, 40),
+    ('_id', np.str_, 40),
+    ('_parent_id', np.str_, 40),
+    ('_itername', np.str_, 40),
+    ('error_message', np.str_, 40),
+    ('error_status', 'i8'),
+    ('timestamp', 'f8')])
+
+
+def column_dtype(value, max_string_len):
+    """ Return ``(dtype, shape)`` of the column holding `value`, or None if
+    `value` can't be stored in a fixed size column."""
+    if isinstance(value, (bool, int, long)):
+        return np.dtype(np.int64), ()
+    elif isinstance(value, (np.float64, float)):
+        return np.dtype(np.float64), ()
+    elif isinstance(value, basestring):
+        return np.dtype((np.str_, max_string_len)), ()
+    elif value is None:
+        return None
 
-
+    try:
+        value = np.asarray(value)
+    except Exception:
+        return None
+    if value.dtype.kind in 'SU':
+        return np.dtype((np.str_, max_string_len)), value.shape
+    elif value.dtype.kind in 'biuf' and value.size > 0:
+        return value.dtype, value.shape
+    return None
+
+
+def snapshot(value):
+    """ Return a copy of `value` that won't change while it's buffered. """
+    if isinstance(value, (VariableTree, np.ndarray)):
+        return value.copy()
+    elif isinstance(value, (dict, list)):
+        return deepcopy(value)
+    return value
+
+
+def update_column(group, name, values, nrows, chunk_rows, compression,
+                  max_string_len):
+    """ Make sure `group` has a column for `name` that can hold the buffered
+    `values`. A new column (a dataset, or a group of them for a dict or a
+    :class:`VariableTree`) is created with `nrows` rows of fill values for
+    the cases already written, and an array column is grown when a value
+    with a larger shape comes along."""
+    value = None
+    for value in values:
+        if value is not None:
+            break
+    if value is None:
+        return  # Nothing to store yet.
+
+    if isinstance(value, (dict, VariableTree)):
+        if name in group:
+            column_grp = group[name]
+            if hasattr(column_grp, 'resize'):
+                return  # Column already holds non-dict values.
+        else:
+            column_grp = group.create_group(name)
+            if isinstance(value, VariableTree):
+                column_grp.attrs['__vartree__'] = True
+        keys = set()
+        for value in values:
+            if isinstance(value, VariableTree):
+                keys.update(value.list_vars())
+            elif isinstance(value, dict):
+                keys.update(value.keys())
+        for k in sorted(keys):
+            update_column(column_grp, k,
+                          [v.get(k) if isinstance(v, (dict, VariableTree))
+                           else None for v in values],
+                          nrows, chunk_rows, compression, max_string_len)
+        return
+
+    specs = [column_dtype(v, max_string_len) for v in values if v is not None]
+    specs = [spec for spec in specs if spec is not None]
+    if not specs:
+        return  # Not representable as a column, skip it.
+
+    column = group.get(name)
+    if column is None:
+        dtype, shape = specs[0]
+        ndim = len(shape)
+    elif hasattr(column, 'resize'):
+        dtype, shape = column.dtype, column.shape[1:]
+        ndim = len(shape)
+    else:
+        return  # Column holds dict values.
+
+    # Trailing dimensions grow to fit the largest value seen.
+    for spec_dtype, spec_shape in specs:
+        if len(spec_shape) == ndim:
+            shape = tuple(max(n, m) for n, m in zip(shape, spec_shape))
+
+    if column is None:
+        kwargs = {}
+        if dtype.kind == 'f':
+            kwargs['fillvalue'] = np.nan
+        if compression and group.file.driver != 'mpio': # cannot do compression when writing in parallel
+            kwargs['compression'] = compression
+        group.create_dataset(name, (nrows,)+shape, dtype=dtype,
+                             maxshape=(None,)*(ndim+1),
+                             chunks=(chunk_rows,)+shape, **kwargs)
+    elif shape != column.shape[1:]:
+        column.resize((column.shape[0],)+shape)
+
+
+def resize_column(column, nrows):
+    """ Grow `column` (a dataset or a group of them) to `nrows` rows. """
+    if hasattr(column, 'resize'):
+        column.resize(nrows, axis=0)
+    else:
+        for member in column.values():
+            resize_column(member, nrows)
+
+
+def write_column(column, start, values):
+    """ Write the buffered `values` into `column` beginning at row `start`.
+    Missing values, and the part of a column row not covered by a smaller
+    array, are left as fill values."""
+    if not hasattr(column, 'resize'):
+        for k, member in column.items():
+            write_column(member, start,
+                         [v.get(k) if isinstance(v, (dict, VariableTree))
+                          else None for v in values])
+        return
+
+    shape = column.shape[1:]
+    block = None
+    if all(v is not None for v in values):
+        try:
+            block = np.array(values, dtype=column.dtype)
+        except ValueError:
+            pass
+        else:
+            if block.shape[1:] != shape:
+                block = None
+
+    if block is None:
+        block = np.empty((len(values),)+shape, dtype=column.dtype)
+        block[...] = column.fillvalue
+        for i, v in enumerate(values):
+            if v is None:
+                continue
+            v = np.asarray(v)
+            if v.ndim != len(shape):
+                continue  # Can't be stored in this column.
+            block[(i,)+tuple(slice(0, n) for n in v.shape)] = v
+    column[start:start+len(values)] = block
+
+
+def read_column(column):
+    """ Return the contents of `column` as an array, or for a group as a list
+    of per-row dictionaries."""
+    if hasattr(column, 'resize'):
+        return column[...]
+
+    members = dict((k, read_column(v)) for k, v in column.items())
+    nrows = len(members.values()[0]) if members else 0
+    return [dict((k, v[i]) for k, v in members.items())
+            for i in range(nrows)]
 
 
 class HDF5CaseRecorder(object):
     """
-    Dumps a run in HDF5 form to `out`, which may be a string or a file-like
-    object (defaults to ``stdout``). If `out` is ``stdout`` or ``stderr``,
-    then that standard stream is used. Otherwise, if `out` is a string, then
-    a file with that name will be opened in the current directory.
-    If `out` is None, cases will be ignored.
+    Dumps a run in HDF5 form to `filename`. Each driver's cases go into a
+    separate file, linked from `filename`, with one resizable, chunked
+    dataset per recorded variable and a ``metadata`` table holding one
+    row per case.
+
+    Cases are buffered in memory and appended to the datasets
+    `buffer_size` at a time, which is also the chunk length along the
+    case axis. `compression` is the HDF5 filter applied to the datasets
+    (None for no compression; ignored when writing in parallel).
     """
 
     implements(ICaseRecorder)
 
-    def __init__(self, filename='model.hdf5', indent=4, sort_keys=True, max_string_len=50 ): # TODO need an option for the size of the strings
+    def __init__(self, filename='model.hdf5', indent=4, sort_keys=True, max_string_len=50,
+                 buffer_size=100, compression='gzip'): # TODO need an option for the size of the strings
 
         import h5py  # do it here to avoid warning from autodoc in Sphinx
 
@@ -154,6 +327,11 @@ class HDF5CaseRecorder(object):
         self._cases = None
 
         self.max_string_len = max_string_len
+        self.buffer_size = max(1, buffer_size)
+        self.compression = compression
+
+        self._buffers = {} # keyed by driver, list of (metadata, data)
+        self._rows_written = {} # keyed by driver
 
         # not used yet but for getting values of variables
         #     from subcases
@@ -290,114 +468,79 @@ class HDF5CaseRecorder(object):
     def record(self, driver, inputs, outputs, exc, case_uuid, parent_uuid):
         """ Dump the given run data. """
 
-        hdf5_file_object = self.hdf5_case_record_file_objects[driver]
-
         info = self.get_case_info(driver, inputs, outputs, exc,
                                   case_uuid, parent_uuid)
 
         self._cases += 1
-        iteration_case_name = 'iteration_case_%s' % self._cases
-
-        int_names = []
-        float_names = []
-        str_names = []
-
-        # create dataset for the record metadata: _driver_id, _id, _parent_id, error_message, error_status, timestamp
-        # From Python and HDF5 Book on Safari Online
-        if not "/metadatatype" in hdf5_file_object: # TODO use actual string lengths
-            hdf5_file_object['metadatatype'] =  np.dtype([
-                ('_driver_id', 'i8'),
-                ('_driver_name', np.str_, 40),
-                ('_id', np.str_, 40),
-                ('_parent_id', np.str_, 40),
-                ('_itername', np.str_, 40),
-                ('error_message', np.str_, 40),
-                ('error_status', 'i8'),
-                ('timestamp', 'f8')]
-                )
-
         self._count += 1
-        iteration_case_group = create_group(hdf5_file_object, iteration_case_name)
-        iteration_case_group = hdf5_file_object.create_group(iteration_case_name)
-        metadata_dset = create_dataset(iteration_case_group, "metadata",(1,), dtype=hdf5_file_object['metadatatype'])
-        metadata_dset = iteration_case_group.create_dataset("metadata",(1,), dtype=hdf5_file_object['metadatatype'])
-        data_grp = create_group( iteration_case_group, 'data' )
-        data_grp = iteration_case_group.create_group( 'data' )
-        for k,v in info.items():
-            if k != 'data': # record metadata # TODO get rid of this clause
-                # write_groups_to_hdf5( iteration_case_group, k, v )
-                pass
-            else:
-                max_str_len = 0
-                for name,value in v.items():
-                    if isinstance(value,int):
-                        int_names.append(name)
-                    elif isinstance(value,( np.float64, float )):
-                        float_names.append(name)
-                    elif isinstance(value, str):
-                        str_names.append(name)
-                        max_str_len = max( max_str_len, len(value))
-                    else:
-                        write_groups_to_hdf5(data_grp, name, value )
-
-        # only add this info once per record file
-        if not "/float_names" in hdf5_file_object:
-            create_dataset(hdf5_file_object, 'float_names', data=np.array( float_names ) )
-            hdf5_file_object.create_dataset('float_names', data=np.array( float_names ) )
-        if not "/int_names" in hdf5_file_object: # only add this info once per record file
-            create_dataset(hdf5_file_object, 'int_names', data=np.array( int_names ) )
-            hdf5_file_object.create_dataset('int_names', data=np.array( int_names ) )
-        if not "/str_names" in hdf5_file_object: # only add this info once per record file
-            create_dataset(hdf5_file_object, 'str_names', data=np.array( str_names ) )
-            hdf5_file_object.create_dataset('str_names', data=np.array( str_names ) )
-
-        # Create the datasets for the int and float and string arrays
-        int_arrays_dset = create_dataset(data_grp, 'array_of_ints', (len(int_names),),dtype=np.int64)
-        int_arrays_dset = data_grp.create_dataset('array_of_ints', (len(int_names),),dtype=np.int64)
-        float_arrays_dset = create_dataset(data_grp, 'array_of_floats', (len(float_names),),dtype=np.float64)
-        float_arrays_dset = data_grp.create_dataset('array_of_floats', (len(float_names),),dtype=np.float64)
-        #str_arrays_dset = data_grp.create_dataset('array_of_strs', (len(str_names),),str_dtype )
-        str_arrays_dset = create_dataset(data_grp, 'array_of_strs', (len(str_names),),str_dtype )
-        str_arrays_dset = data_grp.create_dataset('array_of_strs', (len(str_names),),str_dtype )
-
-        scope = driver.parent
-        prefix = scope.get_pathname()
-
-        ##### Write the datasets using only the data available to this process ######
-        data_grp = iteration_case_group['data']
 
-        dp( 'determine metadata' )
         metadata = []
-        for name in [ '_driver_id', '_driver_name', '_id', '_parent_id', '_itername', 'error_message', 'error_status', 'timestamp'] :
+        for name in metadata_names:
             value = info[ name ]
             if name == 'error_status' and value == None :
                 from sys import maxint
                 value = maxint
             metadata.append( value )
 
-        dp('set metadata_dset' )
-        metadata_dset[()] = np.array([ tuple(metadata), ], dtype = hdf5_file_object['metadatatype'])
+        buf = self._buffers.setdefault(driver, [])
+        data = dict((name, snapshot(value))
+                    for name, value in info['data'].items())
+        buf.append((tuple(metadata), data))
+        if len(buf) >= self.buffer_size:
+            self._flush(driver)
 
-        dp('set values in data')
-        for name, value in info[ 'data' ].items():
+    def _flush(self, driver):
+        """ Append the buffered cases of `driver` to its record file. """
 
-            print_var = self.is_variable_local( driver, prefix, name )
+        buf = self._buffers.get(driver)
+        if not buf:
+            return
+        self._buffers[driver] = []
 
-            if print_var:
-                if isinstance(value,int):
-                    idx = int_names.index(name) # where in the index is this value?
-                    int_arrays_dset[idx] = value
-                elif isinstance(value,(np.float64,float)):
-                    idx = float_names.index(name) # where in the index is this value?
-                    float_arrays_dset[idx] = value
-                elif isinstance(value,str):
-                    idx = str_names.index(name) # where in the index is this value?
-                    str_arrays_dset[idx] = value
-                else:
-                    write_to_hdf5( data_grp, name, value )
+        hdf5_file_object = self.hdf5_case_record_file_objects[driver]
+        start = self._rows_written.get(driver, 0)
+        nrows = start + len(buf)
+
+        if "/metadata" not in hdf5_file_object:
+            hdf5_file_object['metadatatype'] = metadata_dtype
+            hdf5_file_object.create_dataset('metadata', (0,),
+                                            dtype=metadata_dtype,
+                                            maxshape=(None,),
+                                            chunks=(self.buffer_size,))
+            hdf5_file_object.create_group('data')
+
+        # Columns are added for variables with no value to store until now,
+        # and grown for arrays that got bigger.
+        data_grp = hdf5_file_object['data']
+        names = set()
+        for metadata, data in buf:
+            names.update(data.keys())
+        for name in sorted(names):
+            update_column(data_grp, name, [data.get(name) for metadata, data in buf],
+                          start, self.buffer_size, self.compression,
+                          self.max_string_len)
+
+        metadata_dset = hdf5_file_object['metadata']
+        metadata_dset.resize(nrows, axis=0)
+        metadata_dset[start:nrows] = np.array([metadata for metadata, data in buf],
+                                              dtype=metadata_dtype)
+
+        scope = driver.parent
+        prefix = scope.get_pathname()
+
+        # Resizing is collective, but each process only writes the
+        # variables that are available locally.
+        for name, column in data_grp.items():
+            resize_column(column, nrows)
+            if self.is_variable_local( driver, prefix, name ):
+                write_column(column, start, [data.get(name) for metadata, data in buf])
 
-        dp('exit record')
+        self._rows_written[driver] = nrows
 
+    def flush(self):
+        """ Write all buffered cases to their record files. """
+        for driver in self._buffers:
+            self._flush(driver)
 
     def close(self):
         """
@@ -407,6 +550,7 @@ class HDF5CaseRecorder(object):
 
         import h5py  # do it here to avoid warning from autodoc in Sphinx
 
+        self.flush()
         for hdf5_case_record_file in self.hdf5_case_record_file_objects.values() :
             hdf5_case_record_file.close()
 
@@ -6,9 +6,11 @@ import cStringIO
 import StringIO
 import logging
 import sys
+import threading
 import time
 import os
 import inspect
+import Queue
 
 
 import json
@@ -43,6 +45,48 @@ class _BaseRecorder(object):
 		#     from subcases
         self._last_child_case_uuids = {} # keyed by driver id
 
+        self._filename = None
+        self._offset = 0
+        self._index = []
+        self._writer = None
+
+    def _start_writer(self, out, buffer_size, buffer_time, background):
+        """ Set up the writer that buffers output to `out`. """
+        self._writer = _BufferedWriter(out, buffer_size, buffer_time,
+                                       background)
+
+    def _close_writer(self):
+        """ Write any buffered cases and stop the writer. """
+        if self._writer is not None:
+            writer, self._writer = self._writer, None
+            writer.close()
+
+    def _start_index(self, out):
+        """ Prepare to index the cases written to `out`. """
+        self._index = []
+        self._filename = None
+        try:
+            self._offset = out.tell()
+        except (AttributeError, IOError):
+            self._offset = 0
+        else:
+            # Offsets are counted in bytes written, which only match the
+            # file positions if no newline translation is done.
+            name = getattr(out, 'name', None)
+            if isinstance(out, file) and 'b' in out.mode and \
+               isinstance(name, basestring) and os.path.isfile(name):
+                self._filename = name
+
+    def _add_to_index(self, info):
+        """ Record the offset of the case about to be written. """
+        self._index.append((self._offset, info['_id'], info['_driver_id'],
+                            info['_parent_id']))
+
+    def _save_index(self):
+        """ Write the case index file, if `out` was a regular file. """
+        if self._filename and self._uuid is not None:
+            _CaseIndex(self._index).save(self._filename, self._uuid)
+
     def startup(self):
         """ Prepare for new run. """
         pass
@@ -210,9 +254,15 @@ class JSONCaseRecorder(_BaseRecorder):
     then that standard stream is used. Otherwise, if `out` is a string, then
     a file with that name will be opened in the current directory.
     If `out` is None, cases will be ignored.
+
+    Cases are written and `out` flushed every `buffer_size` cases, or
+    sooner if `buffer_time` seconds have passed when a case is recorded.
+    If `background` is True, the writing is done by a separate thread.
+    Buffered cases are always written by :meth:`close`.
     """
 
-    def __init__(self, out='cases.json', indent=4, sort_keys=True):
+    def __init__(self, out='cases.json', indent=4, sort_keys=True,
+                 buffer_size=1, buffer_time=None, background=False):
         super(JSONCaseRecorder, self).__init__()
         if isinstance(out, basestring):
             if out == 'stdout':
@@ -220,11 +270,19 @@ class JSONCaseRecorder(_BaseRecorder):
             elif out == 'stderr':
                 out = sys.stderr
             else:
-                out = open(out, 'w')
+                out = open(out, 'wb')
         self.out = out
         self.indent = indent
         self.sort_keys = sort_keys
         self._count = 0
+        if out is not None:
+            self._start_index(out)
+            self._start_writer(out, buffer_size, buffer_time, background)
+
+    def _write(self, data):
+        """ Write `data` to `out`, tracking the file offset. """
+        self._writer.write(data)
+        self._offset += len(data)
 
     def record_constants(self, constants):
         """ Record constant data. """
@@ -236,21 +294,21 @@ class JSONCaseRecorder(_BaseRecorder):
         data = self._dump(info, category,
                           ('variable_metadata', 'expressions', 'constants'))
         self._count += 1
-        self.out.write('{\n"__length_%s": %s\n, "%s": '
-                       % (self._count, len(data), category))
-        self.out.write(data)
-        self.out.write('\n')
+        self._write('{\n"__length_%s": %s\n, "%s": '
+                    % (self._count, len(data), category))
+        self._write(data)
+        self._write('\n')
 
         for i, info in enumerate(self.get_driver_info()):
             category = 'driver_info_%s' % (i+1)
             data = self._dump(info, category)
             self._count += 1
-            self.out.write(', "__length_%s": %s\n, "%s": '
-                           % (self._count, len(data), category))
-            self.out.write(data)
-            self.out.write('\n')
+            self._write(', "__length_%s": %s\n, "%s": '
+                        % (self._count, len(data), category))
+            self._write(data)
+            self._write('\n')
 
-        self.out.flush()
+        self._writer.flush()
 
     def record(self, driver, inputs, outputs, exc, case_uuid, parent_uuid):
         """ Dump the given run data. """
@@ -263,11 +321,12 @@ class JSONCaseRecorder(_BaseRecorder):
         category = 'iteration_case_%s' % self._cases
         data = self._dump(info, category, ('data',))
         self._count += 1
-        self.out.write(', "__length_%s": %s\n, "%s": '
-                       % (self._count, len(data), category))
-        self.out.write(data)
-        self.out.write('\n')
-        self.out.flush()
+        self._add_to_index(info)
+        self._write(', "__length_%s": %s\n, "%s": '
+                    % (self._count, len(data), category))
+        self._write(data)
+        self._write('\n')
+        self._writer.end_case()
 
     def _dump(self, info, category, subcategories=None):
         """ Return JSON data, report any bad keys & values encountered. """
@@ -316,17 +375,21 @@ class JSONCaseRecorder(_BaseRecorder):
         Closes `out` unless it's ``sys.stdout`` or ``sys.stderr``.
         Note that a closed recorder will do nothing in :meth:`record`.
         """
-        if self.out is not None and self._cases is not None:
-            self.out.write('}\n')
-
-        if self.out not in (None, sys.stdout, sys.stderr):
-            if not isinstance(self.out,
-                              (StringIO.StringIO, cStringIO.OutputType)):
-                # Closing a StringIO deletes its contents.
-                self.out.close()
-            self.out = None
-
-        self._cases = None
+        try:
+            if self.out is not None and self._cases is not None:
+                self._writer.write('}\n')
+            self._close_writer()
+        finally:
+            if self.out not in (None, sys.stdout, sys.stderr):
+                if not isinstance(self.out,
+                                  (StringIO.StringIO, cStringIO.OutputType)):
+                    # Closing a StringIO deletes its contents.
+                    self.out.close()
+                    if self._cases is not None:
+                        self._save_index()
+                self.out = None
+
+            self._cases = None
 
     def get_iterator(self):
         """ Just returns None. """
@@ -401,31 +464,37 @@ class BSONCaseRecorder(_BaseRecorder):
 
                 data = inp.read(4)
 
+    `buffer_size`, `buffer_time` and `background` control buffering as for
+    :class:`JSONCaseRecorder`.
     """
 
-    def __init__(self, out='cases.bson'):
+    def __init__(self, out='cases.bson', buffer_size=1, buffer_time=None,
+                 background=False):
         super(BSONCaseRecorder, self).__init__()
         if isinstance(out, basestring):
-            out = open(out, 'w')
+            out = open(out, 'wb')
         self.out = out
+        if out is not None:
+            self._start_index(out)
+            self._start_writer(out, buffer_size, buffer_time, background)
+
+    def _write(self, data):
+        """ Write length-prefixed `data` to `out`, tracking the file offset. """
+        self._writer.write(pack('<L', len(data)))
+        self._writer.write(data)
+        self._offset += 4 + len(data)
 
     def record_constants(self, constants):
         """ Record constant data. """
         if not self.out:
             return
 
-        data = self._dump(self.get_simulation_info(constants))
-        reclen = pack('<L', len(data))
-        self.out.write(reclen)
-        self.out.write(data)
+        self._write(self._dump(self.get_simulation_info(constants)))
 
         for info in self.get_driver_info():
-            data = self._dump(info)
-            reclen = pack('<L', len(data))
-            self.out.write(reclen)
-            self.out.write(data)
+            self._write(self._dump(info))
 
-        self.out.flush()
+        self._writer.flush()
 
     def record(self, driver, inputs, outputs, exc, case_uuid, parent_uuid):
         """ Dump the given run data in a "pretty" form. """
@@ -434,11 +503,9 @@ class BSONCaseRecorder(_BaseRecorder):
 
         info = self.get_case_info(driver, inputs, outputs, exc,
                                   case_uuid, parent_uuid)
-        data = self._dump(info)
-        reclen = pack('<L', len(data))
-        self.out.write(reclen)
-        self.out.write(data)
-        self.out.flush()
+        self._add_to_index(info)
+        self._write(self._dump(info))
+        self._writer.end_case()
 
     def _dump(self, info):
         """ Return BSON data, report any bad keys & values encountered. """
@@ -449,19 +516,184 @@ class BSONCaseRecorder(_BaseRecorder):
         Closes `out`. Note that a closed recorder will do nothing in
         :meth:`record`.
         """
-        if self.out is not None:
-            if not isinstance(self.out,
-                              (StringIO.StringIO, cStringIO.OutputType)):
-                # Closing a StringIO deletes its contents.
-                self.out.close()
-            self.out = None
-
-        self._cases = None
+        try:
+            self._close_writer()
+        finally:
+            if self.out is not None:
+                if not isinstance(self.out,
+                                  (StringIO.StringIO, cStringIO.OutputType)):
+                    # Closing a StringIO deletes its contents.
+                    self.out.close()
+                    if self._cases is not None:
+                        self._save_index()
+                self.out = None
+
+            self._cases = None
 
     def get_iterator(self):
         """ Just returns None. """
         return None
 
+
+class _BufferedWriter(object):
+    """
+    Collects the text written for cases and passes it on to `out` once
+    `max_cases` cases have been collected, or `max_delay` seconds have
+    passed since the last write. If `background` is True the writes to
+    `out` are done by a separate thread so the caller isn't blocked.
+    An error in the writer thread is raised by the next :meth:`flush`.
+    """
+
+    def __init__(self, out, max_cases=1, max_delay=None, background=False):
+        self.out = out
+        self.max_cases = max(1, max_cases)
+        self.max_delay = max_delay
+        self._chunks = []
+        self._ncases = 0
+        self._last_write = time.time()
+        self._error = None
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = Queue.Queue()
+            self._thread = threading.Thread(target=self._run,
+                                            name='case-writer')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def write(self, data):
+        """ Add `data` to the buffer. """
+        self._chunks.append(data)
+
+    def end_case(self):
+        """ Mark the end of a case, flushing if the buffer is full. """
+        self._ncases += 1
+        if self._ncases >= self.max_cases or \
+           (self.max_delay is not None and
+            time.time() - self._last_write >= self.max_delay):
+            self.flush()
+
+    def flush(self):
+        """ Pass the buffer on to be written. """
+        self._check()
+        data = ''.join(self._chunks)
+        self._chunks = []
+        self._ncases = 0
+        self._last_write = time.time()
+        if self._queue is None:
+            self._output(data)
+        else:
+            self._queue.put(data)
+
+    def close(self):
+        """ Write everything buffered and wait for it to be written. """
+        try:
+            self.flush()
+        finally:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+                self._queue = None
+        self._check()
+
+    def _output(self, data):
+        """ Write `data` to `out`. """
+        if data:
+            self.out.write(data)
+        self.out.flush()
+
+    def _run(self):
+        """ Writer thread, writes queued data until it gets None. """
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            if self._error is None:
+                try:
+                    self._output(data)
+                except Exception as exc:
+                    self._error = exc
+
+    def _check(self):
+        """ Raise any error from the writer thread. """
+        if self._error is not None:
+            exc, self._error = self._error, None
+            raise RuntimeError('Case write failed: %s' % exc)
+
+
+class _CaseIndex(object):
+    """
+    Byte offsets of the iteration cases in a JSON/BSON case file, keyed by
+    case id, driver id and parent id. The recorders save it next to the case
+    file (`filename` + ``.idx``) when they are closed.
+    """
+
+    def __init__(self, entries=()):
+        self.offsets = []
+        self.case_ids = []
+        self.driver_ids = []
+        self.parent_ids = []
+        self.by_id = {}       # case id -> position
+        self.by_driver = {}   # driver id -> [positions]
+        self.by_parent = {}   # parent id -> [positions]
+        for entry in entries:
+            self.add(*entry)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def add(self, offset, case_id, driver_id, parent_id):
+        """ Add the case at `offset`. """
+        pos = len(self.offsets)
+        self.offsets.append(offset)
+        self.case_ids.append(case_id)
+        self.driver_ids.append(driver_id)
+        self.parent_ids.append(parent_id)
+        self.by_id[case_id] = pos
+        self.by_driver.setdefault(driver_id, []).append(pos)
+        self.by_parent.setdefault(parent_id, []).append(pos)
+
+    def descendants(self, case_id):
+        """ Return positions of all cases below `case_id`, recursively. """
+        found = []
+        stack = [case_id]
+        while stack:
+            for pos in self.by_parent.get(stack.pop(), ()):
+                found.append(pos)
+                stack.append(self.case_ids[pos])
+        return sorted(found)
+
+    @staticmethod
+    def filename(path):
+        """ Return the index filename for case file `path`. """
+        return path + '.idx'
+
+    def save(self, path, uuid):
+        """ Save index for case file `path` recorded in run `uuid`. """
+        entries = zip(self.offsets, self.case_ids, self.driver_ids,
+                      self.parent_ids)
+        with open(self.filename(path), 'w') as out:
+            json.dump(dict(uuid=uuid, size=os.path.getsize(path),
+                           cases=entries), out)
+
+    @classmethod
+    def load(cls, path, uuid):
+        """
+        Return the saved index for case file `path` recorded in run `uuid`,
+        or None if there isn't one or it doesn't match the case file.
+        """
+        try:
+            with open(cls.filename(path), 'r') as inp:
+                info = json.load(inp)
+            if info['uuid'] != uuid or \
+               info['size'] != os.path.getsize(path):
+                return None
+            return cls(info['cases'])
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return None
+
+
 def dict_iter(dct):
     for k,v in dct.items():
         if isinstance(v, dict):
@@ -3,15 +3,16 @@ import json
 import logging
 import cPickle
 import StringIO
+from bisect import bisect_left
 from struct import pack, unpack
-from weakref import ref
 
+import numpy as np
 from numpy import ndarray
 
 from openmdao.main.api import Assembly, VariableTree
 from openmdao.lib.casehandlers.pymongo_bson.json_util import loads, dumps
 from openmdao.lib.casehandlers.pymongo_bson.binary import Binary
-from openmdao.lib.casehandlers.jsoncase import _Encoder
+from openmdao.lib.casehandlers.jsoncase import _Encoder, _CaseIndex
 
 _GLOBAL_DICT = dict(__builtins__=None)
 
@@ -90,7 +91,63 @@ class CaseDataset(object):
     def _fetch(self, query):
         """ Return data based on `query`. """
         self._setup(query)
+        names, metadata_names = self._names(query)
+        if query.names:
+            # Returning single row, not list of rows.
+            return names
 
+        cases, size = self._selected(query, names, metadata_names)
+
+        if query.arrays:
+            columns = _Columns(names, size)
+            for values in cases:
+                columns.append(values)
+            if self._query_id and not columns.count:
+                raise ValueError('No case with _id %s' % self._query_id)
+            result = ArrayResult(columns.arrays())
+            # Keep CDS as attribute for post-processing
+            result.cds = self
+            return result
+
+        rows = ListResult()
+        for values in cases:
+            row = DictList(names)
+            row.extend(values)
+            rows.append(row)
+
+        if self._query_id and not rows:
+            raise ValueError('No case with _id %s' % self._query_id)
+
+        if query.transpose:
+            tmp = DictList(names)
+            for i in range(len(rows[0])):
+                tmp.append([row[i] for row in rows])
+            # Keep CDS as attribute for post-processing
+            tmp.cds = self
+            return tmp
+
+        # Keep CDS as attribute for post-processing
+        rows.cds = self
+        return rows
+
+    def _reduce(self, query, reduction):
+        """
+        Feed the values of each case selected by `query` to `reduction`
+        and return its result. Cases are read one at a time, so memory use
+        doesn't depend on the number of cases.
+        """
+        if query.names:
+            raise ValueError('data.var_names() invalid for reductions')
+        self._setup(query)
+        names, metadata_names = self._names(query)
+        reduction.start(names, self._expression_names(reduction.names))
+        cases, size = self._selected(query, names, metadata_names)
+        for values in cases:
+            reduction.add(values)
+        return reduction.result()
+
+    def _names(self, query):
+        """ Return ``(names, metadata_names)`` selected by `query`. """
         metadata_names = ['_id', '_parent_id', '_driver_id', 'error_status',
                           'error_message', 'timestamp']
         if query.vnames:
@@ -113,13 +170,105 @@ class CaseDataset(object):
                     all_names.extend([prefix+name
                                       for name in driver_info['recording']])
             names = sorted(all_names+metadata_names)
+        return names, metadata_names
 
-        if query.names:
-            # Returning single row, not list of rows.
-            return names
+    def _selected(self, query, names, metadata_names):
+        """
+        Return ``(values, size)``, where `values` generates the values of
+        `names` for each case selected by `query` and `size` is the number of
+        cases expected (zero if not known).
+        """
+        constraints = self._constraints(query)
+        positions = self._indexed_positions()
+        if positions is not None:
+            extra = [name for name, equality in constraints]
+            cases = self._seek_cases(query, names+extra, metadata_names,
+                                     positions)
+            size = len(positions)
+        else:
+            cases = self._scan_cases()
+            size = len(self._reader._index or ())
 
-        nan = float('NaN')
-        rows = ListResult()
+        def generate():
+            for case_data, data, state in cases:
+                if query.feasible_only and \
+                   not self._is_feasible(query, constraints, case_data, state):
+                    continue
+                yield self._values(query, names, metadata_names,
+                                   case_data, data, state)
+
+        return generate(), size
+
+    def _constraints(self, query):
+        """
+        Return list of ``(name, equality)`` for the constraints checked by
+        :meth:`Query.feasible`, where `name` is the recorded variable.
+        """
+        if not query.feasible_only:
+            return []
+
+        if query.constraints is None:
+            if self._driver_id is not None:
+                drivers = [self._drivers[self._driver_id]]
+            else:
+                drivers = self._drivers.values()
+            exprs = []
+            for driver_info in drivers:
+                prefix = driver_info['prefix']
+                for key in ('eq_constraints', 'ineq_constraints'):
+                    exprs.extend([prefix+con
+                                  for con in driver_info.get(key, [])])
+        else:
+            exprs = query.constraints
+
+        equalities = set()
+        for driver_info in self._drivers.values():
+            prefix = driver_info['prefix']
+            equalities.update([prefix+con for con in
+                               driver_info.get('eq_constraints', [])])
+
+        names = self._expression_names(exprs)
+        return [(name, expr in equalities)
+                for expr, name in zip(exprs, names)]
+
+    def _expression_names(self, exprs):
+        """
+        Return recorded variable names for `exprs`, which may be objective
+        or constraint expressions as well as variable names.
+        """
+        expressions = self.simulation_info['expressions']
+        names = []
+        for expr in exprs:
+            if expr in expressions:
+                names.append(expressions[expr]['pcomp_name']+'.out0')
+            else:
+                names.append(expr)
+        return names
+
+    @staticmethod
+    def _is_feasible(query, constraints, case_data, state):
+        """
+        Return True if the case ran without error and all `constraints`
+        are satisfied (within `query.tolerance`) in `state`.
+        """
+        if case_data['error_status'] is not None:
+            return False
+        for name, equality in constraints:
+            try:
+                value = np.asarray(state[name], dtype=float)
+            except (KeyError, TypeError, ValueError):
+                return False
+            if equality:
+                value = np.abs(value)
+            if not np.all(value <= query.tolerance):  # False for NaN.
+                return False
+        return True
+
+    def _scan_cases(self):
+        """
+        Generate ``(case_data, data, state)`` for the selected cases by
+        reading through all the cases.
+        """
         state = {}  # Retains last seen values.
         for case_data in self._reader.cases():
             data = case_data['data']
@@ -144,46 +293,95 @@ class CaseDataset(object):
 
             # Filter on case.
             if self._case_ids is None or case_id in self._case_ids:
-                for name in metadata_names:
-                    data[name] = case_data[name]
-
-                row = DictList(names)
-                for name in names:
-                    if query.local_only:
-                        if name in metadata_names:
-                            row.append(data[name])
-                        else:
-                            driver = self._drivers[case_driver_id]
-                            lnames = [prefix+rec for rec in driver['recording']]
-                            if name in lnames:
-                                row.append(data[name])
-                            else:
-                                row.append(nan)
-                    elif name in state:
-                        row.append(state[name])
-                    elif name in data:
-                        row.append(data[name])
-                    else:
-                        row.append(nan)
-                rows.append(row)
+                yield case_data, data, state
 
             if case_id == self._query_id or case_id == self._parent_id:
                 break  # Parent is last case recorded.
 
-        if self._query_id and not rows:
-            raise ValueError('No case with _id %s' % self._query_id)
+    def _seek_cases(self, query, names, metadata_names, positions):
+        """
+        Generate ``(case_data, data, state)`` for the cases at index
+        `positions`, seeking directly to each one. Values of variables not
+        recorded in a case are taken from the preceding cases only if
+        they're needed.
+        """
+        need_history = False
+        if not query.local_only:
+            wanted = set(names) - set(metadata_names)
+            for driver_id in set(self._reader.index().driver_ids[pos]
+                                 for pos in positions):
+                driver_info = self._drivers[driver_id]
+                recorded = set([driver_info['prefix']+name
+                                for name in driver_info['recording']])
+                if wanted - recorded:
+                    need_history = True
+                    break
 
-        if query.transpose:
-            tmp = DictList(names)
-            for i in range(len(rows[0])):
-                tmp.append([row[i] for row in rows])
-            # Keep CDS as attribute for post-processing
-            tmp.cds = self
-            return tmp
+        state = {}
+        last = None
+        for pos in positions:
+            if need_history and (last is None or pos != last+1):
+                state = self._reader.history(pos)
+            case_data = self._reader.case(pos)
+            data = case_data['data'].copy()
+            state.update(data)
+            yield case_data, data, state
+            last = pos
 
-        # Keep CDS as attribute for post-processing
-        rows.cds = self
-        return rows
+    def _indexed_positions(self):
+        """
+        Return index positions of the cases selected by the last
+        :meth:`_setup`, or None if all cases must be read anyway.
+        """
+        if self._query_id is None and self._parent_id is None and \
+           self._driver_id is None:
+            return None
+
+        index = self._reader.index()
+        if self._query_id is not None:
+            if self._query_id not in index.by_id:
+                raise ValueError('No case with _id %s' % self._query_id)
+            return [index.by_id[self._query_id]]
+
+        if self._parent_id is not None:
+            positions = index.descendants(self._parent_id)
+            if self._parent_id in index.by_id:
+                positions.append(index.by_id[self._parent_id])
+        else:
+            positions = index.by_driver.get(self._driver_id, [])
+
+        if self._driver_id is not None:
+            positions = [pos for pos in positions
+                         if index.driver_ids[pos] == self._driver_id]
+        return positions
+
+    def _values(self, query, names, metadata_names, case_data, data, state):
+        """ Return the values of `names` for one case. """
+        nan = float('NaN')
+        case_driver_id = case_data['_driver_id']
+        prefix = self._drivers[case_driver_id]['prefix']
+        for name in metadata_names:
+            data[name] = case_data[name]
+
+        values = []
+        for name in names:
+            if query.local_only:
+                if name in metadata_names:
+                    values.append(data[name])
+                else:
+                    driver = self._drivers[case_driver_id]
+                    lnames = [prefix+rec for rec in driver['recording']]
+                    if name in lnames:
+                        values.append(data[name])
+                    else:
+                        values.append(nan)
+            elif name in state:
+                values.append(state[name])
+            elif name in data:
+                values.append(data[name])
+            else:
+                values.append(nan)
+        return values
 
     def _write(self, query, out, format):
         """ Write data based on `query` to `out`. """
@@ -193,6 +391,8 @@ class CaseDataset(object):
             raise ValueError('data.var_names() invalid for write()')
         if query.transpose:
             raise ValueError('data.by_variable() invalid for write()')
+        if query.feasible_only:
+            raise ValueError('data.feasible() invalid for write()')
 
         self._setup(query)
 
@@ -308,46 +508,16 @@ class CaseDataset(object):
             self._case_ids = set((self._query_id,))
             self._driver_id = None  # Case specified, ignore driver.
         elif query.parent_id is not None:
-            # Parent won't be seen until children are, so we have to pre-screen.
-            # Collect tree of cases.
+            # Parent won't be seen until children are, so we use the index
+            # to find the tree of cases below it.
             self._parent_id = query.parent_id
-            cases = {}
-            for case_data in self._reader.cases():
-                _id = case_data['_id']
-                _driver_id = case_data['_driver_id']
-                _parent_id = case_data['_parent_id']
-
-                if _id in cases:
-                    node = cases[_id]
-                    node.driver_id = _driver_id
-                    if node.parent is None:
-                        if _parent_id in cases:
-                            node.parent = cases[_parent_id]
-                        else:
-                            parent = _CaseNode(_parent_id)
-                            parent.add_child(node)
-                            node.parent = parent
-                            cases[_parent_id] = parent
-                else:
-                    if _parent_id in cases:
-                        parent = cases[_parent_id]
-                    else:
-                        parent = _CaseNode(_parent_id)
-                        cases[_parent_id] = parent
-                    child = _CaseNode(_id, _driver_id, parent)
-                    cases[_id] = parent.add_child(child)
-
-                if _id == self._parent_id:
-                    break  # Parent is last case recorded.
-
-            # Determine subtree of interest.
-            if self._parent_id in cases:
-                root = cases[self._parent_id]
-                self._case_ids = set((self._parent_id,))
-                for child in root.get_children():
-                    self._case_ids.add(child.case_id)
-            else:
+            index = self._reader.index()
+            if self._parent_id not in index.by_id and \
+               self._parent_id not in index.by_parent:
                 raise ValueError('No case with _id %s', self._parent_id)
+            self._case_ids = set((self._parent_id,))
+            for pos in index.descendants(self._parent_id):
+                self._case_ids.add(index.case_ids[pos])
 
     def restore(self, assembly, case_id):
         """ Restore case `case_id` into `assembly`. """
@@ -441,11 +611,72 @@ class Query(object):
         self.local_only = False
         self.names = False
         self.transpose = False
+        self.arrays = False
+        self.feasible_only = False
+        self.constraints = None
+        self.tolerance = 0.
 
     def fetch(self):
         """ Return a list of rows of data, one for each selected case. """
         return self._dataset._fetch(self)
 
+    def stats(self):
+        """
+        Return a dictionary of statistics for each numeric variable, computed
+        in a single pass over the selected cases. Each entry is a dictionary
+        with keys ``count``, ``min``, ``max``, ``mean`` and ``std``
+        (population standard deviation). Array variables get elementwise
+        statistics. ``NaN`` values (variables not recorded yet) are ignored.
+        """
+        return self._dataset._reduce(self, _Stats())
+
+    def argmin(self, objective=None):
+        """
+        Return the row of the selected case having the smallest value of
+        `objective`, or None if there are no such cases. `objective` may be
+        an objective expression or a variable name. By default it's the
+        objective of the driver selected by :meth:`driver`, or the only
+        objective in the dataset.
+
+        To get the best feasible design found by the top-level driver::
+
+            best = cds.data.driver('driver').feasible().argmin()
+
+        """
+        if objective is None:
+            objective = self._default_objective()
+        return self._dataset._reduce(self, _ArgMin(objective))
+
+    def histogram(self, name, bins=10, range=None):
+        """
+        Return ``(counts, edges)`` for variable `name` over the selected
+        cases, as :func:`numpy.histogram` would. If `range` isn't given the
+        cases are read twice, the first pass finds the range.
+        """
+        if range is None:
+            stats = self._dataset._reduce(self, _Stats([name]))
+            if not stats:
+                raise ValueError('No numeric values for %r' % name)
+            stats = stats.values()[0]
+            range = (np.min(stats['min']), np.max(stats['max']))
+        return self._dataset._reduce(self, _Histogram(name, bins, range))
+
+    def _default_objective(self):
+        """ Return the objective expression to use for :meth:`argmin`. """
+        objectives = []
+        for driver_info in self._dataset.drivers:
+            if self.driver_name is None or \
+               driver_info['name'] == self.driver_name:
+                prefix = driver_info['name'].rpartition('.')[0]
+                if prefix:
+                    prefix += '.'
+                objectives.extend([prefix+obj for obj in
+                                   driver_info.get('objectives', [])])
+        if len(objectives) != 1:
+            raise ValueError('Objective must be specified, %d objectives'
+                             ' found' % len(objectives))
+        return objectives[0]
+
     def write(self, out, format=None):
         """
         Write filtered :class:`CaseDataset` to `out`, a filename or file-like
@@ -494,11 +725,28 @@ class Query(object):
         self.local_only = True
         return self
 
+    def feasible(self, constraints=None, tolerance=0.):
+        """
+        Filter the cases to those which ran without error and satisfy
+        `constraints`, a list of constraint expressions or variable names.
+        By default all the constraints of the driver selected by
+        :meth:`driver` (or of every driver) are checked. A constraint is
+        satisfied if its value is at most `tolerance` (absolute value for
+        equality constraints).
+        """
+        self.feasible_only = True
+        if isinstance(constraints, basestring):
+            constraints = [constraints]
+        self.constraints = constraints
+        self.tolerance = tolerance
+        return self
+
     def by_case(self):
         """
         Have :meth:`fetch` return data as ``[case][var]`` (the default).
         """
         self.transpose = False
+        self.arrays = False
         return self
 
     def by_variable(self):
@@ -507,6 +755,18 @@ class Query(object):
         default of ``[case][var]``.
         """
         self.transpose = True
+        self.arrays = False
+        return self
+
+    def as_arrays(self):
+        """
+        Have :meth:`fetch` return a dictionary of NumPy arrays, one per
+        variable and indexed by case. Numeric variables get ``int64`` or
+        ``float64`` arrays (with a trailing dimension for array variables),
+        anything else gets an ``object`` array.
+        """
+        self.transpose = False
+        self.arrays = True
         return self
 
     def var_names(self):
@@ -551,37 +811,234 @@ class ListResult(list):
     pass
 
 
-class _CaseNode(object):
-    """ Represents a node in a tree of cases. """
+class ArrayResult(dict):
+    """ Dictionary of NumPy arrays that also saves a reference to the
+    original CaseDataSet.
+    """
+    pass
 
-    def __init__(self, case_id, driver_id=None, parent=None):
-        self.case_id = case_id
-        self.driver_id = driver_id
-        self._parent = None
-        self.parent = parent
-        self.children = []
 
-    @property
-    def parent(self):
-        """ Parent node. """
-        return None if self._parent is None else self._parent()
+class _Columns(object):
+    """
+    Preallocated NumPy columns for `names`, filled in one case at a time.
+    `size` is the expected number of cases, the columns grow as needed.
+    A column's type is set by its first value and is widened (int to float,
+    anything to object) if a later value doesn't fit.
+    """
+
+    def __init__(self, names, size=0):
+        self.names = names
+        self.count = 0
+        self._size = max(size, 1)
+        self._columns = [None] * len(names)
+
+    def append(self, values):
+        """ Add a case's `values`, in `names` order. """
+        if self.count == self._size:
+            self._size *= 2
+            for j, column in enumerate(self._columns):
+                grown = np.empty((self._size,)+column.shape[1:], column.dtype)
+                grown[:self.count] = column[:self.count]
+                self._columns[j] = grown
+
+        i = self.count
+        for j, value in enumerate(values):
+            column = self._columns[j]
+            if column is None:
+                column = self._columns[j] = self._new_column(value)
+            elif not self._fits(column, value):
+                column = self._columns[j] = self._widen(column, value)
+            column[i] = value
+        self.count += 1
+
+    def arrays(self):
+        """ Return dictionary of the filled columns. """
+        result = {}
+        for name, column in zip(self.names, self._columns):
+            if column is None:
+                column = np.empty((0,), float)
+            elif self.count < self._size:
+                column = column[:self.count].copy()
+            result[name] = column
+        return result
+
+    def _new_column(self, value):
+        """ Return an empty column suitable for `value`. """
+        if isinstance(value, (bool, int, long, np.integer)):
+            return np.empty((self._size,), np.int64)
+        elif isinstance(value, (float, np.floating)):
+            return np.empty((self._size,), np.float64)
+        elif isinstance(value, ndarray) and value.dtype.kind in 'biuf':
+            return np.empty((self._size,)+value.shape, np.float64)
+        return np.empty((self._size,), object)
+
+    @staticmethod
+    def _fits(column, value):
+        """ Return True if `value` can be stored in `column` as is. """
+        kind = column.dtype.kind
+        if kind == 'O':
+            return True
+        elif column.ndim > 1:
+            return isinstance(value, ndarray) and \
+                   value.dtype.kind in 'biuf' and \
+                   value.shape == column.shape[1:]
+        elif kind == 'i':
+            return isinstance(value, (bool, int, long, np.integer))
+        return isinstance(value, (bool, int, long, float,
+                                  np.integer, np.floating))
+
+    def _widen(self, column, value):
+        """ Return a copy of `column` that can also hold `value`. """
+        if column.dtype.kind == 'i' and \
+           isinstance(value, (float, np.floating)):
+            return column.astype(np.float64)
+
+        widened = np.empty((self._size,), object)
+        for i in range(self.count):
+            widened[i] = column[i]
+        return widened
+
+
+class _Reduction(object):
+    """
+    Base class for reductions over the cases selected by a :class:`Query`.
+    `names` are the variables the reduction needs, :meth:`start` is given
+    the query's names and the recorded names for `names`.
+    """
 
-    @parent.setter
-    def parent(self, node):
-        self._parent = None if node is None else ref(node)
+    names = ()
+
+    def start(self, names, var_names):
+        """ Prepare to receive values of `names`. """
+        self._names = names
+        self._indices = []
+        for name, var_name in zip(self.names, var_names):
+            if var_name not in names:
+                raise ValueError('%r is not in the selected variables' % name)
+            self._indices.append(names.index(var_name))
+
+    def add(self, values):
+        """ Process the `values` of one case. """
+        raise NotImplementedError('add')
+
+    def result(self):
+        """ Return the result of the reduction. """
+        raise NotImplementedError('result')
+
+
+class _Stats(_Reduction):
+    """ Running count, min, max, mean and variance (Welford's method). """
+
+    def __init__(self, names=None):
+        if names is not None:
+            self.names = names
+        self._all = names is None
+
+    def start(self, names, var_names):
+        super(_Stats, self).start(names, var_names)
+        if self._all:
+            self._indices = range(len(names))
+        self._acc = {}
+
+    def add(self, values):
+        for i in self._indices:
+            value = values[i]
+            if isinstance(value, (bool, int, long, float,
+                                  np.integer, np.floating)):
+                if value != value:
+                    continue  # NaN
+                value = float(value)
+            elif isinstance(value, ndarray) and value.dtype.kind in 'biuf':
+                value = value.astype(float)
+            else:
+                continue
 
-    def add_child(self, child):
-        """ Add child to this case. """
-        self.children.append(child)
-        return child
+            acc = self._acc.get(i)
+            if acc is None:
+                self._acc[i] = [1, value, value, value, value*0.]
+                continue
+            if np.shape(value) != np.shape(acc[1]):
+                continue
 
-    def get_children(self):
-        """ Return all child cases, recursively. """
-        kids = []
-        for child in self.children:
-            kids.append(child)
-            kids.extend(child.get_children())
-        return kids
+            acc[0] += 1
+            acc[1] = np.minimum(acc[1], value)
+            acc[2] = np.maximum(acc[2], value)
+            delta = value - acc[3]
+            acc[3] = acc[3] + delta / acc[0]
+            acc[4] = acc[4] + delta * (value - acc[3])
+
+    def result(self):
+        stats = {}
+        for i, (count, vmin, vmax, mean, m2) in self._acc.items():
+            stats[self._names[i]] = dict(count=count, min=vmin, max=vmax,
+                                         mean=mean, std=np.sqrt(m2 / count))
+        return stats
+
+
+class _ArgMin(_Reduction):
+    """ Retains the row with the smallest objective value. """
+
+    def __init__(self, objective):
+        self.names = [objective]
+        self._best = None
+        self._row = None
+
+    def add(self, values):
+        value = values[self._indices[0]]
+        if isinstance(value, ndarray):
+            if value.size != 1:
+                raise ValueError('Objective %r is not a scalar'
+                                 % self.names[0])
+            value = value.flat[0]
+        if value != value:
+            return  # NaN
+        if self._best is None or value < self._best:
+            self._best = value
+            self._row = values
+
+    def result(self):
+        if self._row is None:
+            return None
+        row = DictList(self._names)
+        row.extend(self._row)
+        return row
+
+
+class _Histogram(_Reduction):
+    """ Counts values falling in fixed bins over `range`. """
+
+    def __init__(self, name, bins, range):
+        self.names = [name]
+        if range[0] == range[1]:
+            range = (range[0]-0.5, range[1]+0.5)  # As numpy does.
+        self._edges = np.linspace(range[0], range[1], bins+1)
+        self._counts = np.zeros(bins, np.int64)
+
+    def add(self, values):
+        value = values[self._indices[0]]
+        if isinstance(value, ndarray):
+            self._counts += np.histogram(value, self._edges)[0]
+            return
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return
+
+        lo, hi = self._edges[0], self._edges[-1]
+        if lo <= value < hi:
+            i = int((value - lo) / (hi - lo) * len(self._counts))
+            i = min(i, len(self._counts)-1)
+            # Guard against rounding, the edges are authoritative.
+            if value < self._edges[i]:
+                i -= 1
+            elif value >= self._edges[i+1]:
+                i += 1
+            self._counts[i] += 1
+        elif value == hi:
+            self._counts[-1] += 1  # Last bin includes its right edge.
+
+    def result(self):
+        return self._counts, self._edges
 
 
 class _Reader(object):
@@ -590,11 +1047,15 @@ class _Reader(object):
     def __init__(self, filename, mode):
         if isinstance(filename, StringIO.StringIO):
             self._inp = filename
+            self._index = None
         else:
             self._inp = open(filename, mode)
         self._simulation_info = self._next()
         self._state = 'drivers'
         self._info = None
+        if self._inp is not filename:
+            self._index = _CaseIndex.load(filename,
+                                          self._simulation_info.get('uuid'))
 
     def _next(self):
         """ Return next dictionary of data. """
@@ -640,6 +1101,51 @@ class _Reader(object):
             info = self._next()
         self._state = 'eof'
 
+    def index(self):
+        """
+        Return the :class:`_CaseIndex` for this file. If the recorder didn't
+        save one, it's built by reading through the file once.
+        """
+        if self._index is None:
+            self._inp.seek(0)
+            self._next()  # Skip 'simulation_info'.
+            index = _CaseIndex()
+            offset = self._inp.tell()
+            info = self._next()
+            while info:
+                if '_driver_id' in info:
+                    index.add(offset, info['_id'], info['_driver_id'],
+                              info['_parent_id'])
+                offset = self._inp.tell()
+                info = self._next()
+            self._index = index
+            self._state = 'seek'
+        return self._index
+
+    def case(self, pos):
+        """ Return the 'iteration_case' dictionary at index position `pos`. """
+        self._inp.seek(self.index().offsets[pos])
+        self._state = 'seek'  # Force drivers() & cases() to start over.
+        return self._next()
+
+    def history(self, pos):
+        """
+        Return the values last recorded for each variable before the case at
+        index position `pos`, as a full pass through :meth:`cases` would see
+        them.
+        """
+        index = self.index()
+        latest = []
+        for positions in index.by_driver.values():
+            i = bisect_left(positions, pos)
+            if i:
+                latest.append(positions[i-1])
+
+        state = {}
+        for prev in sorted(latest):
+            state.update(self.case(prev)['data'])
+        return state
+
 
 class _JSONReader(_Reader):
     """ Reads a :class:`JSONCaseRecorder` file. """
@@ -3,6 +3,7 @@ from weakref import ref
 import numpy as np
 
 from openmdao.main.api import  VariableTree
+from openmdao.lib.casehandlers.hdf5case import read_column
 from openmdao.lib.casehandlers.query import  DictList, ListResult
 
 _GLOBAL_DICT = dict(__builtins__=None)
@@ -75,11 +76,6 @@ class CaseDatasetHDF5(object):
 
 
         if query.vnames:
-            tmp = []
-            for name in self.metadata_names:
-                if name in query.vnames:
-                    tmp.append(name)
-            self.metadata_names = tmp
             names = query.vnames
         else:
             if query.driver_name:
@@ -100,6 +96,12 @@ class CaseDatasetHDF5(object):
             # Returning single row, not list of rows.
             return names
 
+        if self._driver_name is not None and self._case_iternames is None:
+            # All cases from one driver, slice its columns directly.
+            columns = self._reader.columns(self._driver_name, names)
+            if columns is not None:
+                return self._fetch_columns(query, names, *columns)
+
         nan = float('NaN')
         rows = ListResult()
         state = {}  # Retains last seen values.
@@ -178,6 +180,30 @@ class CaseDatasetHDF5(object):
         rows.cds = self
         return rows
 
+    def _fetch_columns(self, query, names, metadata, data):
+        """ Return rows for `names` from whole columns of one driver. """
+        columns = []
+        for name in names:
+            if name in data:
+                columns.append(data[name])
+            else:
+                columns.append(metadata[name])
+
+        if query.transpose:
+            tmp = DictList(names)
+            for column in columns:
+                tmp.append(list(column))
+            tmp.cds = self
+            return tmp
+
+        rows = ListResult()
+        for i in range(len(metadata)):
+            row = DictList(names)
+            row.extend([column[i] for column in columns])
+            rows.append(row)
+        rows.cds = self
+        return rows
+
     def _write(self, query, out, format):
         raise NotImplementedError
 
@@ -227,8 +253,11 @@ class CaseDatasetHDF5(object):
                 raise ValueError('No driver named %r' % query.driver_name)
 
         self._case_ids = None
+        self._case_iternames = None
         self._query_id = None
+        self._query_itername = None
         self._parent_id = None
+        self._parent_itername = None
         #if query.case_id is not None:
             #self._query_id = query.case_id
             #self._case_ids = set((self._query_id,))
@@ -493,25 +522,70 @@ class _HDF5Reader(object):
 
         return driver_info
 
+    def _is_columnar(self, driver_grp):
+        """ True if `driver_grp` holds cases as one dataset per variable. """
+        import h5py
+        return isinstance(driver_grp.get('metadata'), h5py.Dataset)
+
+    def columns(self, driver_name, names):
+        """
+        Return ``(metadata, data)`` for all cases of `driver_name`, in
+        recorded order, where `metadata` is the metadata table and `data`
+        maps each of `names` (that isn't a metadata field) to its column.
+        Returns None if the driver's cases are not stored as columns or some
+        of `names` were not recorded by it.
+        """
+        iteration_cases_grp = self._inp['/iteration_cases']
+        if driver_name not in iteration_cases_grp:
+            return None
+        driver_grp = iteration_cases_grp[driver_name]
+        if not self._is_columnar(driver_grp):
+            return None
+
+        metadata = driver_grp['metadata'][...]
+        data_grp = driver_grp['data']
+        data = {}
+        for name in names:
+            if name in metadata.dtype.names:
+                continue
+            if name not in data_grp:
+                return None
+            data[name] = read_column(data_grp[name])
+        return metadata, data
+
     def cases(self):
         """ Return sequence of 'iteration_case' dictionaries. """
 
         iteration_cases_grp = self._inp['/iteration_cases']
-        case_timestamps = {}
+        case_timestamps = []
+        columns = {}
         for driver_name in iteration_cases_grp:
-            for iteration_case_name in iteration_cases_grp[driver_name] :
-                if iteration_case_name.startswith('iteration_case_') :
-                    timestamp = iteration_cases_grp[driver_name][iteration_case_name]['metadata']['timestamp'][0]
-                    case_timestamps[timestamp] = ( driver_name, iteration_case_name )
-
-        sorted_timestamps = sorted( case_timestamps )
-        for timestamp in sorted_timestamps:
-            driver_name, iteration_case_name = case_timestamps[ timestamp ]
-            info = self.read_iteration_case_from_hdf5( self._inp, driver_name, iteration_case_name )
+            driver_grp = iteration_cases_grp[driver_name]
+            if self._is_columnar(driver_grp):
+                metadata, data = self.columns(driver_name, driver_grp['data'].keys())
+                columns[driver_name] = (metadata, data)
+                for i, timestamp in enumerate(metadata['timestamp']):
+                    case_timestamps.append((timestamp, driver_name, i))
+            else:
+                for iteration_case_name in driver_grp :
+                    if iteration_case_name.startswith('iteration_case_') :
+                        timestamp = driver_grp[iteration_case_name]['metadata']['timestamp'][0]
+                        case_timestamps.append((timestamp, driver_name, iteration_case_name))
+
+        for timestamp, driver_name, case in sorted(case_timestamps):
+            if driver_name in columns:
+                metadata, data = columns[driver_name]
+                row = metadata[case]
+                info = {}
+                info['metadata'] = dict((name, row[name])
+                                        for name in metadata.dtype.names)
+                info['data'] = dict((name, column[case])
+                                    for name, column in data.items())
+            else:
+                info = self.read_iteration_case_from_hdf5( self._inp, driver_name, case )
             yield info
 
 
-
     def _next(self):
         """ Return next dictionary of data. """
         pass
@@ -7,8 +7,11 @@ import tempfile
 import StringIO
 import os
 import logging
+import multiprocessing
 import shutil
 
+from unittest import SkipTest
+
 from openmdao.main.api import Assembly, Case, set_as_top
 from openmdao.test.execcomp import ExecComp
 from openmdao.lib.casehandlers.api import DBCaseIterator, DBCaseRecorder, \
@@ -201,6 +204,89 @@ class DBCaseRecorderTestCase(unittest.TestCase):
         except OSError:
             logging.error("problem removing directory %s", tmpdir)
 
+    def test_batched(self):
+        tmpdir = tempfile.mkdtemp()
+        dfile = os.path.join(tmpdir, 'junk.db')
+        recorder = DBCaseRecorder(dfile, batch_size=4, wal=True)
+        try:
+            mode = recorder._connection.execute('PRAGMA journal_mode').fetchone()
+            self.assertEqual(mode[0], 'wal')
+
+            inputs = ['comp1.x', 'comp1.y']
+            outputs = ['comp1.z']
+            recorder.register(self, inputs, outputs)
+            for i in range(10):
+                recorder.record(self, [i, i*2], [[i]], None, '', '')
+
+            # Only complete batches are in the DB until a flush.
+            self.assertEqual(len(case_db_to_dict(dfile, ['comp1.x'])['comp1.x']), 8)
+            recorder.close()
+
+            varinfo = case_db_to_dict(dfile, ['comp1.x', 'comp1.z'])
+            self.assertEqual(varinfo['comp1.x'], range(10))
+            self.assertEqual(varinfo['comp1.z'], [[i] for i in range(10)])
+        finally:
+            recorder.close()
+            try:
+                shutil.rmtree(tmpdir, onerror=onerror)
+            except OSError:
+                logging.error("problem removing directory %s", tmpdir)
+
+    def test_multiprocess(self):
+        if not hasattr(os, 'fork'):
+            raise SkipTest('no os.fork()')
+
+        tmpdir = tempfile.mkdtemp()
+        dfile = os.path.join(tmpdir, 'junk.db')
+        recorder = DBCaseRecorder(dfile, batch_size=10, wal=True,
+                                  multiprocess=True)
+        recorder.register(self, ['comp1.x'], ['comp1.z'])
+
+        def worker(start):
+            for i in range(start, start+5):
+                recorder.record(self, [i], [i*2.], None, '', '')
+            # Must not wait for the parent's writer thread.
+            recorder.flush()
+            recorder.close()
+
+        try:
+            workers = [multiprocessing.Process(target=worker, args=(start,))
+                       for start in (0, 5, 10)]
+            for proc in workers:
+                proc.start()
+            for proc in workers:
+                proc.join(60)
+                self.assertFalse(proc.is_alive())
+            recorder.record(self, [15], [30.], None, '', '')
+
+            cases = list(recorder.get_iterator())
+            self.assertEqual(len(cases), 16)
+            recorder.close()
+
+            varinfo = case_db_to_dict(dfile, ['comp1.x', 'comp1.z'])
+            self.assertEqual(sorted(varinfo['comp1.x']), range(16))
+            for x, z in zip(varinfo['comp1.x'], varinfo['comp1.z']):
+                self.assertEqual(z, x*2.)
+        finally:
+            recorder.close()
+            try:
+                shutil.rmtree(tmpdir, onerror=onerror)
+            except OSError:
+                logging.error("problem removing directory %s", tmpdir)
+
+    def test_multiprocess_memory(self):
+        recorder = DBCaseRecorder(multiprocess=True)
+        recorder.register(self, ['comp1.x'], ['comp1.z'])
+        recorder.record(self, [1], [2.], None, '', '')
+        writer = recorder._writer
+
+        # Closing an in-memory DB stops the writer but keeps the cases.
+        recorder.close()
+        self.assertFalse(writer.is_alive())
+        recorder.record(self, [2], [4.], None, '', '')
+        cases = list(recorder.get_iterator())
+        self.assertEqual([case['comp1.x'] for case in cases], [1, 2])
+
     def test_string(self):
         recorder = DBCaseRecorder()
         inputs = ['str', 'unicode', 'list']  # Check pickling.
@@ -3,14 +3,17 @@ import tempfile
 import shutil
 import os
 
+import numpy as np
 from nose import SkipTest
 
 from openmdao.lib.drivers.api import SLSQPdriver
-from openmdao.lib.drivers.api import FixedPointIterator, SLSQPdriver
+from openmdao.lib.drivers.api import FixedPointIterator, IterateUntil, \
+                                    SLSQPdriver
 from openmdao.lib.optproblems import sellar
 from openmdao.lib.drivers.api import SLSQPdriver
 from openmdao.main.api import Assembly, Component, VariableTree, set_as_top
-from openmdao.main.datatypes.api import Array, VarTree, Float, Int, Str
+from openmdao.main.datatypes.api import Any, Array, VarTree, Float, Int, \
+                                        List, Str
 from openmdao.util.testutil import assert_rel_error
 
 class States(VariableTree):
@@ -30,6 +33,21 @@ class Half(Component):
         self.z2b = 0.5*self.z2a
 
 
+class Changing(Component):
+    """ Outputs that start out as None, or whose size changes. """
+    x = Float(0.0, iotype='in')
+    late = Any(None, iotype='out')
+    grow = Array(np.zeros(1), iotype='out')
+    vals = List([], iotype='out')
+
+    def execute(self):
+        if self.x > 0:
+            self.late = self.x
+        self.grow = np.arange(self.x+1)
+        self.vals = range(int(self.x))
+        self.x += 1.0
+
+
 class SellarMDF(Assembly):
     """ Optimization of the Sellar problem using MDF
     Disciplines coupled with FixedPointIterator.
@@ -150,35 +168,117 @@ class TestSellarMDFCase(unittest.TestCase):
         # Check some values in the iteration cases section
         driver_grp = hdf5_cases_file['/iteration_cases/driver/']
 
-        # How many iterations?
-        #num_iterations = get_number_of_iterations(driver_grp)
+        # One row per case in the metadata table and in each column
+        metadata = driver_grp['metadata']
+        self.assertEqual(metadata.maxshape, (None,))
+        num_iterations = metadata.shape[0]
+        data_grp = driver_grp['data']
+        for name in ['half.z2a', 'sub.x1', 'sub.itername', 'sub.states.y[0]']:
+            self.assertEqual(data_grp[name].shape, (num_iterations,))
+            self.assertEqual(data_grp[name].maxshape, (None,))
+        self.assertEqual(data_grp['sub.states/y'].shape, (num_iterations, 2))
 
         # compare expected to actual for case with itername '6' for some items
-        for key in driver_grp:
-            if key.startswith( "iteration_case_"):
-                if driver_grp[key]['metadata']['_itername'][0] == '6':
-                    iteration_case_name = key
-
-        iteration_data = driver_grp['%s/data/' % iteration_case_name ]
-        # check a float array
-        actual = iteration_data['array_of_floats' ].value
-        expected = [  3.20119761e+00,   3.76541140e+00,  -2.02345886e+01,  -8.37056317e-13,  -4.18528158e-13,
-                      1.98270572e+00,   3.17803953e+00,  -7.07632863e-15,  -1.80395299e-02]
-        for exp, act in zip(expected, actual):
-            assert_rel_error(self, exp, act, self.tolerance)
-
-        # check a string array
-        actual = iteration_data['array_of_strs' ].value
-        expected = ['6-sub', '6', '6-half']
-        for exp, act in zip(expected, actual):
-            self.assertEqual( exp, act )
+        row = list(metadata['_itername']).index('6')
+
+        # check some floats
+        expected = {'sub.globals.z1': 1.98270572e+00,
+                    'sub.states.y[0]': 3.17803953e+00,
+                    'sub.states.y[1]': 3.76541140e+00,
+                    '_pseudo_0.out0': 3.20119761e+00,
+                    '_pseudo_2.out0': -2.02345886e+01}
+        for name, exp in expected.items():
+            assert_rel_error(self, exp, data_grp[name][row], self.tolerance)
+
+        # check some strings
+        expected = {'sub.itername': '6-sub',
+                    'driver.workflow.itername': '6',
+                    'half.itername': '6-half'}
+        for name, exp in expected.items():
+            self.assertEqual(exp, data_grp[name][row])
 
         # check a vartree
-        actual = iteration_data['sub.states/y' ].value
+        actual = data_grp['sub.states/y'][row]
         expected = [ 3.17803953,  3.7654114]
         for exp, act in zip(expected, actual):
             assert_rel_error(self, exp, act, self.tolerance)
 
+    def test_buffered_columns(self):
+
+        try:
+            import h5py
+        except ImportError:
+            raise SkipTest("this test requires h5py")
+        from openmdao.lib.casehandlers.api import HDF5CaseRecorder
+
+        hdf5_cases_filepath = os.path.join(self.tempdir, 'buffered.hdf5')
+        self.top.recorders = [HDF5CaseRecorder(hdf5_cases_filepath,
+                                               buffer_size=4,
+                                               compression=None)]
+        self.top.run()
+
+        hdf5_cases_file = h5py.File(hdf5_cases_filepath, 'r')
+        driver_grp = hdf5_cases_file['/iteration_cases/driver/']
+
+        # the number of cases is not a multiple of the buffer size, so
+        # the last, partial batch must have been written on close
+        self.assertEqual(driver_grp['metadata'].shape, (10,))
+        x1 = driver_grp['data/sub.x1']
+        self.assertEqual(x1.chunks, (4,))
+        self.assertEqual(x1.compression, None)
+        self.assertEqual(x1[0], 1.0)
+        assert_rel_error(self, 4.941980752962757e-15, x1[-1], 1e-6)
+        timestamps = driver_grp['metadata']['timestamp']
+        self.assertTrue(all(timestamps[1:] >= timestamps[:-1]))
+
+        sub_grp = hdf5_cases_file['/iteration_cases/sub.driver/']
+        self.assertEqual(sub_grp['metadata'].shape, (64,))
+        self.assertEqual(sub_grp['data/sub.dis1.y1'].shape, (64,))
+
+    def test_changing_columns(self):
+
+        try:
+            import h5py
+        except ImportError:
+            raise SkipTest("this test requires h5py")
+        from openmdao.lib.casehandlers.api import HDF5CaseRecorder
+
+        top = set_as_top(Assembly())
+        top.add('driver', IterateUntil())
+        top.add('comp', Changing())
+        top.driver.workflow.add('comp')
+        top.driver.max_iterations = 5
+
+        hdf5_cases_filepath = os.path.join(self.tempdir, 'changing.hdf5')
+        top.recorders = [HDF5CaseRecorder(hdf5_cases_filepath,
+                                          buffer_size=2)]
+        top.run()
+
+        hdf5_cases_file = h5py.File(hdf5_cases_filepath, 'r')
+        data_grp = hdf5_cases_file['/iteration_cases/driver/data']
+        self.assertEqual(hdf5_cases_file['/iteration_cases/driver/metadata'].shape,
+                         (5,))
+
+        # 'late' is None in the first case, and 'vals' is empty in the
+        # first two, which are backfilled.
+        late = data_grp['comp.late']
+        self.assertEqual(late.shape, (5,))
+        self.assertTrue(np.isnan(late[0]))
+        self.assertEqual(list(late[1:]), [1., 2., 3., 4.])
+
+        vals = data_grp['comp.vals']
+        self.assertEqual(vals.shape, (5, 4))
+        self.assertEqual(list(vals[0]), [0, 0, 0, 0])
+        self.assertEqual(list(vals[3]), [0, 1, 2, 0])
+        self.assertEqual(list(vals[4]), [0, 1, 2, 3])
+
+        # 'grow' gets longer with each case.
+        grow = data_grp['comp.grow']
+        self.assertEqual(grow.shape, (5, 5))
+        self.assertEqual(list(grow[4]), [0., 1., 2., 3., 4.])
+        self.assertEqual(list(grow[1][:2]), [0., 1.])
+        self.assertTrue(np.isnan(grow[1][2:]).all())
+
 
 # class CompWithStringOutput(Component):
 #     n = Int(0, iotype='in')
@@ -13,7 +13,7 @@ from cStringIO import StringIO
 
 from openmdao.main import __version__
 from openmdao.main.api import Assembly, Component, Case, VariableTree, set_as_top
-from openmdao.main.datatypes.api import Array, Instance, List, VarTree
+from openmdao.main.datatypes.api import Array, Float, Instance, List, VarTree
 from openmdao.test.execcomp import ExecComp
 from openmdao.lib.casehandlers.api import JSONCaseRecorder, BSONCaseRecorder, verify_json, CaseDataset
 
@@ -43,6 +43,16 @@ class LoadsComp(Component):
     def execute(self):
         self.loads_out = self.loads_in
 
+class FailingComp(Component):
+    x = Float(iotype='in')
+    z = Float(iotype='out')
+
+    def execute(self):
+        if self.x > 10:
+            raise RuntimeError('x too big')
+        self.z = self.x
+
+
 class ComplexClass:
     def __init__(self, realpart, imagpart):
         self.r = realpart
@@ -194,6 +204,52 @@ class TestCase(unittest.TestCase):
                out.write(sout.getvalue())
         verify_json(self, sout, 'nested.json')
 
+    def test_buffered(self):
+        # Buffered output, written in the background, matches unbuffered.
+        json_out = StringIO()
+        json_buffered = StringIO()
+        bson_out = os.path.join(self.tempdir, 'cases.bson')
+        bson_buffered = os.path.join(self.tempdir, 'buffered.bson')
+        self.top.recorders = [
+            JSONCaseRecorder(json_out),
+            JSONCaseRecorder(json_buffered, buffer_size=3, background=True),
+            BSONCaseRecorder(bson_out),
+            BSONCaseRecorder(bson_buffered, buffer_size=4, buffer_time=60,
+                             background=True)]
+        self.top.run()
+
+        expected = json.loads(json_out.getvalue())
+        actual = json.loads(json_buffered.getvalue())
+        self.assertEqual(sorted(actual.keys()), sorted(expected.keys()))
+        for i in range(10):
+            case = 'iteration_case_%s' % (i+1)
+            self.assertEqual(actual[case]['data'], expected[case]['data'])
+
+        expected = CaseDataset(bson_out, 'bson')
+        actual = CaseDataset(bson_buffered, 'bson')
+        names = ['comp1.x', 'comp1.y', 'comp1.z', 'comp2.z']
+        self.assertEqual(actual.data.vars(names).fetch(),
+                         expected.data.vars(names).fetch())
+
+    def test_buffered_exception(self):
+        # Cases buffered before an exception are still written.
+        self.top.add('comp2', FailingComp())
+        self.top.connect('comp1.z', 'comp2.x')
+        self.top.driver.workflow.add('comp2')
+
+        path = os.path.join(self.tempdir, 'cases.json')
+        self.top.recorders = [JSONCaseRecorder(path, buffer_size=100,
+                                               background=True)]
+        try:
+            self.top.run()
+        except RuntimeError as exc:
+            self.assertTrue('x too big' in str(exc))
+        else:
+            self.fail('Expected RuntimeError')
+
+        cases = CaseDataset(path, 'json').data.vars('comp1.x').fetch()
+        self.assertEqual([case[0] for case in cases], [0., 1., 2., 3.])
+
     def test_close(self):
         sout = StringIO()
         self.top.recorders = [JSONCaseRecorder(sout)]
@@ -178,6 +178,82 @@ class TestCase(unittest.TestCase):
             self.assertEqual(len(vars[name]), 242)
             assert_rel_error(self, vars[name][-1], iteration_case_242[name], 0.001)
 
+    def test_arrays(self):
+        # Arrays per variable match the rows.
+        names = self.cds.data.var_names().fetch()
+        rows = self.cds.data.fetch()
+        arrays = self.cds.data.as_arrays().fetch()
+        self.assertEqual(sorted(arrays.keys()), sorted(names))
+        for j, name in enumerate(names):
+            self.assertEqual(len(arrays[name]), 242)
+            for row, value in zip(rows, arrays[name]):
+                if isinstance(row[j], (int, float)):
+                    if isnan(row[j]):
+                        self.assertTrue(isnan(value))
+                    else:
+                        self.assertEqual(row[j], value)
+                else:
+                    # repr() so dicts of arrays compare.
+                    self.assertEqual(repr(row[j]), repr(value))
+
+        self.assertEqual(arrays['sub.x1'].dtype, np.float64)
+        self.assertEqual(arrays['sub.dis1.exec_count'].dtype, np.int64)
+        self.assertEqual(arrays['sub.dis1.itername'].dtype, object)
+        # Missing values in the first cases widen int columns to float.
+        self.assertEqual(arrays['half.exec_count'].dtype, np.float64)
+        self.assertTrue(isnan(arrays['half.exec_count'][0]))
+
+        arrays = self.cds.data.driver('driver').vars('sub.x1', 'half.z2a') \
+                                               .as_arrays().fetch()
+        self.assertEqual(sorted(arrays.keys()), ['half.z2a', 'sub.x1'])
+        self.assertEqual(arrays['sub.x1'].shape, (58,))
+        assert_rel_error(self, arrays['half.z2a'][-1], -9.1082956132942171e-13, 0.001)
+
+    def test_reductions(self):
+        names = ['sub.x1', 'sub.dis1.exec_count', 'sub.dis1.itername']
+        stats = self.cds.data.vars(names).stats()
+        self.assertEqual(sorted(stats.keys()), sorted(names[:2]))
+        values = self.cds.data.vars('sub.x1').as_arrays().fetch()['sub.x1']
+        values = values[~np.isnan(values)]
+        self.assertEqual(stats['sub.x1']['count'], len(values))
+        self.assertEqual(stats['sub.x1']['min'], values.min())
+        self.assertEqual(stats['sub.x1']['max'], values.max())
+        assert_rel_error(self, stats['sub.x1']['mean'], values.mean(), 1e-10)
+        assert_rel_error(self, stats['sub.x1']['std'], values.std(), 1e-10)
+
+        counts, edges = self.cds.data.histogram('sub.x1', bins=5)
+        expected = np.histogram(values, bins=5)
+        self.assertEqual(list(counts), list(expected[0]))
+        self.assertEqual(list(edges), list(expected[1]))
+        counts, edges = self.cds.data.histogram('sub.x1', 4, (0., 2.))
+        self.assertEqual(list(counts),
+                         list(np.histogram(values, 4, (0., 2.))[0]))
+
+        # Optimum is infeasible in the cases recorded during finite
+        # differencing, so the feasible filter matters.
+        query = self.cds.data.driver('driver')
+        self.assertEqual(len(query.fetch()), 58)
+        feasible = self.cds.data.driver('driver').feasible().fetch()
+        self.assertEqual(len(feasible), 15)
+        for row in feasible:
+            self.assertTrue(row['_pseudo_1.out0'] <= 0)
+            self.assertTrue(row['_pseudo_2.out0'] <= 0)
+
+        best = self.cds.data.driver('driver').argmin()
+        assert_rel_error(self, best['_pseudo_0.out0'], 3.17395906387, 1e-6)
+        best = self.cds.data.driver('driver').feasible().argmin()
+        assert_rel_error(self, best['_pseudo_0.out0'], 3.18339, 0.001)
+        self.assertEqual(best['_pseudo_0.out0'],
+                         min(row['_pseudo_0.out0'] for row in feasible))
+
+        best = self.cds.data.driver('driver').feasible('_pseudo_2.out0') \
+                                             .argmin('_pseudo_0.out0')
+        assert_rel_error(self, best['_pseudo_0.out0'], 3.17395906387, 1e-6)
+
+        query = self.cds.data.vars('sub.x1')
+        self.assertRaises(ValueError, query.argmin, 'half.z2a')
+        self.assertRaises(ValueError, query.feasible().write, 'junk.json')
+
     def test_parent(self):
         # Full dataset names by specifying a top-level case.
         parent = 'a00d3f9e-86ba-11e4-8001-20c9d0478eff'  # iteration_case_6
@@ -315,6 +391,68 @@ class TestCase(unittest.TestCase):
         cases = CaseDataset(path, 'json').data.fetch()
         self.assertEqual(len(cases), 7)
 
+    def test_index(self):
+        # Recorders save an index of case offsets which queries seek with.
+        top = set_as_top(SellarMDF())
+        top.recorders = [JSONCaseRecorder('cases.json'),
+                         BSONCaseRecorder('cases.bson')]
+        top.run()
+        top.recorders[0].close()
+        top.recorders[1].close()
+        self.assertTrue(os.path.exists('cases.json.idx'))
+        self.assertTrue(os.path.exists('cases.bson.idx'))
+
+        for filename, format in (('cases.json', 'json'),
+                                 ('cases.bson', 'bson')):
+            cds = CaseDataset(filename, format)
+            self.assertTrue(cds._reader._index is not None)
+            all_cases = dict((case['_id'], case) for case in cds.data.fetch())
+            self.assertEqual(len(cds._reader.index()), len(all_cases))
+
+            # Saved offsets match those found by reading through the file.
+            scanned = CaseDataset(filename, format)
+            scanned._reader._index = None
+            self.assertEqual(cds._reader.index().offsets,
+                             scanned._reader.index().offsets)
+
+            # Rows found by seeking match those from reading everything.
+            def check(cases):
+                for case in cases:
+                    expected = all_cases[case['_id']]
+                    for name in case.keys():
+                        # repr() so NaNs and arrays compare.
+                        self.assertEqual(repr(case[name]), repr(expected[name]))
+
+            cases = cds.data.driver('sub.driver').fetch()
+            self.assertEqual(len(cases),
+                             len(cds._reader.index().by_driver[cases[0]['_driver_id']]))
+            check(cases)
+
+            top_cases = cds.data.driver('driver').fetch()
+            parent = top_cases[2]['_id']
+            cases = cds.data.parent_case(parent).fetch()
+            self.assertEqual(cases[-1]['_id'], parent)
+            self.assertTrue(len(cases) > 1)
+            check(cases)
+
+            cases = cds.data.case(parent).fetch()
+            self.assertEqual(len(cases), 1)
+            check(cases)
+
+            try:
+                cds.data.case('no-such-case').fetch()
+            except ValueError as exc:
+                self.assertEqual(str(exc), 'No case with _id no-such-case')
+            else:
+                self.fail('Expected ValueError')
+
+        # An index that doesn't match the case file is ignored.
+        with open('cases.json', 'a') as out:
+            out.write('\n')
+        cds = CaseDataset('cases.json', 'json')
+        self.assertTrue(cds._reader._index is None)
+        self.assertEqual(len(cds.data.driver('driver').fetch()), len(top_cases))
+
     def test_restore(self):
         # Restore from case, run, verify outputs match expected.
         top = set_as_top(SellarMDF())
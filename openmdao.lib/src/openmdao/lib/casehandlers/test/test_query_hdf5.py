@@ -252,6 +252,42 @@ class TestCase(unittest.TestCase):
         # Just a note if you want to see the iternames for the cases
         #print self.cds.data.vars('_itername').fetch()
 
+    def test_query_columns(self):
+        from openmdao.lib.casehandlers.api import CaseDatasetHDF5, HDF5CaseRecorder
+
+        prob = set_as_top(SellarMDF())
+        prob.recorders = [HDF5CaseRecorder('sellar_columns.hdf5', buffer_size=7)]
+        prob.run()
+        cds = CaseDatasetHDF5('sellar_columns.hdf5', 'hdf5')
+
+        self.assertEqual(cds.data.var_names().fetch(),
+                         self.cds.data.var_names().fetch())
+        self.assertEqual(len(cds.data.fetch()), 74)
+
+        # Driver queries are sliced straight from the columns, check them
+        # against the same cases picked out of the full time history.
+        names = ['sub.x1', 'half.z2a', '_itername']
+        cases = cds.data.driver('driver').vars(names).fetch()
+        history = [case for case in cds.data.vars(names + ['_driver_name']).fetch()
+                   if case['_driver_name'] == 'driver']
+        self.assertEqual(len(cases), 10)
+        self.assertEqual(len(cases), len(history))
+        for case, expected in zip(cases, history):
+            for name in names:
+                self.assertEqual(case[name], expected[name])
+
+        by_var = cds.data.driver('driver').vars(names).by_variable().fetch()
+        for i, name in enumerate(names):
+            self.assertEqual(list(by_var[name]), [case[name] for case in cases])
+
+        cases = cds.data.driver('driver').fetch()
+        for exp, act in zip([24.80392945, 10.98035435], cases[0]['sub.states']['y']):
+            self.assertAlmostEqual(exp, act)
+
+        cases = cds.data.case('3-sub.5').fetch()
+        self.assertEqual(1, len(cases))
+        self.assertAlmostEqual(cases[0]['sub.dis1.y1'], 8.18917513654)
+
 
 
 
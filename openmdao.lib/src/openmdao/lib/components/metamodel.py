@@ -46,7 +46,9 @@ class MetaModel(Component):
                              "retrains with the new dataset whenever the "
                              "training data values are changed. When set to "
                              "True, the new data is appended to the old data "
-                             "and all of the data is used to train.")
+                             "and all of the data is used to train. "
+                             "Surrogates that provide an update(X, Y) "
+                             "method are then given only the new data.")
 
     def __init__(self, params=None, responses=None):
         super(MetaModel, self).__init__()
@@ -82,6 +84,10 @@ class MetaModel(Component):
 
         self._train = True
 
+        # keeps track of the surrogate last trained for each output, and the
+        # number of training points it has seen
+        self._trained_surrogates = {}
+
         # keeps track of which sur_<name> slots are full
         self._surrogate_overrides = set()
 
@@ -170,7 +176,17 @@ class MetaModel(Component):
                 surrogate = self._get_surrogate(name)
 
                 if surrogate is not None:
-                    surrogate.train(input_data, output_data)
+                    # Only new rows were appended to data this surrogate
+                    # was trained on, so it can be updated incrementally.
+                    trained, n_trained = \
+                        self._trained_surrogates.get(name, (None, 0))
+                    if base > 0 and trained is surrogate and \
+                       n_trained == base and hasattr(surrogate, 'update'):
+                        surrogate.update(input_data[base:], output_data[base:])
+                    else:
+                        surrogate.train(input_data, output_data)
+                    self._trained_surrogates[name] = (surrogate,
+                                                      len(output_data))
 
             self._train = False
 
@@ -1,12 +1,123 @@
 """ Pareto Filter -- finds non-dominated cases. """
 
 # pylint: disable-msg=E0611,F0401
-from numpy import array, zeros
+from numpy import array, zeros, arange, inf, lexsort, argsort, cumsum, \
+                  concatenate, flatnonzero, minimum
 
-from openmdao.main.datatypes.api import Array, List, VarTree
+from openmdao.main.datatypes.api import Array, Bool, List, VarTree
 from openmdao.main.api import Component
 from openmdao.main.vartree import VariableTree
 
+
+def _nondominated(values):
+    """Returns a boolean mask of the rows of `values` (one case per row, one
+    response per column) that are not dominated by any other row. A row is
+    dominated by another row that is no greater in every column and not
+    identical to it."""
+
+    n_points, n_response = values.shape
+    if n_points == 0:
+        return zeros(0, dtype=bool)
+
+    if n_response == 1:
+        return values[:, 0] == values[:, 0].min()
+
+    if n_response == 2:
+        # Sweep in order of the first response. A case is dominated by an
+        # earlier case if its second response is no smaller, or by a case
+        # with the same first response and a smaller second response.
+        order = lexsort((values[:, 1], values[:, 0]))
+        first = values[order, 0]
+        second = values[order, 1]
+
+        starts = flatnonzero(concatenate(([True], first[1:] != first[:-1])))
+        group = cumsum(concatenate(([False], first[1:] != first[:-1])))
+        group_min = second[starts]
+        prev_min = concatenate(([inf], minimum.accumulate(group_min)[:-1]))
+
+        dominated = (second > group_min[group]) | (prev_min[group] <= second)
+        mask = zeros(n_points, dtype=bool)
+        mask[order] = ~dominated
+        return mask
+
+    # Visit the cases in order of increasing sum, so that dominating cases
+    # usually come first, and keep an archive of the current front.
+    order = lexsort(values.T[::-1])
+    order = order[argsort(values[order].sum(axis=1), kind='mergesort')]
+    front = []
+    for idx in order:
+        point = values[idx]
+        if front:
+            archive = values[front]
+            no_greater = (archive <= point).all(axis=1)
+            if (no_greater & (archive < point).any(axis=1)).any():
+                continue
+            beaten = (archive >= point).all(axis=1) & \
+                     (archive > point).any(axis=1)
+            if beaten.any():
+                front = [j for j, out in zip(front, beaten) if not out]
+        front.append(idx)
+
+    mask = zeros(n_points, dtype=bool)
+    mask[front] = True
+    return mask
+
+
+def _constrained_nondominated(values, cons):
+    """Returns a boolean mask of the cases that are not dominated once the
+    constraints are taken into account. Satisfied constraints (<= 0) beat
+    unsatisfied ones. Among cases with unsatisfied constraints, a case whose
+    constraint violations are all no smaller than another's is dominated by
+    it, and cases with identical violations are compared by their responses.
+    """
+
+    n_points = len(values)
+    feasible = (cons <= 0).all(axis=1)
+
+    mask = zeros(n_points, dtype=bool)
+    if feasible.any():
+        idx = flatnonzero(feasible)
+        mask[idx] = _nondominated(values[idx])
+        return mask
+
+    violation = cons.clip(0, inf)
+    candidates = _nondominated(violation)
+
+    # Cases with the same violations are compared by their responses.
+    idx = flatnonzero(candidates)
+    order = lexsort(violation[idx].T[::-1])
+    idx = idx[order]
+    sorted_violation = violation[idx]
+    new_group = concatenate(([True], (sorted_violation[1:] !=
+                                      sorted_violation[:-1]).any(axis=1)))
+    bounds = concatenate((flatnonzero(new_group), [len(idx)]))
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        group = idx[start:end]
+        mask[group] = _nondominated(values[group])
+
+    return mask
+
+
+def _pareto_ranks(values, cons=None):
+    """Returns the Pareto rank of every case, where 1 is the Pareto frontier,
+    2 is the frontier once the first is removed, and so on."""
+
+    ranks = zeros(len(values), dtype=int)
+    remaining = arange(len(values))
+    rank = 0
+    while len(remaining):
+        rank += 1
+        if cons is None:
+            mask = _nondominated(values[remaining])
+        else:
+            mask = _constrained_nondominated(values[remaining],
+                                             cons[remaining])
+        ranks[remaining[mask]] = rank
+        remaining = remaining[~mask]
+
+    return ranks
+
+
 class ParetoFilter(Component):
     """Takes a set of cases and filters out the subset of cases which are
     pareto optimal. Assumes that smaller values for model responses are
@@ -40,6 +151,17 @@ class ParetoFilter(Component):
     pareto_outcons = Array(
         iotype='out', desc='Array of constraints values in the Pareto frontier')
 
+    compute_ranks = Bool(False, iotype='in',
+                         desc='If True, also compute the Pareto rank of '
+                              'every case.')
+
+    pareto_ranks = Array(dtype=int, iotype='out',
+                         desc='Pareto rank of every case, in the order they '
+                              'were given. The Pareto frontier has rank 1, '
+                              'the frontier of the remaining cases has rank '
+                              '2, and so on. Only computed if compute_ranks '
+                              'is True.')
+
     def __init__(self, params=None, responses=None, constraints=None):
         super(ParetoFilter, self).__init__()
 
@@ -92,56 +214,6 @@ class ParetoFilter(Component):
         self.pareto_outputs = zeros((1, len(responses)))
         self.pareto_outcons = zeros((1, len(constraints)))
 
-    def _is_dominated(self, y1, y2):
-        """Tests to see if the point y1 is dominated by the point y2.
-        True if y1 is dominated by y2, False otherwise.
-        """
-        if y1 == y2:
-            return False
-        for a, b in zip(y1, y2):
-            if a is None:
-                return True
-            if b is None:
-                return False
-            if a < b:
-                return False
-
-        return True
-
-    def _is_constrained(self, c1, c2):
-        """ Tests to see if the point c1 is more or less constrained than
-        the point c2.
-        Constrained means value <= 0.0
-        return:
-            isLessConstrained,
-                True if some constraint values are more than c2
-                while the other same, False Otherwise
-            NeedCompareDominating
-                True if need furthermore comparison of dominating
-                False otherwise
-        """
-        c1 = array(c1)
-        c2 = array(c2)
-        b1 = (c1 <= 0).all()
-        b2 = (c2 <= 0).all()
-
-        if b1 and b2:
-            return False, True
-        if b1 and not b2:
-            return False, False
-        if not b1 and b2:
-            return True, False
-        if not b2 and not b1:
-            c1[c1<=0] = 0
-            c2[c2<=0] = 0
-            if (c1 == c2).all():
-                return False, True
-
-            if (c1 >= c2).all():
-                return True, False
-            else:
-                return False, False
-
     def execute(self):
         """Returns an araray of pareto optimal points and their response values.
         """
@@ -166,25 +238,13 @@ class ParetoFilter(Component):
                 point.append(data[i][j])
             all_points.append(point)
 
-        nondominated_output = list(all_points)
-
-        # Optionally, get our inputs data once, then rearrange it after.
-        if n_param > 0:
-
-            data = []
-            for varname in self._param_names:
-                name = "params.%s" % varname
-                val = self.get(name)
-                data.append(val)
-
-            nondominated_input = []
-            for j in xrange(0, n_points):
-                point = []
-                for i in xrange(0, n_param):
-                    point.append(data[i][j])
-                nondominated_input.append(point)
+        # Missing responses are worse than any value.
+        values = zeros((n_points, n_response))
+        for i, column in enumerate(data):
+            values[:, i] = [inf if val is None else val for val in column]
 
         # Optionally, get our constraint data once, then rearrange it after.
+        cons = None
         if n_constraint > 0:
 
             data = []
@@ -199,38 +259,33 @@ class ParetoFilter(Component):
                 for i in xrange(0, n_constraint):
                     point.append(data[i][j])
                 all_cons.append(point)
-            nondominated_constraint = list(all_cons)
 
+            cons = array(all_cons, dtype=float).reshape(n_points,
+                                                        n_constraint)
 
             # Find non-dominated points with constraint filtering
-            nd_input_list = []
-            for j, (point1, cons1) in enumerate(zip(all_points, all_cons)):
-                for point2, cons2 in zip(nondominated_output,
-                                  nondominated_constraint):
-                    is_less_cons, need_comp = self._is_constrained(cons1, cons2)
-                    if is_less_cons or \
-                       (need_comp and self._is_dominated(point1, point2)):
-                        nondominated_output.remove(point1)
-                        nondominated_constraint.remove(cons1)
-                        nd_input_list.append(j)
-                        break
+            mask = _constrained_nondominated(values, cons)
         else:
             # Find non-dominated points directly
-            nd_input_list = []
-            for j, point1 in enumerate(all_points):
-                for point2 in nondominated_output:
-                    if self._is_dominated(point1, point2):
-                        nondominated_output.remove(point1)
-                        nd_input_list.append(j)
-                        break
+            mask = _nondominated(values)
 
-        self.pareto_outputs = array(nondominated_output)
+        keep = flatnonzero(mask)
+        self.pareto_outputs = array([all_points[j] for j in keep])
 
+        # Optionally, get our inputs data once, then rearrange it after.
         if n_param > 0:
-            data = [nondominated_input[j] for j in xrange(0, n_points) \
-                    if j not in nd_input_list]
-            self.pareto_inputs = array(data)
-        if n_constraint > 0:
-            self.pareto_outcons = array(nondominated_constraint)
 
+            data = []
+            for varname in self._param_names:
+                name = "params.%s" % varname
+                val = self.get(name)
+                data.append(val)
+
+            self.pareto_inputs = array([[data[i][j] for i in xrange(n_param)]
+                                        for j in keep])
+
+        if n_constraint > 0:
+            self.pareto_outcons = array([all_cons[j] for j in keep])
 
+        if self.compute_ranks:
+            self.pareto_ranks = _pareto_ranks(values, cons)
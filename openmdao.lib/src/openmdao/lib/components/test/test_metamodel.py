@@ -118,6 +118,54 @@ class MetaModelTestCase(unittest.TestCase):
         assert_rel_error(self, model.meta.y1, 2.0, .00001)
         assert_rel_error(self, model.meta.y2, 4.0, .00001)
 
+    def test_warm_start_update(self):
+
+        model = set_as_top(Assembly())
+        model.add('meta', MetaModel(params=('x1', 'x2'),
+                                    responses=('y1', 'y2')))
+        model.driver.workflow.add('meta')
+        model.meta.default_surrogate = KrigingSurrogate()
+        model.meta.surrogates['y2'] = ResponseSurface()
+        model.meta.warm_restart = True
+
+        model.meta.params.x1 = [1.0, 3.0, 2.0]
+        model.meta.params.x2 = [1.0, 4.0, 2.5]
+        model.meta.responses.y1 = [3.0, 1.0, 2.5]
+        model.meta.responses.y2 = [1.0, 7.0, 3.0]
+
+        model.meta.x1 = 2.0
+        model.meta.x2 = 3.0
+        model.meta.run()
+
+        kriging = model.meta._get_surrogate('y1')
+        thetas = kriging.thetas.copy()
+
+        # The Kriging surrogate is updated with the new point, keeping its
+        # thetas, while the response surface is trained again.
+        model.meta.params.x1 = [2.0]
+        model.meta.params.x2 = [3.0]
+        model.meta.responses.y1 = [2.0]
+        model.meta.responses.y2 = [4.0]
+        model.meta.run()
+
+        self.assertTrue(model.meta._get_surrogate('y1') is kriging)
+        self.assertEqual(kriging.n, 4)
+        self.assertEqual(kriging._n_updated, 1)
+        self.assertTrue(all(kriging.thetas == thetas))
+        assert_rel_error(self, model.meta.y1.mu, 2.0, .00001)
+        assert_rel_error(self, model.meta.y2, 4.0, .00001)
+
+        # A new surrogate has to be trained on all of the data.
+        model.meta.surrogates['y1'] = KrigingSurrogate()
+        model.meta.params.x1 = [4.0]
+        model.meta.params.x2 = [1.0]
+        model.meta.responses.y1 = [0.5]
+        model.meta.responses.y2 = [2.0]
+        model.meta.run()
+
+        self.assertEqual(model.meta.surrogates['y1'].n, 5)
+        self.assertEqual(model.meta.surrogates['y1']._n_updated, 0)
+
     def test_multi_surrogate_models_bad_surrogate_dict(self):
 
         model = set_as_top(Assembly())
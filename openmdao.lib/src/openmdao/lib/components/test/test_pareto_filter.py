@@ -2,6 +2,8 @@
 
 import unittest
 
+from numpy.random import RandomState
+
 from openmdao.lib.components.pareto_filter import ParetoFilter
 
 
@@ -59,7 +61,38 @@ class ParetoFilterTests(unittest.TestCase):
         self.assertEqual(1, pf.pareto_outcons[0, 0])
         self.assertTrue(pf.pareto_outcons.shape == (1, 1))
 
+    def test_3d(self):
+        values = RandomState(10).randint(0, 5, (200, 3))
+
+        pf = ParetoFilter(params=('i',), responses=('x', 'y', 'z'))
+        pf.params.i = range(200)
+        pf.responses.x = list(values[:, 0])
+        pf.responses.y = list(values[:, 1])
+        pf.responses.z = list(values[:, 2])
+        pf.execute()
+
+        expected = [i for i, point in enumerate(values)
+                    if not any((other <= point).all() and
+                               (other < point).any() for other in values)]
+        self.assertEqual(expected, list(pf.pareto_inputs[:, 0]))
+
+    def test_ranks(self):
+        pf = ParetoFilter(responses=('x', 'y'))
+        pf.responses.x = [1,1,2,2,2,3,3,3]
+        pf.responses.y = [2,3,1,2,3,1,2,3]
+        pf.execute()
+        self.assertEqual(pf.pareto_ranks.shape, (0, ))
+
+        pf.compute_ranks = True
+        pf.execute()
+        self.assertEqual([1, 2, 1, 2, 3, 2, 3, 4], list(pf.pareto_ranks))
 
+        pf = ParetoFilter(responses=('x',), constraints=('c',))
+        pf.responses.x = [1,1,1,2,2,2,3,3,3]
+        pf.constraints.c = [1,1,3,-2,-1,2,0,-1,-1]
+        pf.compute_ranks = True
+        pf.execute()
+        self.assertEqual([3, 3, 5, 1, 1, 4, 2, 2, 2], list(pf.pareto_ranks))
 
 
 if __name__ == "__main__":
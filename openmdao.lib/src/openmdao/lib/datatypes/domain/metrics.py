@@ -8,10 +8,15 @@ under need not match its class name.
 Metrics may be used with 1D, 2D, or 3D Cartesian coordinates. They may also
 be used with polar (2D) or cylindrical (3D) coordinates. :meth:`calculate`
 should be prepared for this.
+
+Metrics may also provide :meth:`calculate_region`, which is used in place of
+:meth:`calculate` to evaluate a whole region at once.
 """
 
 from math import sqrt
 
+import numpy
+
 from openmdao.units.units import PhysicalQuantity
 
 from openmdao.lib.datatypes.domain.zone import CYLINDRICAL
@@ -43,6 +48,10 @@ def register_metric(name, cls, integrate, geometry='any'):
         :meth:`dimensionalize` is called with the accumulated value.
         It should return a :class:`PhysicalQuantity` for the dimensionalized
         value.
+        `cls` may also contain :meth:`calculate_region`, called with
+        `(loc, geom)` where `loc` is a tuple of slices into the zone variable
+        arrays and `geom` holds arrays of the corresponding geometry values.
+        It should return an array of metric values with the region's shape.
 
     integrate: bool
         If True, then calculated values are integrated, not averaged.
@@ -78,11 +87,15 @@ class %(cls_name)s(object):
     """ Computes %(var_name)s. """
 
     def __init__(self, zone, zone_name, reference_state):
-        self.%(var_name)s = zone.flow_solution.%(var_name)s.item
+        self.%(var_name)s = zone.flow_solution.%(var_name)s
 
     def calculate(self, loc, length):
         """ Return metric value. """
-        return self.%(var_name)s(*loc)
+        return self.%(var_name)s.item(*loc)
+
+    def calculate_region(self, loc, length):
+        """ Return array of metric values. """
+        return numpy.asarray(self.%(var_name)s[loc], dtype=float)
 
     def dimensionalize(self, value):
         """ Return dimensional `value`. """
@@ -92,6 +105,24 @@ register_metric('%(var_name)s', %(cls_name)s, False, 'any')
 ''' % {'var_name': var_name, 'cls_name': cls_name}
 
 
+class _FlowMetric(object):
+    """
+    Base for metrics calculated from flow solution variables.
+    Subclasses implement :meth:`_calculate` in terms of a `get` function
+    which returns flow variable data for the location being evaluated,
+    so the same code handles single points and whole regions.
+    """
+
+    def calculate(self, loc, geom):
+        """ Return metric value. """
+        return self._calculate(lambda arr: arr.item(*loc), geom)
+
+    def calculate_region(self, loc, geom):
+        """ Return array of metric values. """
+        return self._calculate(lambda arr: numpy.asarray(arr[loc], dtype=float),
+                               geom)
+
+
 class Area(object):
     """ Computes area of mesh surface. """
 
@@ -116,6 +147,14 @@ class Area(object):
         sc3 *= self.aref
         return sqrt(sc1*sc1 + sc2*sc2 + sc3*sc3)
 
+    def calculate_region(self, loc, normal):
+        """ Return array of metric values. """
+        sc1, sc2, sc3 = normal
+        sc1 = sc1 * self.aref
+        sc2 = sc2 * self.aref
+        sc3 = sc3 * self.aref
+        return numpy.sqrt(sc1*sc1 + sc2*sc2 + sc3*sc3)
+
     def dimensionalize(self, value):
         """ Return dimensional `value`. """
         return PhysicalQuantity(value, self.units)
@@ -128,7 +167,7 @@ class Length(object):
 
     def __init__(self, zone, zone_name, reference_state):
         if reference_state is None:
-            self.units = None
+            self.lref = 1.
         else:
             try:
                 lref = reference_state['length_reference']
@@ -142,6 +181,10 @@ class Length(object):
         """ Return metric value. """
         return length * self.lref
 
+    def calculate_region(self, loc, length):
+        """ Return array of metric values. """
+        return length * self.lref
+
     def dimensionalize(self, value):
         """ Return dimensional `value`. """
         return PhysicalQuantity(value, self.units)
@@ -149,7 +192,7 @@ class Length(object):
 register_metric('length', Length, True, 'curve')
 
 
-class MassFlow(object):
+class MassFlow(_FlowMetric):
     """ Computes mass flow across a mesh surface. """
 
     def __init__(self, zone, zone_name, reference_state):
@@ -186,23 +229,23 @@ class MassFlow(object):
             self.momref = momref.value
 
         if cylindrical:
-            self.mom_c1 = None if momentum.z is None else momentum.z.item
-            self.mom_c2 = momentum.r.item
-            self.mom_c3 = momentum.t.item
+            self.mom_c1 = momentum.z
+            self.mom_c2 = momentum.r
+            self.mom_c3 = momentum.t
         else:
-            self.mom_c1 = momentum.x.item
-            self.mom_c2 = None if momentum.y is None else momentum.y.item
-            self.mom_c3 = None if momentum.z is None else momentum.z.item
-
-    def calculate(self, loc, normal):
-        """ Return metric value. """
-        rvu = 0. if self.mom_c1 is None else self.mom_c1(*loc) * self.momref
-        rvv = 0. if self.mom_c2 is None else self.mom_c2(*loc) * self.momref
-        rvw = 0. if self.mom_c3 is None else self.mom_c3(*loc) * self.momref
+            self.mom_c1 = momentum.x
+            self.mom_c2 = momentum.y
+            self.mom_c3 = momentum.z
+
+    def _calculate(self, get, normal):
+        """ Return metric value(s), using `get` to access flow variables. """
+        rvu = 0. if self.mom_c1 is None else get(self.mom_c1) * self.momref
+        rvv = 0. if self.mom_c2 is None else get(self.mom_c2) * self.momref
+        rvw = 0. if self.mom_c3 is None else get(self.mom_c3) * self.momref
         sc1, sc2, sc3 = normal
-        sc1 *= self.aref
-        sc2 *= self.aref
-        sc3 *= self.aref
+        sc1 = sc1 * self.aref
+        sc2 = sc2 * self.aref
+        sc3 = sc3 * self.aref
         return rvu*sc1 + rvv*sc2 + rvw*sc3
 
     def dimensionalize(self, value):
@@ -212,7 +255,7 @@ class MassFlow(object):
 register_metric('mass_flow', MassFlow, True, 'surface')
 
 
-class CorrectedMassFlow(object):
+class CorrectedMassFlow(_FlowMetric):
     """ Computes corrected mass flow across a mesh surface. """
 
     def __init__(self, zone, zone_name, reference_state):
@@ -222,15 +265,15 @@ class CorrectedMassFlow(object):
         # 'pressure' required until we can determine dimensionalized
         # static pressure from 'Q' variables.
         try:
-            self.density = flow.density.item
+            self.density = flow.density
             momentum = flow.momentum
-            self.pressure = flow.pressure.item
+            self.pressure = flow.pressure
         except AttributeError:
             vnames = ('density', 'momentum', 'pressure')
             raise AttributeError('For corrected_mass_flow, zone %s is missing'
                                  ' one or more of %s.' % (zone_name, vnames))
         try:
-            self.gam = flow.gamma.item
+            self.gam = flow.gamma
         except AttributeError:
             self.gam = None  # Use passed-in scalar gamma.
 
@@ -271,29 +314,29 @@ class CorrectedMassFlow(object):
         self.tstd = tstd.value
 
         if cylindrical:
-            self.mom_c1 = None if momentum.z is None else momentum.z.item
-            self.mom_c2 = momentum.r.item
-            self.mom_c3 = momentum.t.item
+            self.mom_c1 = momentum.z
+            self.mom_c2 = momentum.r
+            self.mom_c3 = momentum.t
         else:
-            self.mom_c1 = momentum.x.item
-            self.mom_c2 = None if momentum.y is None else momentum.y.item
-            self.mom_c3 = None if momentum.z is None else momentum.z.item
-
-    def calculate(self, loc, normal):
-        """ Return metric value. """
-        rho = self.density(*loc) * self.rhoref
-        rvu = 0. if self.mom_c1 is None else self.mom_c1(*loc) * self.momref
-        rvv = 0. if self.mom_c2 is None else self.mom_c2(*loc) * self.momref
-        rvw = 0. if self.mom_c3 is None else self.mom_c3(*loc) * self.momref
-        ps = self.pressure(*loc) * self.pref
+            self.mom_c1 = momentum.x
+            self.mom_c2 = momentum.y
+            self.mom_c3 = momentum.z
+
+    def _calculate(self, get, normal):
+        """ Return metric value(s), using `get` to access flow variables. """
+        rho = get(self.density) * self.rhoref
+        rvu = 0. if self.mom_c1 is None else get(self.mom_c1) * self.momref
+        rvv = 0. if self.mom_c2 is None else get(self.mom_c2) * self.momref
+        rvw = 0. if self.mom_c3 is None else get(self.mom_c3) * self.momref
+        ps = get(self.pressure) * self.pref
         if self.gam is not None:
-            gamma = self.gam(*loc)
+            gamma = get(self.gam)
         else:
             gamma = self.gamma
         sc1, sc2, sc3 = normal
-        sc1 *= self.aref
-        sc2 *= self.aref
-        sc3 *= self.aref
+        sc1 = sc1 * self.aref
+        sc2 = sc2 * self.aref
+        sc3 = sc3 * self.aref
         w = rvu*sc1 + rvv*sc2 + rvw*sc3
 
         u2 = (rvu*rvu + rvv*rvv + rvw*rvw) / (rho*rho)
@@ -304,7 +347,7 @@ class CorrectedMassFlow(object):
 
         pt = ps * pow(1. + (gamma-1.)/2. * mach2, gamma/(gamma-1.))
 
-        return w * sqrt(tt/self.tstd) / (pt/self.pstd)
+        return w * numpy.sqrt(tt/self.tstd) / (pt/self.pstd)
 
     def dimensionalize(self, value):
         """ Dimensionalize `value`. """
@@ -313,7 +356,7 @@ class CorrectedMassFlow(object):
 register_metric('corrected_mass_flow', CorrectedMassFlow, True, 'surface')
 
 
-class StaticPressure(object):
+class StaticPressure(_FlowMetric):
     """ Computes weighted static pressure for a mesh region. """
 
     def __init__(self, zone, zone_name, reference_state):
@@ -321,20 +364,20 @@ class StaticPressure(object):
         cylindrical = zone.coordinate_system == CYLINDRICAL
 
         try:  # Some codes have this directly available.
-            self.pressure = flow.pressure.item
+            self.pressure = flow.pressure
         except AttributeError:
             self.pressure = None
             try:  # Look for typical Q variables.
-                self.density = flow.density.item
+                self.density = flow.density
                 momentum = flow.momentum
-                self.energy = flow.energy_stagnation_density.item
+                self.energy = flow.energy_stagnation_density
             except AttributeError:
                 vnames = ('pressure', 'density', 'momentum',
                           'energy_stagnation_density')
                 raise AttributeError('For pressure, zone %s is missing'
                                      ' one or more of %s.' % (zone_name, vnames))
         try:
-            self.gam = flow.gamma.item
+            self.gam = flow.gamma
         except AttributeError:
             self.gam = None  # Use passed-in scalar gamma.
 
@@ -376,26 +419,26 @@ class StaticPressure(object):
 
         if self.pressure is None:
             if cylindrical:
-                self.mom_c1 = None if momentum.z is None else momentum.z.item
-                self.mom_c2 = momentum.r.item
-                self.mom_c3 = momentum.t.item
+                self.mom_c1 = momentum.z
+                self.mom_c2 = momentum.r
+                self.mom_c3 = momentum.t
             else:
-                self.mom_c1 = momentum.x.item
-                self.mom_c2 = None if momentum.y is None else momentum.y.item
-                self.mom_c3 = None if momentum.z is None else momentum.z.item
+                self.mom_c1 = momentum.x
+                self.mom_c2 = momentum.y
+                self.mom_c3 = momentum.z
 
-    def calculate(self, loc, geom):
-        """ Return metric value. """
+    def _calculate(self, get, geom):
+        """ Return metric value(s), using `get` to access flow variables. """
         if self.pressure is not None:
-            return self.pressure(*loc) * self.pref
+            return get(self.pressure) * self.pref
         else:
-            rho = self.density(*loc) * self.rhoref
-            vu = 0. if self.mom_c1 is None else self.mom_c1(*loc) * self.momref / rho
-            vv = 0. if self.mom_c2 is None else self.mom_c2(*loc) * self.momref / rho
-            vw = 0. if self.mom_c3 is None else self.mom_c3(*loc) * self.momref / rho
-            e0 = self.energy(*loc) * self.e0ref / rho
+            rho = get(self.density) * self.rhoref
+            vu = 0. if self.mom_c1 is None else get(self.mom_c1) * self.momref / rho
+            vv = 0. if self.mom_c2 is None else get(self.mom_c2) * self.momref / rho
+            vw = 0. if self.mom_c3 is None else get(self.mom_c3) * self.momref / rho
+            e0 = get(self.energy) * self.e0ref / rho
             if self.gam is not None:
-                gamma = self.gam(*loc)
+                gamma = get(self.gam)
             else:
                 gamma = self.gamma
 
@@ -408,7 +451,7 @@ class StaticPressure(object):
 register_metric('pressure', StaticPressure, False)
 
 
-class TotalPressure(object):
+class TotalPressure(_FlowMetric):
     """ Computes weighted total pressure for a mesh region. """
 
     def __init__(self, zone, zone_name, reference_state):
@@ -416,24 +459,24 @@ class TotalPressure(object):
         cylindrical = zone.coordinate_system == CYLINDRICAL
 
         try:
-            self.density = flow.density.item
+            self.density = flow.density
             momentum = flow.momentum
         except AttributeError:
             vnames = ('density', 'momentum')
             raise AttributeError('For pressure_stagnation, zone %s is missing'
                              ' one or more of %s.' % (zone_name, vnames))
         try:
-            self.pressure = flow.pressure.item
+            self.pressure = flow.pressure
         except AttributeError:
             self.pressure = None
             try:
-                self.energy = flow.energy_stagnation_density.item
+                self.energy = flow.energy_stagnation_density
             except AttributeError:
                 vnames = ('pressure', 'energy_stagnation_density')
                 raise AttributeError('For pressure_stagnation, zone %s is missing'
                                      ' one or more of %s.' % (zone_name, vnames))
         try:
-            self.gam = flow.gamma.item
+            self.gam = flow.gamma
         except AttributeError:
             self.gam = None  # Use passed-in scalar gamma.
 
@@ -468,30 +511,30 @@ class TotalPressure(object):
             self.pref = pref.value
 
         if cylindrical:
-            self.mom_c1 = None if momentum.z is None else momentum.z.item
-            self.mom_c2 = momentum.r.item
-            self.mom_c3 = momentum.t.item
+            self.mom_c1 = momentum.z
+            self.mom_c2 = momentum.r
+            self.mom_c3 = momentum.t
         else:
-            self.mom_c1 = momentum.x.item
-            self.mom_c2 = None if momentum.y is None else momentum.y.item
-            self.mom_c3 = None if momentum.z is None else momentum.z.item
-
-    def calculate(self, loc, geom):
-        """ Return metric value. """
-        rho = self.density(*loc) * self.rhoref
-        vu = 0. if self.mom_c1 is None else self.mom_c1(*loc) * self.momref / rho
-        vv = 0. if self.mom_c2 is None else self.mom_c2(*loc) * self.momref / rho
-        vw = 0. if self.mom_c3 is None else self.mom_c3(*loc) * self.momref / rho
+            self.mom_c1 = momentum.x
+            self.mom_c2 = momentum.y
+            self.mom_c3 = momentum.z
+
+    def _calculate(self, get, geom):
+        """ Return metric value(s), using `get` to access flow variables. """
+        rho = get(self.density) * self.rhoref
+        vu = 0. if self.mom_c1 is None else get(self.mom_c1) * self.momref / rho
+        vv = 0. if self.mom_c2 is None else get(self.mom_c2) * self.momref / rho
+        vw = 0. if self.mom_c3 is None else get(self.mom_c3) * self.momref / rho
         if self.gam is not None:
-            gamma = self.gam(*loc)
+            gamma = get(self.gam)
         else:
             gamma = self.gamma
 
         u2 = vu*vu + vv*vv + vw*vw
         if self.pressure is not None:
-            ps = self.pressure(*loc) * self.pref
+            ps = get(self.pressure) * self.pref
         else:
-            e0 = self.energy(*loc) * self.e0ref / rho
+            e0 = get(self.energy) * self.e0ref / rho
             ps = (gamma-1.) * rho * (e0 - 0.5*u2)
         a2 = (gamma * ps) / rho
         mach2 = u2 / a2
@@ -504,7 +547,7 @@ class TotalPressure(object):
 register_metric('pressure_stagnation', TotalPressure, False)
 
 
-class StaticTemperature(object):
+class StaticTemperature(_FlowMetric):
     """ Computes weighted static temperature for a mesh region. """
 
     def __init__(self, zone, zone_name, reference_state):
@@ -512,23 +555,23 @@ class StaticTemperature(object):
         cylindrical = zone.coordinate_system == CYLINDRICAL
 
         try:
-            self.density = flow.density.item
+            self.density = flow.density
         except AttributeError:
             raise AttributeError('For temperature, zone %s is missing'
                                  ' density.' % zone_name)
         try:
-            self.pressure = flow.pressure.item
+            self.pressure = flow.pressure
         except AttributeError:
             self.pressure = None
             try:  # Look for typical Q variables.
                 momentum = flow.momentum
-                self.energy = flow.energy_stagnation_density.item
+                self.energy = flow.energy_stagnation_density
             except AttributeError:
                 vnames = ('pressure', 'momentum', 'energy_stagnation_density')
                 raise AttributeError('For temperature, zone %s is missing'
                                      ' one or more of %s.' % (zone_name, vnames))
         try:
-            self.gam = flow.gamma.item
+            self.gam = flow.gamma
         except AttributeError:
             self.gam = None  # Use passed-in scalar gamma.
 
@@ -569,26 +612,26 @@ class StaticTemperature(object):
 
         if self.pressure is None:
             if cylindrical:
-                self.mom_c1 = None if momentum.z is None else momentum.z.item
-                self.mom_c2 = momentum.r.item
-                self.mom_c3 = momentum.t.item
+                self.mom_c1 = momentum.z
+                self.mom_c2 = momentum.r
+                self.mom_c3 = momentum.t
             else:
-                self.mom_c1 = momentum.x.item
-                self.mom_c2 = None if momentum.y is None else momentum.y.item
-                self.mom_c3 = None if momentum.z is None else momentum.z.item
+                self.mom_c1 = momentum.x
+                self.mom_c2 = momentum.y
+                self.mom_c3 = momentum.z
 
-    def calculate(self, loc, geom):
-        """ Return metric value. """
-        rho = self.density(*loc) * self.rhoref
+    def _calculate(self, get, geom):
+        """ Return metric value(s), using `get` to access flow variables. """
+        rho = get(self.density) * self.rhoref
         if self.pressure is not None:
-            ps = self.pressure(*loc) * self.pref
+            ps = get(self.pressure) * self.pref
         else:
-            vu = 0. if self.mom_c1 is None else self.mom_c1(*loc) * self.momref / rho
-            vv = 0. if self.mom_c2 is None else self.mom_c2(*loc) * self.momref / rho
-            vw = 0. if self.mom_c3 is None else self.mom_c3(*loc) * self.momref / rho
-            e0 = self.energy(*loc) * self.e0ref / rho
+            vu = 0. if self.mom_c1 is None else get(self.mom_c1) * self.momref / rho
+            vv = 0. if self.mom_c2 is None else get(self.mom_c2) * self.momref / rho
+            vw = 0. if self.mom_c3 is None else get(self.mom_c3) * self.momref / rho
+            e0 = get(self.energy) * self.e0ref / rho
             if self.gam is not None:
-                gamma = self.gam(*loc)
+                gamma = get(self.gam)
             else:
                 gamma = self.gamma
             ps = (gamma-1.) * rho * (e0 - 0.5*(vu*vu + vv*vv + vw*vw))
@@ -601,7 +644,7 @@ class StaticTemperature(object):
 register_metric('temperature', StaticTemperature, False)
 
 
-class TotalTemperature(object):
+class TotalTemperature(_FlowMetric):
     """ Computes weighted total temperature for a mesh region. """
 
     def __init__(self, zone, zone_name, reference_state):
@@ -609,24 +652,24 @@ class TotalTemperature(object):
         cylindrical = zone.coordinate_system == CYLINDRICAL
 
         try:
-            self.density = flow.density.item
+            self.density = flow.density
             momentum = flow.momentum
         except AttributeError:
             vnames = ('density', 'momentum')
             raise AttributeError('For temperature_stagnation, zone %s is missing'
                                  ' one or more of %s.' % (zone_name, vnames))
         try:
-            self.pressure = flow.pressure.item
+            self.pressure = flow.pressure
         except AttributeError:
             self.pressure = None
             try:
-                self.energy = flow.energy_stagnation_density.item
+                self.energy = flow.energy_stagnation_density
             except AttributeError:
                 vnames = ('pressure', 'energy_stagnation_density')
                 raise AttributeError('For temperature_stagnation, zone %s is'
                                      ' one or more of %s.' % (zone_name, vnames))
         try:
-            self.gam = flow.gamma.item
+            self.gam = flow.gamma
         except AttributeError:
             self.gam = None  # Use passed-in scalar gamma.
 
@@ -662,30 +705,30 @@ class TotalTemperature(object):
             self.tref = tref
 
         if cylindrical:
-            self.mom_c1 = None if momentum.z is None else momentum.z.item
-            self.mom_c2 = momentum.r.item
-            self.mom_c3 = momentum.t.item
+            self.mom_c1 = momentum.z
+            self.mom_c2 = momentum.r
+            self.mom_c3 = momentum.t
         else:
-            self.mom_c1 = momentum.x.item
-            self.mom_c2 = None if momentum.y is None else momentum.y.item
-            self.mom_c3 = None if momentum.z is None else momentum.z.item
-
-    def calculate(self, loc, geom):
-        """ Return metric value. """
-        rho = self.density(*loc) * self.rhoref
-        vu = 0. if self.mom_c1 is None else self.mom_c1(*loc) * self.momref / rho
-        vv = 0. if self.mom_c2 is None else self.mom_c2(*loc) * self.momref / rho
-        vw = 0. if self.mom_c3 is None else self.mom_c3(*loc) * self.momref / rho
+            self.mom_c1 = momentum.x
+            self.mom_c2 = momentum.y
+            self.mom_c3 = momentum.z
+
+    def _calculate(self, get, geom):
+        """ Return metric value(s), using `get` to access flow variables. """
+        rho = get(self.density) * self.rhoref
+        vu = 0. if self.mom_c1 is None else get(self.mom_c1) * self.momref / rho
+        vv = 0. if self.mom_c2 is None else get(self.mom_c2) * self.momref / rho
+        vw = 0. if self.mom_c3 is None else get(self.mom_c3) * self.momref / rho
         if self.gam is not None:
-            gamma = self.gam(*loc)
+            gamma = get(self.gam)
         else:
             gamma = self.gamma
 
         u2 = vu*vu + vv*vv + vw*vw
         if self.pressure is not None:
-            ps = self.pressure(*loc) * self.pref
+            ps = get(self.pressure) * self.pref
         else:
-            e0 = self.energy(*loc) * self.e0ref / rho
+            e0 = get(self.energy) * self.e0ref / rho
             ps = (gamma-1.) * rho * (e0 - 0.5*u2)
         a2 = (gamma * ps) / rho
         mach2 = u2 / a2
@@ -704,7 +747,7 @@ class Volume(object):
 
     def __init__(self, zone, zone_name, reference_state):
         if reference_state is None:
-            self.units = None
+            self.volref = 1.
         else:
             try:
                 lref = reference_state['length_reference']
@@ -719,6 +762,10 @@ class Volume(object):
         """ Return metric value. """
         return volume * self.volref
 
+    def calculate_region(self, loc, volume):
+        """ Return array of metric values. """
+        return volume * self.volref
+
     def dimensionalize(self, value):
         """ Return dimensional `value`. """
         return PhysicalQuantity(value, self.units)
@@ -32,6 +32,14 @@ unformatted: bool
 logger: Logger or None
     Used to record progress.
 
+lazy: bool
+    If True, coordinate and variable arrays are copy-on-write memory-mapped
+    views of the file rather than being read into memory. Data is only
+    read as it is accessed, so extracting or probing a region of a large
+    file only reads that region. Changes to the arrays are not written to
+    the file. The files must not be modified while the arrays are in use.
+    Requires `binary`.
+
 Default argument values are set for a typical 3D multiblock single-precision
 Fortran unformatted file.  When writing, zones are assumed in Cartesian
 coordinates with data located at the vertices.
@@ -49,7 +57,8 @@ from openmdao.lib.datatypes.domain.vector import Vector
 
 def read_plot3d_q(grid_file, q_file, multiblock=True, dim=3, blanking=False,
                   planes=False, binary=True, big_endian=False,
-                  single_precision=True, unformatted=True, logger=None):
+                  single_precision=True, unformatted=True, logger=None,
+                  lazy=False):
     """
     Returns a :class:`DomainObj` initialized from Plot3D `grid_file` and
     `q_file`.  Q variables are assigned to 'density', 'momentum', and
@@ -66,7 +75,7 @@ def read_plot3d_q(grid_file, q_file, multiblock=True, dim=3, blanking=False,
 
     domain = read_plot3d_grid(grid_file, multiblock, dim, blanking, planes,
                               binary, big_endian, single_precision,
-                              unformatted, logger)
+                              unformatted, logger, lazy)
 
     mode = 'rb' if binary else 'r'
     with open(q_file, mode) as inp:
@@ -116,14 +125,15 @@ def read_plot3d_q(grid_file, q_file, multiblock=True, dim=3, blanking=False,
             name = domain.zone_name(zone)
             logger.debug('reading data for %s', name)
             _read_plot3d_qscalars(zone, stream, logger)
-            _read_plot3d_qvars(zone, stream, planes, logger)
+            _read_plot3d_qvars(zone, stream, planes, logger, lazy)
 
     return domain
 
 
 def read_plot3d_f(grid_file, f_file, varnames=None, multiblock=True, dim=3,
                   blanking=False, planes=False, binary=True, big_endian=False,
-                  single_precision=True, unformatted=True, logger=None):
+                  single_precision=True, unformatted=True, logger=None,
+                  lazy=False):
     """
     Returns a :class:`DomainObj` initialized from Plot3D `grid_file` and
     `f_file`.  Variables are assigned to names of the form `f_N`.
@@ -138,7 +148,7 @@ def read_plot3d_f(grid_file, f_file, varnames=None, multiblock=True, dim=3,
 
     domain = read_plot3d_grid(grid_file, multiblock, dim, blanking, planes,
                               binary, big_endian, single_precision,
-                              unformatted, logger)
+                              unformatted, logger, lazy)
 
     mode = 'rb' if binary else 'r'
     with open(f_file, mode) as inp:
@@ -189,13 +199,14 @@ def read_plot3d_f(grid_file, f_file, varnames=None, multiblock=True, dim=3,
             name = domain.zone_name(zone)
             logger.debug('reading data for %s', name)
             _read_plot3d_fvars(zone, stream, dim, nvars, varnames, planes,
-                               logger)
+                               logger, lazy)
     return domain
 
 
 def read_plot3d_grid(grid_file, multiblock=True, dim=3, blanking=False,
                      planes=False, binary=True, big_endian=False,
-                     single_precision=True, unformatted=True, logger=None):
+                     single_precision=True, unformatted=True, logger=None,
+                     lazy=False):
     """
     Returns a :class:`DomainObj` initialized from Plot3D `grid_file`.
 
@@ -220,7 +231,7 @@ def read_plot3d_grid(grid_file, multiblock=True, dim=3, blanking=False,
             name = domain.zone_name(zone)
             logger.debug('reading coordinates for %s', name)
             _read_plot3d_coords(zone, stream, shape[i], blanking, planes,
-                                logger)
+                                logger, lazy)
     return domain
 
 
@@ -311,7 +322,7 @@ def _read_plot3d_dims(stream, dim, f_file=False):
         return (imax, jmax, kmax)
 
 
-def _read_plot3d_coords(zone, stream, shape, blanking, planes, logger):
+def _read_plot3d_coords(zone, stream, shape, blanking, planes, logger, lazy):
     """ Reads coordinates (& blanking) from given Plot3D stream. """
     if blanking:
         raise NotImplementedError('blanking not supported yet')
@@ -332,18 +343,13 @@ def _read_plot3d_coords(zone, stream, shape, blanking, planes, logger):
             logger.warning('unexpected coords recordlength'
                            ' %d vs. %d', reclen, expected)
 
-    zone.grid_coordinates.x = stream.read_floats(shape, order='Fortran')
-    logger.debug('    x min %g, max %g',
-                 zone.grid_coordinates.x.min(), zone.grid_coordinates.x.max())
-
-    zone.grid_coordinates.y = stream.read_floats(shape, order='Fortran')
-    logger.debug('    y min %g, max %g',
-                 zone.grid_coordinates.y.min(), zone.grid_coordinates.y.max())
-
+    zone.grid_coordinates.x = _read_plot3d_array(stream, shape, 'x',
+                                                 logger, lazy)
+    zone.grid_coordinates.y = _read_plot3d_array(stream, shape, 'y',
+                                                 logger, lazy)
     if dim > 2:
-        zone.grid_coordinates.z = stream.read_floats(shape, order='Fortran')
-        logger.debug('    z min %g, max %g',
-                     zone.grid_coordinates.z.min(), zone.grid_coordinates.z.max())
+        zone.grid_coordinates.z = _read_plot3d_array(stream, shape, 'z',
+                                                     logger, lazy)
 
     if stream.unformatted:
         reclen2 = stream.read_recordmark()
@@ -363,7 +369,7 @@ def _read_plot3d_qscalars(zone, stream, logger):
     zone.flow_solution.time = time
 
 
-def _read_plot3d_qvars(zone, stream, planes, logger):
+def _read_plot3d_qvars(zone, stream, planes, logger, lazy):
     """ Reads 'density', 'momentum' and 'energy_stagnation_density'. """
     if planes:
         raise NotImplementedError('planar format not supported yet')
@@ -384,27 +390,18 @@ def _read_plot3d_qvars(zone, stream, planes, logger):
             logger.warning('unexpected Q variables recordlength'
                            ' %d vs. %d', reclen, expected)
     name = 'density'
-    arr = stream.read_floats(shape, order='Fortran')
-    logger.debug('    %s min %g, max %g', name, arr.min(), arr.max())
+    arr = _read_plot3d_array(stream, shape, name, logger, lazy)
     zone.flow_solution.add_array(name, arr)
 
     vec = Vector()
-
-    vec.x = stream.read_floats(shape, order='Fortran')
-    logger.debug('    momentum.x min %g, max %g', vec.x.min(), vec.x.max())
-
-    vec.y = stream.read_floats(shape, order='Fortran')
-    logger.debug('    momentum.y min %g, max %g', vec.y.min(), vec.y.max())
-
+    vec.x = _read_plot3d_array(stream, shape, 'momentum.x', logger, lazy)
+    vec.y = _read_plot3d_array(stream, shape, 'momentum.y', logger, lazy)
     if dim > 2:
-        vec.z = stream.read_floats(shape, order='Fortran')
-        logger.debug('    momentum.z min %g, max %g', vec.z.min(), vec.z.max())
-
+        vec.z = _read_plot3d_array(stream, shape, 'momentum.z', logger, lazy)
     zone.flow_solution.add_vector('momentum', vec)
 
     name = 'energy_stagnation_density'
-    arr = stream.read_floats(shape, order='Fortran')
-    logger.debug('    %s min %g, max %g', name, arr.min(), arr.max())
+    arr = _read_plot3d_array(stream, shape, name, logger, lazy)
     zone.flow_solution.add_array(name, arr)
 
     if stream.unformatted:
@@ -414,7 +411,8 @@ def _read_plot3d_qvars(zone, stream, planes, logger):
                            ' %d vs. %d', reclen2, reclen)
 
 
-def _read_plot3d_fvars(zone, stream, dim, nvars, varnames, planes, logger):
+def _read_plot3d_fvars(zone, stream, dim, nvars, varnames, planes, logger,
+                       lazy):
     """ Reads 'function' variables. """
     if planes:
         raise NotImplementedError('planar format not supported yet')
@@ -439,9 +437,8 @@ def _read_plot3d_fvars(zone, stream, dim, nvars, varnames, planes, logger):
             name = varnames[i]
         else:
             name = 'f_%d' % (i+1)
-        arr = stream.read_floats(shape, order='Fortran')
+        arr = _read_plot3d_array(stream, shape, name, logger, lazy)
         zone.flow_solution.add_array(name, arr)
-        logger.debug('    %s min %g, max %g', name, arr.min(), arr.max())
 
     if stream.unformatted:
         reclen2 = stream.read_recordmark()
@@ -450,6 +447,19 @@ def _read_plot3d_fvars(zone, stream, dim, nvars, varnames, planes, logger):
                            ' %d vs. %d', reclen2, reclen)
 
 
+def _read_plot3d_array(stream, shape, name, logger, lazy):
+    """
+    Reads a Fortran-ordered float array from given Plot3D stream.
+    If `lazy`, returns a memory-mapped view and skips logging the range
+    (which would read all the data).
+    """
+    if lazy:
+        return stream.map_floats(shape, order='Fortran')
+    arr = stream.read_floats(shape, order='Fortran')
+    logger.debug('    %s min %g, max %g', name, arr.min(), arr.max())
+    return arr
+
+
 def write_plot3d_q(domain, grid_file, q_file, planes=False, binary=True,
                    big_endian=False, single_precision=True, unformatted=True,
                    logger=None):
@@ -3,13 +3,13 @@ Support for calculating one or more scalar averages across one or more
 regions in a domain.
 """
 
-from math import cos, sin, sqrt
+import numpy
 
 from openmdao.lib.datatypes.domain.flow import CELL_CENTER
 from openmdao.lib.datatypes.domain.zone import CYLINDRICAL
 from openmdao.lib.datatypes.domain.metrics import get_metric, list_metrics, \
                                                   create_scalar_metric
-_SCHEMES = ('area', 'mass')
+_SCHEMES = ('area', 'mass', 'volume')
 
 # TODO: account for ghost cells in index calculations.
 
@@ -37,7 +37,10 @@ def mesh_probe(domain, regions, variables, weighting_scheme='area'):
 
     weighting_scheme: string
         Specifies how individual values are weighted. Legal values are
-        'area' for area averaging and 'mass' for mass averaging.
+        'area' for area averaging, 'mass' for mass averaging, and 'volume'
+        for volume averaging. 'volume' is only valid for volume regions.
+        For volume regions 'area' averaging is also weighted by cell volume
+        and 'mass' averaging is weighted by cell mass.
 
     Returns a list of metric values in the order of the `variables` list.
 
@@ -74,6 +77,11 @@ def mesh_probe(domain, regions, variables, weighting_scheme='area'):
     if weighting_scheme not in _SCHEMES:
         raise ValueError('Unknown/unsupported weighting scheme %r'
                          % weighting_scheme)
+    if weighting_scheme == 'volume':
+        for i, region in enumerate(_regions):
+            if _get_dimension(region) in (1, 2):
+                raise ValueError("region %d: weighting scheme 'volume' is not"
+                                 " valid for a surface or curve" % (i+1))
 
     # Collect weights.
     if need_weights:
@@ -238,275 +246,104 @@ def _calc_weights(scheme, domain, regions):
         if dim == 3:
             zone_weights = _volume_weights(scheme, domain, region)
         elif dim == 2:
-            if len(region) == 7:
-                zone_weights = _surface_weights_3d(scheme, domain, region)
-            else:
-                zone_weights = _surface_weights_2d(scheme, domain, region)
+            zone_weights = _surface_weights(scheme, domain, region)
         elif dim == 1:
-            if len(region) == 7:
-                zone_weights = _curve_weights_3d(scheme, domain, region)
-            elif len(region) == 5:
-                zone_weights = _curve_weights_2d(scheme, domain, region)
-            else:
-                zone_weights = _curve_weights_1d(scheme, domain, region)
+            zone_weights = _curve_weights(scheme, domain, region)
         else:
-            zone_weights = [1.]
+            zone_weights = numpy.ones(1)
 
         zone_name = region[0]
         zone = getattr(domain, zone_name)
-        zone_weights *= zone.symmetry_instances  # Adjust for symmetry.
         if zone_name in weights:
             raise RuntimeError('Zone %r used more than once' % zone_name)
         else:
             weights[zone_name] = zone_weights
-        weight_total += sum(zone_weights)
+        # Adjust for symmetry (metric values are adjusted in mesh_probe).
+        weight_total += zone_weights.sum() * zone.symmetry_instances
 
     return (weights, weight_total)
 
 
 def _volume_weights(scheme, domain, region):
-    """ Returns weights for a mesh volume. """
-    raise NotImplementedError('_volume_weights')
-
-
-def _surface_weights_3d(scheme, domain, region):
-    """ Returns 3D (index space) weights for a mesh surface. """
-    zone_name, imin, imax, jmin, jmax, kmin, kmax = region
+    """
+    Returns flattened weights for a mesh volume. Weights are cell volumes,
+    or cell masses for 'mass' averaging.
+    """
+    zone_name = region[0]
     zone = getattr(domain, zone_name)
-    grid = zone.grid_coordinates
     flow = zone.flow_solution
     cylindrical = zone.coordinate_system == CYLINDRICAL
     cell_center = flow.grid_location == CELL_CENTER
-
-    if cylindrical:
-        c1 = grid.z.item
-        c2 = grid.r.item
-        c3 = grid.t.item
-    else:
-        c1 = grid.x.item
-        c2 = grid.y.item
-        c3 = grid.z.item
+    c1, c2, c3 = _coordinates(zone)
 
     if scheme == 'mass':
         try:
-            if cylindrical:
-                mom_c1 = flow.momentum.z.item
-                mom_c2 = flow.momentum.r.item
-                mom_c3 = flow.momentum.t.item
-            else:
-                mom_c1 = flow.momentum.x.item
-                mom_c2 = flow.momentum.y.item
-                mom_c3 = flow.momentum.z.item
+            density = flow.density
         except AttributeError:
             raise AttributeError("For mass averaging zone %s is missing"
-                                 " 'momentum'." % zone_name)
-    if imin == imax:
-        imax += 1
-        face_normal = _iface_normal
-        face_value = _iface_cell_value if cell_center else _iface_node_value
-    elif jmin == jmax:
-        jmax += 1
-        face_normal = _jface_normal
-        face_value = _jface_cell_value if cell_center else _jface_node_value
-    else:
-        kmax += 1
-        face_normal = _kface_normal
-        face_value = _kface_cell_value if cell_center else _kface_node_value
+                                 " 'density'." % zone_name)
+        offsets = _volume_offsets(cell_center)
 
+    base = _region_base(region)
     weights = []
-    for i in range(imin, imax):
-        for j in range(jmin, jmax):
-            for k in range(kmin, kmax):
-                sc1, sc2, sc3 = face_normal(c1, c2, c3, i, j, k, cylindrical)
-                if scheme == 'mass':
-                    loc = (i, j, k)
-                    rvu = face_value(mom_c1, loc)
-                    rvv = face_value(mom_c2, loc)
-                    rvw = face_value(mom_c3, loc)
-                    weights.append(rvu*sc1 + rvv*sc2 + rvw*sc3)
-                else:
-                    weights.append(sqrt(sc1*sc1 + sc2*sc2 + sc3*sc3))
-    return weights
+    for block, start, stop in _blocks(base):
+        block_weights = _cell_volume(c1, c2, c3, block, cylindrical)
+        if scheme == 'mass':
+            block_weights *= _average(density, block, offsets)
+        weights.append(block_weights.ravel())
+    return numpy.concatenate(weights)
 
 
-def _surface_weights_2d(scheme, domain, region):
-    """ Returns 2D (index space) weights for a mesh surface. """
-    zone_name, imin, imax, jmin, jmax = region
+def _surface_weights(scheme, domain, region):
+    """ Returns flattened weights for a mesh surface. """
+    zone_name = region[0]
     zone = getattr(domain, zone_name)
-    grid = zone.grid_coordinates
     flow = zone.flow_solution
     cylindrical = zone.coordinate_system == CYLINDRICAL
     cell_center = flow.grid_location == CELL_CENTER
-
-    if cylindrical:
-        c1 = None if grid.z is None else grid.z.item
-        c2 = grid.r.item
-        c3 = grid.t.item
-    else:
-        c1 = grid.x.item
-        c2 = grid.y.item
-        c3 = None if grid.z is None else grid.z.item
+    c1, c2, c3 = _coordinates(zone)
 
     if scheme == 'mass':
         try:
-            if cylindrical:
-                mom_c1 = None if flow.momentum.z is None else flow.momentum.z.item
-                mom_c2 = flow.momentum.r.item
-                mom_c3 = flow.momentum.t.item
-            else:
-                mom_c1 = flow.momentum.x.item
-                mom_c2 = flow.momentum.y.item
-                mom_c3 = None if flow.momentum.z is None else flow.momentum.z.item
+            momentum = flow.momentum
         except AttributeError:
             raise AttributeError("For mass averaging zone %s is missing"
                                  " 'momentum'." % zone_name)
+        if cylindrical:
+            mom_c1, mom_c2, mom_c3 = momentum.z, momentum.r, momentum.t
+        else:
+            mom_c1, mom_c2, mom_c3 = momentum.x, momentum.y, momentum.z
 
-    weights = []
-    for i in range(imin, imax):
-        for j in range(jmin, jmax):
-                sc1, sc2, sc3 = _cell_normal(c1, c2, c3, i, j, cylindrical)
-                if scheme == 'mass':
-                    ip1 = i + 1
-                    jp1 = j + 1
-                    if cell_center:
-                        # Cell value is value.
-# FIXME: built-in ghosts
-                        rvu = 0. if mom_c1 is None else mom_c1(ip1, jp1)
-                        rvv = mom_c2(ip1, jp1)
-                        rvw = 0. if mom_c1 is None else mom_c3(ip1, jp1)
-                    else:
-                        # Average across vertices.
-                        if mom_c1 is None:
-                            rvu = 0.
-                        else:
-                            rvu = 0.25 * (mom_c1(i, j) + mom_c1(ip1, j) + \
-                                          mom_c1(i, jp1) + mom_c1(ip1, jp1))
-                        rvv = 0.25 * (mom_c2(i, j) + mom_c2(ip1, j) + \
-                                      mom_c2(i, jp1) + mom_c2(ip1, jp1))
-                        if mom_c3 is None:
-                            rvw = 0.
-                        else:
-                            rvw = 0.25 * (mom_c3(i, j) + mom_c3(ip1, j) + \
-                                          mom_c3(i, jp1) + mom_c3(ip1, jp1))
-                    weights.append(rvu*sc1 + rvv*sc2 + rvw*sc3)
-                else:
-                    weights.append(sqrt(sc1*sc1 + sc2*sc2 + sc3*sc3))
-    return weights
-
-
-def _curve_weights_3d(scheme, domain, region):
-    """ Returns 3D (index space) weights for a mesh curve. """
-    zone_name, imin, imax, jmin, jmax, kmin, kmax = region
-    zone = getattr(domain, zone_name)
-    grid = zone.grid_coordinates
-    cylindrical = zone.coordinate_system == CYLINDRICAL
-
-    if cylindrical:
-        raise NotImplementedError('curve weights for cylindrical coordinates')
-    else:
-        x = grid.x.item
-        y = grid.y.item
-        z = grid.z.item
-
+    base = _region_base(region)
+    face = _surface_axis(region)
+    sc1, sc2, sc3 = _face_normal(c1, c2, c3, base, face, cylindrical)
     if scheme == 'mass':
-        raise NotImplementedError('curve mass averaging')
-
-    along_i, along_j = False, False
-    if imin != imax:
-        along_i = True
-        jmax += 1
-        kmax += 1
-    elif jmin != jmax:
-        along_j = True
-        imax += 1
-        kmax += 1
+        offsets = _surface_offsets(len(base), face, cell_center)
+        rvu = _average(mom_c1, base, offsets)
+        rvv = _average(mom_c2, base, offsets)
+        rvw = _average(mom_c3, base, offsets)
+        weights = rvu*sc1 + rvv*sc2 + rvw*sc3
     else:
-        imax += 1
-        jmax += 1
-
-    weights = []
-    for i in range(imin, imax):
-        for j in range(jmin, jmax):
-            for k in range(kmin, kmax):
-                if along_i:
-                    dx = x(i+1, j, k) - x(i, j, k)
-                    dy = y(i+1, j, k) - y(i, j, k)
-                    dz = z(i+1, j, k) - z(i, j, k)
-                elif along_j:
-                    dx = x(i, j+1, k) - x(i, j, k)
-                    dy = y(i, j+1, k) - y(i, j, k)
-                    dz = z(i, j+1, k) - z(i, j, k)
-                else:
-                    dx = x(i, j, k+1) - x(i, j, k)
-                    dy = y(i, j, k+1) - y(i, j, k)
-                    dz = z(i, j, k+1) - z(i, j, k)
-                weights.append(sqrt(dx*dx + dy*dy + dz*dz))
-    return weights
-
+        weights = numpy.sqrt(sc1*sc1 + sc2*sc2 + sc3*sc3)
+    return weights.ravel()
 
-def _curve_weights_2d(scheme, domain, region):
-    """ Returns 2D (index space) weights for a mesh curve. """
-    zone_name, imin, imax, jmin, jmax = region
-    zone = getattr(domain, zone_name)
-    grid = zone.grid_coordinates
-    cylindrical = zone.coordinate_system == CYLINDRICAL
-
-    if cylindrical:
-        raise NotImplementedError('curve weights for cylindrical coordinates')
-    else:
-        x = grid.x.item
-        y = grid.y.item
-        z = None if grid.z is None else grid.z.item
-
-    if scheme == 'mass':
-        raise NotImplementedError('curve mass averaging')
-
-    if imin != imax:
-        along_i = True
-        jmax += 1
-    else:
-        along_i = False
-        imax += 1
 
-    weights = []
-    for i in range(imin, imax):
-        for j in range(jmin, jmax):
-                if along_i:
-                    dx = x(i+1, j) - x(i, j)
-                    dy = y(i+1, j) - y(i, j)
-                    dz = 0. if z is None else z(i+1, j) - z(i, j)
-                else:
-                    dx = x(i, j+1) - x(i, j)
-                    dy = y(i, j+1) - y(i, j)
-                    dz = 0. if z is None else z(i, j+1) - z(i, j)
-                weights.append(sqrt(dx*dx + dy*dy + dz*dz))
-    return weights
-
-
-def _curve_weights_1d(scheme, domain, region):
-    """ Returns 1D (index space) weights for a mesh curve. """
-    zone_name, imin, imax = region
+def _curve_weights(scheme, domain, region):
+    """ Returns flattened weights for a mesh curve. """
+    zone_name = region[0]
     zone = getattr(domain, zone_name)
-    grid = zone.grid_coordinates
     cylindrical = zone.coordinate_system == CYLINDRICAL
 
     if cylindrical:
         raise NotImplementedError('curve weights for cylindrical coordinates')
-    else:
-        x = grid.x.item
-        y = None if grid.y is None else grid.y.item
-        z = None if grid.z is None else grid.z.item
 
     if scheme == 'mass':
         raise NotImplementedError('curve mass averaging')
 
-    weights = []
-    for i in range(imin, imax):
-        dx = x(i+1) - x(i)
-        dy = 0. if y is None else y(i+1) - y(i)
-        dz = 0. if z is None else z(i+1) - z(i)
-        weights.append(sqrt(dx*dx + dy*dy + dz*dz))
-    return weights
+    c1, c2, c3 = _coordinates(zone)
+    base = _region_base(region)
+    edge = _curve_axis(region)
+    return _edge_length(c1, c2, c3, base, edge, cylindrical).ravel()
 
 
 def _calc_metric(name, domain, region, weights, reference_state):
@@ -528,19 +365,11 @@ def _calc_metric(name, domain, region, weights, reference_state):
     elif dim == 2:
         if geometry not in ('surface', 'any'):
             raise RuntimeError('metric %r not applicable to surfaces')
-        if len(region) == 7:
-            total = _surface_3d(metric, integrate, zone, region, weights)
-        else:
-            total = _surface_2d(metric, integrate, zone, region, weights)
+        total = _surface(metric, integrate, zone, region, weights)
     elif dim == 1:
         if geometry not in ('curve', 'any'):
             raise RuntimeError('metric %r not applicable to curves')
-        if len(region) == 7:
-            total = _curve_3d(metric, integrate, zone, region, weights)
-        elif len(region) == 5:
-            total = _curve_2d(metric, integrate, zone, region, weights)
-        else:
-            total = _curve_1d(metric, integrate, zone, region, weights)
+        total = _curve(metric, integrate, zone, region, weights)
     else:
         if geometry != 'any':
             raise RuntimeError('metric %r not applicable to points')
@@ -554,368 +383,71 @@ def _calc_metric(name, domain, region, weights, reference_state):
 
 def _volume(metric, integrate, zone, region, weights):
     """ Calculate metric on a volume. """
-    raise NotImplementedError('metric calculation on volume')
-''' Not implemented yet
-    zone_name, imin, imax, jmin, jmax, kmin, kmax = region
-    grid = zone.grid_coordinates
-    flow = zone.flow_solution
-    cylindrical = zone.coordinate_system == CYLINDRICAL
-    cell_center = flow.grid_location == CELL_CENTER
-
-    if cylindrical: 
-        c1 = grid.z.item
-        c2 = grid.r.item
-        c3 = grid.t.item
-    else:
-        c1 = grid.x.item
-        c2 = grid.y.item
-        c3 = grid.z.item
-
-    vol = None
-    weight_index = 0
-    total = 0.
-    for i in range(imin, imax):
-        for j in range(jmin, jmax):
-            for k in range(kmin, kmax):
-
-# TODO: calculate volume for integrating.
-
-                if cell_center:
-# FIXME: built-in ghosts
-                    # Cell value is value.
-                    val = metric.calculate((i+1, j+1, k+1), vol)
-                else:
-                    # Average across vertices.
-                    val  = metric.calculate((i, j, k), vol)
-                    val += metric.calculate((i, j+1, k), vol)
-                    val += metric.calculate((i, j+1, k+1), vol)
-                    val += metric.calculate((i, j, k+1), vol)
-                    val += metric.calculate((i+1, j, k), vol)
-                    val += metric.calculate((i+1, j+1, k), vol)
-                    val += metric.calculate((i+1, j+1, k+1), vol)
-                    val += metric.calculate((i+1, j, k+1), vol)
-                    val *= 0.125
-
-                if integrate:
-                    total += val
-                else:
-                    weight = weights[weight_index]
-                    weight_index += 1
-                    total += val * weight
-    return total
-'''
-
-
-def _surface_3d(metric, integrate, zone, region, weights):
-    """ Calculate metric on a 3D (index space) surface. """
-    zone_name, imin, imax, jmin, jmax, kmin, kmax = region
-    grid = zone.grid_coordinates
     flow = zone.flow_solution
     cylindrical = zone.coordinate_system == CYLINDRICAL
     cell_center = flow.grid_location == CELL_CENTER
+    if integrate:
+        c1, c2, c3 = _coordinates(zone)
 
-    if cylindrical: 
-        c1 = grid.z.item
-        c2 = grid.r.item
-        c3 = grid.t.item
-    else:
-        c1 = grid.x.item
-        c2 = grid.y.item
-        c3 = grid.z.item
-
-    if imin == imax: 
-        face = 'i'
-        imax += 1
-        get_normal = _iface_normal
-    elif jmin == jmax:
-        face = 'j'
-        jmax += 1 
-        get_normal = _jface_normal
-    else:
-        face = 'k'
-        kmax += 1
-        get_normal = _kface_normal
-
-    normal = None
-    weight_index = 0
-    total = 0.
-    for i in range(imin, imax):
-        for j in range(jmin, jmax):
-            for k in range(kmin, kmax):
-
-                if integrate:
-                    normal = get_normal(c1, c2, c3, i, j, k, cylindrical)
-    
-                if cell_center:
 # FIXME: built-in ghosts
-                    # Average across cells sharing surface.
-                    val = metric.calculate((i+1, j+1, k+1), normal)
-                    if face == 'i':
-                        val += metric.calculate((i, j+1, k+1), normal)
-                    elif face == 'j':
-                        val += metric.calculate((i+1, j, k+1), normal)
-                    else:
-                        val += metric.calculate((i+1, j+1, k), normal)
-                    val *= 0.5
-                else:
-                    # Average across vertices.
-                    val = metric.calculate((i, j, k), normal)
-                    if face == 'i':
-                        val += metric.calculate((i, j+1, k), normal)
-                        val += metric.calculate((i, j+1, k+1), normal)
-                        val += metric.calculate((i, j, k+1), normal)
-                    elif face == 'j':
-                        val += metric.calculate((i+1, j, k), normal)
-                        val += metric.calculate((i+1, j, k+1), normal)
-                        val += metric.calculate((i, j, k+1), normal)
-                    else:
-                        val += metric.calculate((i+1, j, k), normal)
-                        val += metric.calculate((i+1, j+1, k), normal)
-                        val += metric.calculate((i, j+1, k), normal)
-                    val *= 0.25
-
-                if integrate:
-                    total += val
-                else:
-                    weight = weights[weight_index]
-                    weight_index += 1
-                    total += val * weight
-    return total
-
-
-def _surface_2d(metric, integrate, zone, region, weights):
-    """ Calculate metric on a 2D (index space) surface. """
-    zone_name, imin, imax, jmin, jmax = region
-    grid = zone.grid_coordinates
-    flow = zone.flow_solution
-    cylindrical = zone.coordinate_system == CYLINDRICAL
-    cell_center = flow.grid_location == CELL_CENTER
-
-    if cylindrical: 
-        c1 = None if grid.z is None else grid.z.item
-        c2 = grid.r.item
-        c3 = grid.t.item
-    else:
-        c1 = grid.x.item
-        c2 = grid.y.item
-        c3 = None if grid.z is None else grid.z.item
-
-    normal = None
-    weight_index = 0
+    # Cell centered data is the cell value, vertex data is averaged across
+    # the corners of each cell.
+    offsets = _volume_offsets(cell_center)
     total = 0.
-    for i in range(imin, imax):
-        for j in range(jmin, jmax):
-
-            if integrate:
-                normal = _cell_normal(c1, c2, c3, i, j, cylindrical)
-    
-            if cell_center:
-# FIXME: built-in ghosts
-                # Cell value is value.
-                val = metric.calculate((i+1, j+1), normal)
-            else:
-                # Average across vertices.
-                val  = metric.calculate((i, j), normal)
-                val += metric.calculate((i, j+1), normal)
-                val += metric.calculate((i+1, j+1), normal)
-                val += metric.calculate((i+1, j), normal)
-                val *= 0.25
-
-            if integrate:
-                total += val
-            else:
-                weight = weights[weight_index]
-                weight_index += 1
-                total += val * weight
-    return total
-
-
-def _curve_3d(metric, integrate, zone, region, weights):
-    """ Calculate metric on a 3D (index space) curve. """
-    zone_name, imin, imax, jmin, jmax, kmin, kmax = region
-    grid = zone.grid_coordinates
-    flow = zone.flow_solution
-    cylindrical = zone.coordinate_system == CYLINDRICAL
-    cell_center = flow.grid_location == CELL_CENTER
-
-    if cylindrical: 
-        c1 = grid.z.item
-        c2 = grid.r.item
-        c3 = grid.t.item
-    else:
-        c1 = grid.x.item
-        c2 = grid.y.item
-        c3 = grid.z.item
-
-    if imin != imax:
-        edge = 'i'
-        jmax += 1
-        kmax += 1
-        get_length = _iedge_length
-    elif jmin != jmax:
-        edge = 'j'
-        imax += 1
-        kmax += 1
-        get_length = _jedge_length
-    else:
-        edge = 'k'
-        imax += 1
-        jmax += 1
-        get_length = _kedge_length
-
-    length = None
-    weight_index = 0
-    total = 0.
-    for i in range(imin, imax):
-        for j in range(jmin, jmax):
-            for k in range(kmin, kmax):
-
-                if integrate:
-                    length = get_length(c1, c2, c3, (i, j, k), cylindrical)
-
-                if cell_center:
-# FIXME: built-in ghosts
-                    # Average across cells sharing edge.
-                    val = metric.calculate((i+1, j+1, k+1), length)
-                    if edge == 'i':
-                        val += metric.calculate((i+1, j, k+1), length)
-                        val += metric.calculate((i+1, j+1, k), length)
-                        val += metric.calculate((i+1, j, k), length)
-                    elif edge == 'j':
-                        val += metric.calculate((i, j+1, k+1), length)
-                        val += metric.calculate((i+1, j+1, k), length)
-                        val += metric.calculate((i, j+1, k), length)
-                    else:
-                        val += metric.calculate((i, j+1, k+1), length)
-                        val += metric.calculate((i+1, j, k+1), length)
-                        val += metric.calculate((i, j, k+1), length)
-                    val *= 0.25
-                else:
-                    # Average across vertices.
-                    val = metric.calculate((i, j, k), length)
-                    if edge == 'i':
-                        val += metric.calculate((i+1, j, k), length)
-                    elif edge == 'j':
-                         val +=metric.calculate((i, j+1, k), length)
-                    else:
-                         val +=metric.calculate((i, j, k+1), length)
-                    val *= 0.5
-
-                if integrate:
-                    total += val
-                else:
-                    weight = weights[weight_index]
-                    weight_index += 1
-                    total += val * weight
+    for block, start, stop in _blocks(_region_base(region)):
+        if integrate:
+            volume = _cell_volume(c1, c2, c3, block, cylindrical)
+            block_weights = None
+        else:
+            volume = None
+            block_weights = weights[start:stop]
+        values = _metric_values(metric, block, offsets, volume)
+        total += _total(values, integrate, block_weights)
     return total
 
 
-def _curve_2d(metric, integrate, zone, region, weights):
-    """ Calculate metric on a 2D (index space) curve. """
-    zone_name, imin, imax, jmin, jmax = region
-    grid = zone.grid_coordinates
+def _surface(metric, integrate, zone, region, weights):
+    """ Calculate metric on a 2D or 3D (index space) surface. """
     flow = zone.flow_solution
     cylindrical = zone.coordinate_system == CYLINDRICAL
     cell_center = flow.grid_location == CELL_CENTER
 
-    if cylindrical: 
-        c1 = None if grid.z is None else grid.z.item
-        c2 = grid.r.item
-        c3 = grid.t.item
-    else:
-        c1 = grid.x.item
-        c2 = grid.y.item
-        c3 = None if grid.z is None else grid.z.item
-
-    if imin != imax:
-        edge = 'i'
-        jmax += 1
-        get_length = _iedge_length
+    base = _region_base(region)
+    face = _surface_axis(region)
+    if integrate:
+        c1, c2, c3 = _coordinates(zone)
+        normal = _face_normal(c1, c2, c3, base, face, cylindrical)
     else:
-        edge = 'j'
-        imax += 1
-        get_length = _jedge_length
+        normal = None
 
-    length = None
-    weight_index = 0
-    total = 0.
-    for i in range(imin, imax):
-        for j in range(jmin, jmax):
-
-            if integrate:
-                length = get_length(c1, c2, c3, (i, j), cylindrical)
-
-            if cell_center:
 # FIXME: built-in ghosts
-                # Average across cells sharing edge.
-                val = metric.calculate((i+1, j+1), length)
-                if edge == 'i':
-                    val += metric.calculate((i+1, j), length)
-                else:
-                    val += metric.calculate((i, j+1), length)
-                val *= 0.5
-            else:
-                # Average across vertices.
-                val = metric.calculate((i, j), length)
-                if edge == 'i':
-                    val += metric.calculate((i+1, j), length)
-                else:
-                    val += metric.calculate((i, j+1), length)
-                val *= 0.5
+    # Cell centered data is averaged across cells sharing the surface,
+    # vertex data across the vertices of each face.
+    offsets = _surface_offsets(len(base), face, cell_center)
+    values = _metric_values(metric, base, offsets, normal)
+    return _total(values, integrate, weights)
 
-            if integrate:
-                total += val
-            else:
-                weight = weights[weight_index]
-                weight_index += 1
-                total += val * weight
-    return total
 
-
-def _curve_1d(metric, integrate, zone, region, weights):
-    """ Calculate metric on a 1D (index space) curve. """
-    zone_name, imin, imax = region
-    grid = zone.grid_coordinates
+def _curve(metric, integrate, zone, region, weights):
+    """ Calculate metric on a 1D, 2D or 3D (index space) curve. """
     flow = zone.flow_solution
     cylindrical = zone.coordinate_system == CYLINDRICAL
     cell_center = flow.grid_location == CELL_CENTER
 
-    if cylindrical:
-        c1 = None if grid.z is None else grid.z.item
-        c2 = grid.r.item
-        c3 = grid.t.item
+    base = _region_base(region)
+    edge = _curve_axis(region)
+    if integrate:
+        c1, c2, c3 = _coordinates(zone)
+        length = _edge_length(c1, c2, c3, base, edge, cylindrical)
     else:
-        c1 = grid.x.item
-        c2 = None if grid.y is None else grid.y.item
-        c3 = None if grid.z is None else grid.z.item
-
-    get_length = _iedge_length
-
-    length = None
-    weight_index = 0
-    total = 0.
-    for i in range(imin, imax):
-
-        if integrate:
-            length = get_length(c1, c2, c3, (i,), cylindrical)
+        length = None
 
-        if cell_center:
 # FIXME: built-in ghosts
-            # Cell value is value.
-            val = metric.calculate((i+1,), length)
-        else:
-            # Average across vertices.
-            val  = metric.calculate((i,), length)
-            val += metric.calculate((i+1,), length)
-            val *= 0.5
-
-        if integrate:
-            total += val
-        else:
-            weight = weights[weight_index]
-            weight_index += 1
-            total += val * weight
-    return total
+    # Cell centered data is averaged across cells sharing the edge,
+    # vertex data across the ends of each edge.
+    offsets = _curve_offsets(len(base), edge, cell_center)
+    values = _metric_values(metric, base, offsets, length)
+    return _total(values, integrate, weights)
 
 
 def _point(metric, zone, region):
@@ -963,268 +495,309 @@ def _point(metric, zone, region):
             return metric.calculate((imin,), None)
 
 
-def _iface_normal(c1, c2, c3, i, j, k, cylindrical):
+def _coordinates(zone):
     """
-    Return non-dimensional vector normal to I face with magnitude equal to area.
+    Return ``(c1, c2, c3)`` coordinate arrays for `zone`: ``(x, y, z)`` for
+    Cartesian or ``(z, r, t)`` for cylindrical coordinates.
+    Coordinates not present are None.
+    Arrays are returned as stored; calculations convert just the slices
+    they use to double precision, so memory-mapped coordinates are only
+    read where needed.
     """
-# FIXME: built-in ghosts
-    jp1 = j + 1
-    kp1 = k + 1
+    grid = zone.grid_coordinates
+    if zone.coordinate_system == CYLINDRICAL:
+        return (grid.z, grid.r, grid.t)
+    return (grid.x, grid.y, grid.z)
 
-    # upper-left - lower-right.
-    diag_c11 = c1(i, jp1, k) - c1(i, j, kp1)
-    diag_c21 = c2(i, jp1, k) - c2(i, j, kp1)
-    diag_c31 = c3(i, jp1, k) - c3(i, j, kp1)
 
-    # upper-right - lower-left.
-    diag_c12 = c1(i, jp1, kp1) - c1(i, j, k)
-    diag_c22 = c2(i, jp1, kp1) - c2(i, j, k)
-    diag_c32 = c3(i, jp1, kp1) - c3(i, j, k)
+def _as_double(arr):
+    """ Return `arr` as a float64 array, copying only if necessary. """
+    return numpy.asarray(arr, dtype=numpy.float64)
 
-    if cylindrical:
-        r1 = (c2(i, j, kp1) + c2(i, jp1, k  )) / 2.
-        r2 = (c2(i, j, k  ) + c2(i, jp1, kp1)) / 2.
-    else:
-        r1 = 1.
-        r2 = 1.
 
-    sc1 = -0.5 * ( r2 * diag_c21 * diag_c32 - r1 * diag_c22 * diag_c31)
-    sc2 = -0.5 * (-r2 * diag_c11 * diag_c32 + r1 * diag_c12 * diag_c31)
-    sc3 = -0.5 * (      diag_c11 * diag_c22 -      diag_c12 * diag_c21)
+def _region_base(region):
+    """
+    Return tuple of slices selecting the base index of each cell, face, or
+    edge in `region`. An index direction with no extent selects one plane.
+    """
+    limits = region[1:]
+    return tuple(slice(lo, hi+1 if lo == hi else hi)
+                 for lo, hi in zip(limits[0::2], limits[1::2]))
 
-    return (sc1, sc2, sc3)
 
+def _surface_axis(region):
+    """ Return index direction normal to a 3D surface (None for 2D). """
+    if len(region) == 7:
+        limits = region[1:]
+        for axis in range(3):
+            if limits[2*axis] == limits[2*axis+1]:
+                return axis
+    return None
 
-def _jface_normal(c1, c2, c3, i, j, k, cylindrical):
-    """
-    Return non-dimensional vector normal to J face with magnitude equal to area.
-    """
-# FIXME: built-in ghosts
-    ip1 = i + 1
-    kp1 = k + 1
 
-    # upper-left - lower-right.
-    diag_c11 = c1(ip1, j, k) - c1(i, j, kp1)
-    diag_c21 = c2(ip1, j, k) - c2(i, j, kp1)
-    diag_c31 = c3(ip1, j, k) - c3(i, j, kp1)
+def _curve_axis(region):
+    """ Return index direction along a curve. """
+    limits = region[1:]
+    for axis in range(len(limits) // 2):
+        if limits[2*axis] != limits[2*axis+1]:
+            return axis
 
-    # upper-right - lower-left.
-    diag_c12 = c1(ip1, j, kp1) - c1(i, j, k)
-    diag_c22 = c2(ip1, j, kp1) - c2(i, j, k)
-    diag_c32 = c3(ip1, j, kp1) - c3(i, j, k)
 
-    if cylindrical:
-        r1 = (c2(i, j, kp1) + c2(ip1, j, k  )) / 2.
-        r2 = (c2(i, j, k  ) + c2(ip1, j, kp1)) / 2.
-    else:
-        r1 = 1.
-        r2 = 1.
+def _offset(ndim, axes):
+    """ Return index offset of one along each of `axes`. """
+    return tuple(1 if axis in axes else 0 for axis in range(ndim))
 
-    sc1 = 0.5 * ( r2 * diag_c21 * diag_c32 - r1 * diag_c22 * diag_c31)
-    sc2 = 0.5 * (-r2 * diag_c11 * diag_c32 + r1 * diag_c12 * diag_c31)
-    sc3 = 0.5 * (      diag_c11 * diag_c22 -      diag_c12 * diag_c21)
 
-    return (sc1, sc2, sc3)
+def _shift(base, offset):
+    """ Return `base` slices shifted by index `offset`. """
+    return tuple(slice(s.start+o, s.stop+o) for s, o in zip(base, offset))
 
 
-def _kface_normal(c1, c2, c3, i, j, k, cylindrical):
+def _surface_offsets(ndim, face, cell_center):
     """
-    Return non-dimensional vector normal to K face with magnitude equal to area.
+    Return list of index offsets to average over for a surface.
+    Cell values are at the cells sharing each face, vertex values at the
+    corners of each face.
     """
-# FIXME: built-in ghosts
-    ip1 = i + 1
-    jp1 = j + 1
+    if ndim == 2:
+        if cell_center:
+            return [(1, 1)]
+        return [(0, 0), (0, 1), (1, 1), (1, 0)]
 
-    # upper-left - lower-right.
-    diag_c11 = c1(i, jp1, k) - c1(ip1, j, k)
-    diag_c21 = c2(i, jp1, k) - c2(ip1, j, k)
-    diag_c31 = c3(i, jp1, k) - c3(ip1, j, k)
+    a, b = [axis for axis in range(3) if axis != face]
+    if cell_center:
+        return [(1, 1, 1), _offset(3, (a, b))]
+    return [_offset(3, ()), _offset(3, (a,)), _offset(3, (a, b)),
+            _offset(3, (b,))]
 
-    # upper-right - lower-left.
-    diag_c12 = c1(ip1, jp1, k) - c1(i, j, k)
-    diag_c22 = c2(ip1, jp1, k) - c2(i, j, k)
-    diag_c32 = c3(ip1, jp1, k) - c3(i, j, k)
 
-    if cylindrical:
-        r1 = (c2(i, jp1, k) + c2(ip1, j,   k)) / 2.
-        r2 = (c2(i, j,   k) + c2(ip1, jp1, k)) / 2.
+def _curve_offsets(ndim, edge, cell_center):
+    """
+    Return list of index offsets to average over for a curve.
+    Cell values are at the cells sharing each edge, vertex values at the
+    ends of each edge.
+    """
+    if not cell_center:
+        return [_offset(ndim, ()), _offset(ndim, (edge,))]
+    others = [axis for axis in range(ndim) if axis != edge]
+    if ndim == 3:
+        a, b = others
+        return [_offset(3, (edge, a, b)), _offset(3, (edge, b)),
+                _offset(3, (edge, a)), _offset(3, (edge,))]
+    elif ndim == 2:
+        return [_offset(2, (0, 1)), _offset(2, (edge,))]
+    return [(1,)]
+
+
+def _average(arr, base, offsets):
+    """
+    Return average of `arr` over `base` shifted by each of `offsets`.
+    Returns 0. if `arr` is None.
+    """
+    if arr is None:
+        return 0.
+    val = _as_double(arr[_shift(base, offsets[0])])
+    for offset in offsets[1:]:
+        val = val + arr[_shift(base, offset)]
+    if len(offsets) > 1:
+        val = val * (1. / len(offsets))
+    return val
+
+
+def _metric_values(metric, base, offsets, geom):
+    """
+    Return array of `metric` values over `base`, averaged over `offsets`.
+    Metrics without :meth:`calculate_region` are evaluated point by point.
+    """
+    if hasattr(metric, 'calculate_region'):
+        val = metric.calculate_region(_shift(base, offsets[0]), geom)
+        for offset in offsets[1:]:
+            val = val + metric.calculate_region(_shift(base, offset), geom)
     else:
-        r1 = 1.
-        r2 = 1.
+        shape = tuple(s.stop - s.start for s in base)
+        val = numpy.zeros(shape)
+        for idx in numpy.ndindex(*shape):
+            if geom is None:
+                point_geom = None
+            elif isinstance(geom, tuple):
+                point_geom = tuple(float(g[idx]) for g in geom)
+            else:
+                point_geom = float(geom[idx])
+            loc = [s.start + i for s, i in zip(base, idx)]
+            for offset in offsets:
+                val[idx] += metric.calculate(tuple(l + o for l, o
+                                                   in zip(loc, offset)),
+                                             point_geom)
+    if len(offsets) > 1:
+        val = val * (1. / len(offsets))
+    return val
 
-    sc1 = 0.5 * ( r2 * diag_c21 * diag_c32 - r1 * diag_c22 * diag_c31)
-    sc2 = 0.5 * (-r2 * diag_c11 * diag_c32 + r1 * diag_c12 * diag_c31)
-    sc3 = 0.5 * (      diag_c11 * diag_c22 -      diag_c12 * diag_c21)
 
-    return (sc1, sc2, sc3)
+def _total(values, integrate, weights):
+    """ Return integrated or weighted total of `values`. """
+    if integrate:
+        return float(values.sum())
+    return float(numpy.dot(values.ravel(), weights))
+
+
+# Index directions spanning a face normal to each direction, and the
+# sign applied to make the normal point in the positive direction.
+_FACE_AXES = {0: (1, 2, -0.5), 1: (0, 2, 0.5), 2: (1, 0, 0.5),
+              None: (1, 0, 0.5)}
 
 
-def _cell_normal(c1, c2, c3, i, j, cylindrical):
+def _face_normal(c1, c2, c3, base, face, cylindrical):
     """
-    Return non-dimensional vector normal with magnitude equal to area.
+    Return non-dimensional vectors normal to each face in `base` with
+    magnitude equal to area, as a tuple of arrays.
+    `face` is the normal index direction for 3D surfaces, None for 2D.
     If there is no 'z' coordinate, `c1` will be None in cylindrical
     coordinates, otherwise `c3` will be None.
     """
 # FIXME: built-in ghosts
-    ip1 = i + 1
-    jp1 = j + 1
+    axis_a, axis_b, sign = _FACE_AXES[face]
+    ndim = len(base)
+    loc_a = _shift(base, _offset(ndim, (axis_a,)))
+    loc_b = _shift(base, _offset(ndim, (axis_b,)))
+    loc_ab = _shift(base, _offset(ndim, (axis_a, axis_b)))
+
+    def diagonal(coord, upper, lower):
+        if coord is None:
+            return 0.
+        return _as_double(coord[upper]) - coord[lower]
 
     # upper-left - lower-right.
-    diag_c11 = 0. if c1 is None else c1(i, jp1) - c1(ip1, j)
-    diag_c21 = c2(i, jp1) - c2(ip1, j)
-    diag_c31 = 0. if c3 is None else c3(i, jp1) - c3(ip1, j)
+    diag_c11 = diagonal(c1, loc_a, loc_b)
+    diag_c21 = diagonal(c2, loc_a, loc_b)
+    diag_c31 = diagonal(c3, loc_a, loc_b)
 
     # upper-right - lower-left.
-    diag_c12 = 0. if c1 is None else c1(ip1, jp1) - c1(i, j)
-    diag_c22 = c2(ip1, jp1) - c2(i, j)
-    diag_c32 = 0. if c3 is None else c3(ip1, jp1) - c3(i, j)
+    diag_c12 = diagonal(c1, loc_ab, base)
+    diag_c22 = diagonal(c2, loc_ab, base)
+    diag_c32 = diagonal(c3, loc_ab, base)
 
     if cylindrical:
-        r1 = (c2(i, jp1) + c2(ip1, j)) / 2.
-        r2 = (c2(i, j) + c2(ip1, jp1)) / 2.
+        r1 = (_as_double(c2[loc_b]) + c2[loc_a]) / 2.
+        r2 = (_as_double(c2[base]) + c2[loc_ab]) / 2.
     else:
         r1 = 1.
         r2 = 1.
 
-    sc1 = 0.5 * ( r2 * diag_c21 * diag_c32 - r1 * diag_c22 * diag_c31)
-    sc2 = 0.5 * (-r2 * diag_c11 * diag_c32 + r1 * diag_c12 * diag_c31)
-    sc3 = 0.5 * (      diag_c11 * diag_c22 -      diag_c12 * diag_c21)
+    sc1 = sign * ( r2 * diag_c21 * diag_c32 - r1 * diag_c22 * diag_c31)
+    sc2 = sign * (-r2 * diag_c11 * diag_c32 + r1 * diag_c12 * diag_c31)
+    sc3 = sign * (      diag_c11 * diag_c22 -      diag_c12 * diag_c21)
 
     return (sc1, sc2, sc3)
 
 
-def _iedge_length(c1, c2, c3, loc, cylindrical):
-    """ Return length of edge along 'i'. """
+def _edge_length(c1, c2, c3, base, edge, cylindrical):
+    """ Return array of lengths of the edges along `edge` in `base`. """
+    loc = _shift(base, _offset(len(base), (edge,)))
     if cylindrical:
-        if len(loc) > 2:
-            i, j, k = loc
-            ip1 = i + 1
-            theta = c3(ip1, j, k) - c3(i, j, k)
-            dx = c2(ip1, j, k) * cos(theta) - c2(i, j, k)
-            dy = c2(ip1, j, k) * sin(theta)
-            dz = c1(ip1, j, k) - c1(i, j, k)
-        elif len(loc) > 1:
-            i, j = loc
-            ip1 = i + 1
-            theta = c3(ip1, j) - c3(i, j)
-            dx = c2(ip1, j) * cos(theta) - c2(i, j)
-            dy = c2(ip1, j) * sin(theta)
-            dz = 0. if c1 is None else c1(ip1, j) - c1(i, j)
-        else:
-            i, = loc
-            ip1 = i + 1
-            theta = c3(ip1) - c3(i)
-            dx = c2(ip1) * cos(theta) - c2(i)
-            dy = c2(ip1) * sin(theta)
-            dz = 0. if c1 is None else c1(ip1) - c1(i)
+        theta = _as_double(c3[loc]) - c3[base]
+        radius = _as_double(c2[loc])
+        dx = radius * numpy.cos(theta) - c2[base]
+        dy = radius * numpy.sin(theta)
+        dz = 0. if c1 is None else _as_double(c1[loc]) - c1[base]
     else:
-        if len(loc) > 2:
-            i, j, k = loc
-            ip1 = i + 1
-            dx = c1(ip1, j, k) - c1(i, j, k)
-            dy = c2(ip1, j, k) - c2(i, j, k)
-            dz = c3(ip1, j, k) - c3(i, j, k)
-        elif len(loc) > 1:
-            i, j = loc
-            ip1 = i + 1
-            dx = c1(ip1, j) - c1(i, j)
-            dy = c2(ip1, j) - c2(i, j)
-            dz = 0. if c3 is None else c3(ip1, j) - c3(i, j)
-        else:
-            i, = loc
-            ip1 = i + 1
-            dx = c1(ip1) - c1(i)
-            dy = 0. if c2 is None else c2(ip1) - c2(i)
-            dz = 0. if c3 is None else c3(ip1) - c3(i)
+        dx = _as_double(c1[loc]) - c1[base]
+        dy = 0. if c2 is None else _as_double(c2[loc]) - c2[base]
+        dz = 0. if c3 is None else _as_double(c3[loc]) - c3[base]
 
-    return sqrt(dx*dx + dy*dy + dz*dz)
+    return numpy.sqrt(dx*dx + dy*dy + dz*dz)
 
 
-def _jedge_length(c1, c2, c3, loc, cylindrical):
-    """ Return length of edge along 'j'. """
-    if cylindrical:
-        if len(loc) > 2:
-            i, j, k = loc
-            jp1 = j + 1
-            theta = c3(i, jp1, k) - c3(i, j, k)
-            dx = c2(i, jp1, k) * cos(theta) - c2(i, j, k)
-            dy = c2(i, jp1, k) * sin(theta)
-            dz = c1(i, jp1, k) - c1(i, j, k)
-        else:
-            i, j = loc
-            jp1 = j + 1
-            theta = c3(i, jp1) - c3(i, j)
-            dx = c2(i, jp1) * cos(theta) - c2(i, j)
-            dy = c2(i, jp1) * sin(theta)
-            dz = 0. if c1 is None else c1(i, jp1) - c1(i, j)
-    else:
-        if len(loc) > 2:
-            i, j, k = loc
-            jp1 = j + 1
-            dx = c1(i, jp1, k) - c1(i, j, k)
-            dy = c2(i, jp1, k) - c2(i, j, k)
-            dz = c3(i, jp1, k) - c3(i, j, k)
-        else:
-            i, j = loc
-            jp1 = j + 1
-            dx = c1(i, jp1) - c1(i, j)
-            dy = c2(i, jp1) - c2(i, j)
-            dz = 0. if c3 is None else c3(i, jp1) - c3(i, j)
+def _volume_offsets(cell_center):
+    """
+    Return list of index offsets to average over for a volume.
+    Cell values are at the cell, vertex values at the corners of each cell.
+    """
+    if cell_center:
+        return [(1, 1, 1)]
+    return [(0, 0, 0), (0, 1, 0), (0, 1, 1), (0, 0, 1),
+            (1, 0, 0), (1, 1, 0), (1, 1, 1), (1, 0, 1)]
 
-    return sqrt(dx*dx + dy*dy + dz*dz)
 
+# Maximum number of cells processed at once for volume regions.
+# Keeps temporaries bounded for large zones.
+_BLOCK_CELLS = 262144
 
-def _kedge_length(c1, c2, c3, loc, cylindrical):
-    """ Return length of edge along 'k'. """
-    i, j, k = loc
-    kp1 = k + 1
-    if cylindrical:
-        theta = c3(i, j, kp1) - c3(i, j, k)
-        dx = c2(i, j, kp1) * cos(theta) - c2(i, j, k)
-        dy = c2(i, j, kp1) * sin(theta)
-        dz = c1(i, j, kp1) - c1(i, j, k)
-    else:
-        dx = c1(i, j, kp1) - c1(i, j, k)
-        dy = c2(i, j, kp1) - c2(i, j, k)
-        dz = c3(i, j, kp1) - c3(i, j, k)
 
-    return sqrt(dx*dx + dy*dy + dz*dz)
+def _blocks(base):
+    """
+    Split volume `base` along the first index direction into blocks of at
+    most about `_BLOCK_CELLS` cells. Yields ``(block, start, stop)``, where
+    `start` and `stop` bound the block's cells in the flattened region.
+    """
+    shape = [s.stop - s.start for s in base]
+    plane = shape[1] * shape[2]
+    step = max(1, _BLOCK_CELLS // max(1, plane))
+    first = base[0].start
+    for i in range(0, shape[0], step):
+        n = min(step, shape[0] - i)
+        yield ((slice(first+i, first+i+n),) + base[1:],
+               i * plane, (i+n) * plane)
 
 
-def _iface_cell_value(arr, loc):
-    """ Returns I face value for cell-centered data. """
-    i, j, k = loc
-# FIXME: built-in ghosts
-    return 0.5 * (arr(i+1, j+1, k+1) + arr(i, j+1, k+1))
+# Two-point Gauss-Legendre abscissae on [0, 1].
+_GAUSS = (0.5 - 0.5 / numpy.sqrt(3.), 0.5 + 0.5 / numpy.sqrt(3.))
 
-def _jface_cell_value(arr, loc):
-    """ Returns J face value for cell-centered data. """
-    i, j, k = loc
-# FIXME: built-in ghosts
-    return 0.5 * (arr(i+1, j+1, k+1) + arr(i+1, j, k+1))
 
-def _kface_cell_value(arr, loc):
-    """ Returns K face value for cell-centered data. """
-    i, j, k = loc
+def _cell_volume(c1, c2, c3, base, cylindrical):
+    """
+    Return array of non-dimensional volumes of the hexahedral cells in
+    `base`, treating each cell as trilinear in ``(c1, c2, c3)``.
+    The Jacobian (times radius for cylindrical coordinates) is integrated
+    by 2x2x2 Gauss quadrature, which is exact for such cells.
+    """
 # FIXME: built-in ghosts
-    return 0.5 * (arr(i+1, j+1, k+1) + arr(i+1, j+1, k))
-
-
-def _iface_node_value(arr, loc):
-    """ Returns I face value for vertex data. """
-    i, j, k = loc
-    return 0.25 * (arr(i, j+1, k+1) + arr(i, j, k+1) +
-                   arr(i, j+1, k) + arr(i, j, k))
-
-def _jface_node_value(arr, loc):
-    """ Returns J face value for vertex data. """
-    i, j, k = loc
-    return 0.25 * (arr(i+1, j, k+1) + arr(i, j, k+1) +
-                   arr(i+1, j, k) + arr(i, j, k))
-
-def _kface_node_value(arr, loc):
-    """ Returns K face value for vertex data. """
-    i, j, k = loc
-    return 0.25 * (arr(i+1, j+1, k) + arr(i, j+1, k) +
-                   arr(i+1, j, k) + arr(i, j, k))
+    coords = (c1, c2, c3)
+
+    # Derivatives along each index direction, evaluated at the four Gauss
+    # points of the other two directions: derivs[axis][(p, q)] = (d1, d2, d3).
+    derivs = []
+    for axis in range(3):
+        a, b = [other for other in range(3) if other != axis]
+        edges = {}
+        for m in (0, 1):
+            for n in (0, 1):
+                lo_axes = [other for other, o in ((a, m), (b, n)) if o]
+                lo = _shift(base, _offset(3, lo_axes))
+                hi = _shift(base, _offset(3, lo_axes + [axis]))
+                edges[m, n] = [_as_double(coord[hi]) - coord[lo]
+                               for coord in coords]
+        at_gauss = {}
+        for p, gp in enumerate(_GAUSS):
+            for q, gq in enumerate(_GAUSS):
+                factors = {(0, 0): (1.-gp) * (1.-gq), (1, 0): gp * (1.-gq),
+                           (0, 1): (1.-gp) * gq, (1, 1): gp * gq}
+                at_gauss[p, q] = [sum(factors[mn] * edges[mn][c]
+                                      for mn in edges)
+                                  for c in range(3)]
+        derivs.append(at_gauss)
 
+    if cylindrical:
+        corners = dict((offset, _as_double(c2[_shift(base, offset)]))
+                       for offset in _volume_offsets(False))
+
+    volume = 0.
+    for i, gi in enumerate(_GAUSS):
+        for j, gj in enumerate(_GAUSS):
+            for k, gk in enumerate(_GAUSS):
+                d1 = derivs[0][j, k]
+                d2 = derivs[1][i, k]
+                d3 = derivs[2][i, j]
+                jacobian = d1[0] * (d2[1]*d3[2] - d2[2]*d3[1]) \
+                         - d1[1] * (d2[0]*d3[2] - d2[2]*d3[0]) \
+                         + d1[2] * (d2[0]*d3[1] - d2[1]*d3[0])
+                if cylindrical:
+                    point = (gi, gj, gk)
+                    radius = 0.
+                    for offset, corner in corners.items():
+                        factor = 1.
+                        for o, g in zip(offset, point):
+                            factor *= g if o else 1. - g
+                        radius = radius + factor * corner
+                    jacobian = jacobian * radius
+                volume = volume + jacobian
+    return numpy.abs(volume * 0.125)
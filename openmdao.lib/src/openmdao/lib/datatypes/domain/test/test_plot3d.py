@@ -8,9 +8,12 @@ import tempfile
 import shutil
 import unittest
 
+import numpy
+
 from openmdao.lib.datatypes.domain import read_plot3d_q, write_plot3d_q, \
                                           read_plot3d_f, write_plot3d_f, \
-                                          read_plot3d_shape, write_plot3d_grid
+                                          read_plot3d_shape, write_plot3d_grid, \
+                                          mesh_probe
 
 from openmdao.lib.datatypes.domain.test.wedge import create_wedge_2d, \
                                                      create_wedge_3d
@@ -172,6 +175,63 @@ class TestCase(unittest.TestCase):
         self.assertTrue((test_flow.f_4 == wedge_flow.momentum.z).all())
         self.assertTrue((test_flow.f_5 == wedge_flow.energy_stagnation_density).all())
 
+    def test_lazy(self):
+        logging.debug('')
+        logging.debug('test_lazy')
+
+        logger = logging.getLogger()
+        wedge = create_wedge_3d((30, 20, 10), 5., 0.5, 2., 30.)
+        wedge2 = create_wedge_3d((29, 19, 9), 5., 2.5, 4., 30.)
+        wedge.add_domain(wedge2)
+        write_plot3d_q(wedge, 'unformatted.xyz', 'unformatted.q',
+                       logger=logger)
+        write_plot3d_q(wedge, 'be-binary.xyz', 'be-binary.q', logger=logger,
+                       big_endian=True, unformatted=False)
+        varnames = ('density', 'momentum', 'energy_stagnation_density')
+        write_plot3d_f(wedge, 'unformatted.xyz', 'unformatted.f', varnames,
+                       logger=logger)
+
+        # Multiblock unformatted.
+        eager = read_plot3d_q('unformatted.xyz', 'unformatted.q',
+                              logger=logger)
+        domain = read_plot3d_q('unformatted.xyz', 'unformatted.q',
+                               logger=logger, lazy=True)
+        self.assertTrue(isinstance(domain.zone_2.grid_coordinates.x,
+                                   numpy.memmap))
+        self.assertTrue(isinstance(domain.zone_2.flow_solution.momentum.z,
+                                   numpy.memmap))
+        self.assertTrue(domain.is_equivalent(eager, logger=logger))
+
+        # Extraction and probing only touch the region of interest.
+        region = (2, 2, 0, -1, 0, -1)
+        self.assertTrue(domain.zone_2.extract(*region).is_equivalent(
+                            eager.zone_2.extract(*region), logger))
+        regions = (('zone_2',) + region,)
+        variables = (('area', None), ('density', None))
+        self.assertEqual(mesh_probe(domain, regions, variables),
+                         mesh_probe(eager, regions, variables))
+
+        # Big-endian binary.
+        domain = read_plot3d_q('be-binary.xyz', 'be-binary.q', logger=logger,
+                               big_endian=True, unformatted=False, lazy=True)
+        self.assertTrue(domain.is_equivalent(eager, logger=logger))
+
+        # Function file.
+        domain = read_plot3d_f('unformatted.xyz', 'unformatted.f',
+                               logger=logger, lazy=True)
+        test_flow = domain.zone_1.flow_solution
+        self.assertTrue(isinstance(test_flow.f_5, numpy.memmap))
+        self.assertTrue((test_flow.f_5 ==
+                         eager.zone_1.flow_solution.energy_stagnation_density).all())
+
+        # Mapped arrays are copy-on-write: changes stay in memory.
+        x = eager.zone_1.grid_coordinates.x
+        domain.zone_1.translate(1., 0., 0.)
+        self.assertTrue((domain.zone_1.grid_coordinates.x == x+1.).all())
+        domain = read_plot3d_f('unformatted.xyz', 'unformatted.f',
+                               logger=logger, lazy=True)
+        self.assertTrue((domain.zone_1.grid_coordinates.x == x).all())
+
     def test_f_2d(self):
         logging.debug('')
         logging.debug('test_f_2d')
@@ -9,7 +9,8 @@ import unittest
 
 from math import pi
 
-from openmdao.lib.datatypes.domain import mesh_probe
+from openmdao.lib.datatypes.domain import mesh_probe, probe
+from openmdao.lib.datatypes.domain.metrics import register_metric
 from openmdao.lib.datatypes.domain.test import restart, overflow
 from openmdao.lib.datatypes.domain.test.cube import create_cube
 from openmdao.lib.datatypes.domain.test.wedge import create_wedge_3d
@@ -19,6 +20,31 @@ from openmdao.util.testutil import assert_raises, assert_rel_error
 ORIG_DIR = os.getcwd()
 
 
+class PointArea(object):
+    """ Area metric with only the per-point API. """
+
+    def __init__(self, zone, zone_name, reference_state):
+        pass
+
+    def calculate(self, loc, normal):
+        sc1, sc2, sc3 = normal
+        return (sc1*sc1 + sc2*sc2 + sc3*sc3) ** 0.5
+
+register_metric('point_area', PointArea, True, 'surface')
+
+
+class PointPressure(object):
+    """ Pressure metric with only the per-point API. """
+
+    def __init__(self, zone, zone_name, reference_state):
+        self.pressure = zone.flow_solution.pressure.item
+
+    def calculate(self, loc, geom):
+        return self.pressure(*loc)
+
+register_metric('point_pressure', PointPressure, False)
+
+
 class TestCase(unittest.TestCase):
     """ Test :class:`Domain` mesh_probe() operations. """
 
@@ -122,6 +148,39 @@ class TestCase(unittest.TestCase):
         assert_rel_error(self, length, 3. * 12., 0.00000001)
         self.assertEqual(density, 0.625)
 
+        # Volume.
+        regions = (('xyzzy', 0, -1, 0, -1, 0, -1),)
+        variables = (('volume', 'inch**3'), ('density', None))
+        volume, density = mesh_probe(cube, regions, variables)
+        logging.debug('volume = %g (%g ft**3)', volume, volume / 1728.)
+        logging.debug('density = %g', density)
+        assert_rel_error(self, volume, 5. * 4. * 3. * 1728., 0.00000001)
+        assert_rel_error(self, density, 2.5, 0.00000001)
+
+        # Volume averaged density is the default for volumes.
+        variables = (('density', None),)
+        self.assertEqual(mesh_probe(cube, regions, variables, 'volume'),
+                         [density])
+
+        # Mass averaged density (density varies linearly in x).
+        variables = (('density', None),)
+        density, = mesh_probe(cube, regions, variables, 'mass')
+        logging.debug('mass averaged density = %g', density)
+        assert_rel_error(self, density, 5. / 1.5, 0.001)
+
+        # Evaluate in blocks of a few planes.
+        saved = probe._BLOCK_CELLS
+        probe._BLOCK_CELLS = 100
+        try:
+            variables = (('volume', 'inch**3'), ('density', None))
+            blocked = mesh_probe(cube, regions, variables)
+            assert_rel_error(self, blocked[0], volume, 0.00000001)
+            variables = (('density', None),)
+            blocked = mesh_probe(cube, regions, variables, 'mass')
+            assert_rel_error(self, blocked[0], density, 0.00000001)
+        finally:
+            probe._BLOCK_CELLS = saved
+
     def test_wedge(self):
         logging.debug('')
         logging.debug('test_wedge')
@@ -167,6 +226,24 @@ class TestCase(unittest.TestCase):
                       area, area / 144., expected)
         assert_rel_error(self, area, expected, 0.000001)
 
+        # Volume.
+        regions = (('xyzzy', 0, -1, 0, -1, 0, -1),)
+        variables = (('volume', 'inch**3'),)
+        metrics = mesh_probe(wedge, regions, variables)
+        volume = metrics[0]
+        expected = (((pi*2.**2.) - (pi*0.5**2.)) * 30./360.) * 5. * 1728.
+        logging.debug('volume = %g (%g ft**3), expected %g',
+                      volume, volume / 1728., expected)
+        assert_rel_error(self, volume, expected, 0.00001)
+
+        # Cylindrical cells are exact.
+        wedge.xyzzy.make_cylindrical()
+        metrics = mesh_probe(wedge, regions, variables)
+        volume = metrics[0]
+        logging.debug('volume = %g (%g ft**3), expected %g',
+                      volume, volume / 1728., expected)
+        assert_rel_error(self, volume, expected, 0.0000001)
+
     def test_adpac(self):
         # Verify correct metric values for data from real scenario.
         logging.debug('')
@@ -237,6 +314,22 @@ class TestCase(unittest.TestCase):
         assert_rel_error(self, metrics[5], -149.525, 0.00001)
         assert_rel_error(self, metrics[6], -262.976, 0.00001)
 
+    def test_point_metrics(self):
+        logging.debug('')
+        logging.debug('test_point_metrics')
+
+        # Metrics without calculate_region() match the built-in metrics.
+        domain = restart.read('lpc-test', logging.getLogger())
+        variables = [('area', None), ('point_area', None),
+                     ('pressure', None), ('point_pressure', None)]
+        for regions in ([('zone_1', 2, 2, 0, -1, 0, -1),
+                         ('zone_2', 2, 2, 0, -1, 0, -1)],
+                        [('zone_1', 0, -1, 2, 2, 0, -1)],
+                        [('zone_1', 0, -1, 0, -1, 2, 2)]):
+            metrics = mesh_probe(domain, regions, variables, 'mass')
+            assert_rel_error(self, metrics[1], metrics[0], 1e-12)
+            assert_rel_error(self, metrics[3], metrics[2], 1e-12)
+
     def test_errors(self):
         logging.debug('')
         logging.debug('test_errors')
@@ -308,6 +401,10 @@ class TestCase(unittest.TestCase):
         assert_raises(self, 'mesh_probe(wedge, regions, variables, "scheme")',
                       globals(), locals(), ValueError,
                       "Unknown/unsupported weighting scheme 'scheme'")
+        assert_raises(self, 'mesh_probe(wedge, regions, variables, "volume")',
+                      globals(), locals(), ValueError,
+                      "region 1: weighting scheme 'volume' is not valid for a"
+                      " surface or curve")
 
         wedge.reference_state = None
         assert_raises(self, 'mesh_probe(wedge, regions, variables)',
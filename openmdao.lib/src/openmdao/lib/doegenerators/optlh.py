@@ -21,8 +21,8 @@ import logging
 from random import randint, shuffle, seed
 
 # pylint: disable-msg=E0611,F0401
-from numpy import array, size, sum, floor, zeros
-from numpy.linalg import norm
+from numpy import array, size, sum, floor, zeros, abs, inf, isfinite, \
+                  fill_diagonal
 
 from openmdao.main.datatypes.api import Int, Enum
 from openmdao.main.interfaces import implements, IDOEgenerator
@@ -78,6 +78,9 @@ class LHC_indivudal(object):
         self.p = p
         self.doe = doe
         self.phi = None # Morris-Mitchell sampling criterion
+        self._dist = None   # p-th power of the distance between each pair
+                            # of points, with inf on the diagonal
+        self._phi_sum = None    # phi**q, the sum of d**-q over all pairs
 
     @property
     def shape(self):
@@ -88,33 +91,43 @@ class LHC_indivudal(object):
         """Returns the Morris-Mitchell sampling criterion for this Latin hypercube."""
 
         if self.phi is None:
-            n,m = self.doe.shape
-            distdict = {}
+            if self._dist is None:
+                self._dist = self._pairwise_distances()
 
-            #calculate the norm between each pair of points in the DOE
-            # TODO: This norm takes up the majority of the computation time. It
-            # should be converted to C or ShedSkin.
-            arr = self.doe
-            for i in range(n):
-                for j in range(i+1, n):
-                    nrm = norm(arr[i]-arr[j], ord=self.p)
-                    distdict[nrm] = distdict.get(nrm, 0) + 1
+            # Each pair of points appears twice in the symmetric matrix.
+            self._phi_sum = sum(self._dist**(-float(self.q)/self.p))/2.
+            self.phi = self._phi_sum**(1.0/self.q)
 
-            distinct_d = array(distdict.keys())
-
-            #mutltiplicity array with a count of how many pairs of points have a given distance
-            J = array(distdict.values())
+        return self.phi
 
-            self.phi = sum(J*(distinct_d**(-self.q)))**(1.0/self.q)
+    def _pairwise_distances(self):
+        """Returns the p-th power of the norm between each pair of points in
+        the DOE, accumulated one column at a time."""
 
-        return self.phi
+        n, m = self.doe.shape
+        arr = array(self.doe, dtype=float)
+        dist = zeros((n, n))
+        for j in range(m):
+            dist += abs(arr[:, j:j+1] - arr[:, j])**self.p
+        fill_diagonal(dist, inf)
+        return dist
 
     def perturb(self, mutation_count):
         """ Interchanges pairs of randomly chosen elements within randomly chosen
         columns of a DOE a number of times. The result of this operation will also
         be a Latin hypercube.
+
+        Only the distances from the two swapped points change with each
+        interchange, so phi of the result is updated from phi of this DOE
+        instead of being recomputed.
         """
+        self.mmphi()
+
         new_doe = self.doe.copy()
+        dist = self._dist.copy()
+        phi_sum = self._phi_sum
+        exponent = -float(self.q)/self.p
+
         n,k = self.doe.shape
         for count in range(mutation_count):
             col = randint(0, k-1)
@@ -125,10 +138,30 @@ class LHC_indivudal(object):
             while el1==el2:
                 el2 = randint(0, n-1)
 
-            new_doe[el1, col] = self.doe[el2, col]
-            new_doe[el2, col] = self.doe[el1, col]
+            rows = [el1, el2]
+            column = array(new_doe[:, col], dtype=float)
+            val1, val2 = column[el1], column[el2]
+
+            # The distance between the swapped points doesn't change.
+            delta = abs(val2 - column)**self.p - abs(val1 - column)**self.p
+            delta[rows] = 0.0
+
+            old = dist[rows]**exponent
+            dist[el1] += delta
+            dist[el2] -= delta
+            dist[:, rows] = dist[rows].T
+            phi_sum += sum(dist[rows]**exponent - old)
+
+            new_doe[el1, col] = val2
+            new_doe[el2, col] = val1
+
+        new_lhc = LHC_indivudal(new_doe, self.q, self.p)
+        new_lhc._dist = dist
+        if isfinite(phi_sum):
+            new_lhc._phi_sum = phi_sum
+            new_lhc.phi = phi_sum**(1.0/self.q)
 
-        return LHC_indivudal(new_doe, self.q, self.p)
+        return new_lhc
 
     def __iter__(self):
         return self._get_rows()
@@ -7,6 +7,7 @@ import unittest
 import random
 
 from numpy import array, zeros
+from numpy.linalg import norm
 
 from openmdao.main.api import Assembly, Component, Case, set_as_top
 from openmdao.lib.doegenerators.optlh import LHC_indivudal, OptLatinHypercube, _mmlhs, \
@@ -24,6 +25,26 @@ class TestCase(unittest.TestCase):
         self.assertTrue(is_latin_hypercube(lh_opt))
         self.assertTrue(opt_phi < phi1)
         
+    def test_mmphi(self):
+        for p in (1, 2):
+            for q in (1, 2, 5):
+                lh = LHC_indivudal(rand_latin_hypercube(12, 3), q, p)
+
+                for i in range(10):
+                    # phi of the perturbed DOE is updated incrementally.
+                    lh = lh.perturb(3)
+                    self.assertTrue(is_latin_hypercube(lh.doe))
+
+                    phi = 0.0
+                    for j in range(12):
+                        for k in range(j+1, 12):
+                            phi += norm(lh[j]-lh[k], ord=p)**(-q)
+                    phi **= 1.0/q
+
+                    self.assertAlmostEqual(lh.mmphi(), phi, places=10)
+                    fresh = LHC_indivudal(lh.doe, q, p)
+                    self.assertAlmostEqual(fresh.mmphi(), phi, places=10)
+
     def test_OptLatinHypercube(self):
         olh = OptLatinHypercube()
         olh.num_samples = 10
@@ -1,5 +1,6 @@
 """A simple Pyevolve-based driver for OpenMDAO."""
 
+import os
 import re
 
 #pyevolve calls multiprocessing.cpu_count(), which can raise NotImplementedError
@@ -19,6 +20,7 @@ from pyevolve import GSimpleGA, Selectors, Initializators, Mutators, Consts
 from openmdao.main.datatypes.api import Enum, Float, Int, Bool, Slot
 
 from openmdao.main.api import Driver
+from openmdao.main.case import Case
 from openmdao.main.hasparameters import HasParameters
 from openmdao.main.hasobjective import HasObjective
 from openmdao.main.hasevents import HasEvents
@@ -29,6 +31,86 @@ from openmdao.util.typegroups import real_types, int_types, iterable_types
 
 array_test = re.compile("(\[[0-9]+\])+$")
 
+_POOL_STATE = None
+
+
+def _evaluate_pool_case(args):
+    """Evaluate one chromosome in a pool worker. Returns its score and the
+    data to be recorded for it by the parent process, if any."""
+    values, case_uuid = args
+    driver = _POOL_STATE
+    wf = driver.workflow
+    driver.set_parameters(values)
+    # Passing a case id keeps the worker from recording the case.
+    driver.run_iteration(case_uuid)
+    data = wf._case_data() if wf._rec_required else None
+    return driver.eval_objective(), data
+
+
+class _ConcurrentEvaluator(object):
+    """Collects the chromosomes of a population as Pyevolve asks for them to
+    be evaluated, then evaluates them all at once in a pool of forked
+    processes when the first score is needed."""
+
+    def __init__(self, driver, n_procs):
+        self.driver = driver
+        self.n_procs = n_procs
+        self.pending = []
+
+    def flush(self):
+        """Evaluate all of the pending chromosomes."""
+
+        global _POOL_STATE
+
+        pending, self.pending = self.pending, []
+        # Case ids are generated here, since forked workers would all
+        # generate the same sequence.
+        cases = [([val for val in chromosome], Case.next_uuid())
+                 for chromosome in pending]
+
+        _POOL_STATE = self.driver
+        pool = multiprocessing.Pool(processes=min(self.n_procs, len(cases)))
+        try:
+            results = pool.map(_evaluate_pool_case, cases)
+        finally:
+            pool.close()
+            pool.join()
+            _POOL_STATE = None
+
+        # The workers only gather the case data, it is recorded here in
+        # evaluation order.
+        wf = self.driver.workflow
+        for chromosome, (values, case_uuid), (score, data) in \
+                zip(pending, cases, results):
+            if data is not None:
+                wf._exec_count += 1
+                wf._record_case(case_uuid, None, data)
+            chromosome.score = score
+
+
+class _Chromosome(G1DList.G1DList):
+    """G1DList whose evaluation is deferred to a _ConcurrentEvaluator. Its
+    score is missing until the evaluator has run, so reading it triggers the
+    evaluation of the whole population."""
+
+    def clone(self):
+        """Return a new _Chromosome copy of this one."""
+        newcopy = _Chromosome(self.genomeSize, True)
+        self.copy(newcopy)
+        return newcopy
+
+    def evaluate(self, **args):
+        """Queue this chromosome for concurrent evaluation."""
+        self.resetStats()
+        del self.score
+        self.getParam('concurrent_evaluator').pending.append(self)
+
+    def __getattr__(self, name):
+        if name == 'score' and 'internalParams' in self.__dict__:
+            self.getParam('concurrent_evaluator').flush()
+            return self.__dict__['score']
+        raise AttributeError(name)
+
 
 @add_delegate(HasParameters, HasObjective, HasEvents)
 class Genetic(Driver):
@@ -83,6 +165,11 @@ class Genetic(Driver):
                     "for repeatable results; otherwise leave as None for truly "
                     "random seeding.")
 
+    n_procs = Int(1, low=1, iotype="in",
+                  desc="Number of local processes used to evaluate the "
+                       "population of each generation concurrently. Cases "
+                       "are recorded by the driver's process.")
+
     def _make_alleles(self):
         """ Returns a GAllelle.Galleles instance with alleles corresponding to
         the parameters specified by the user"""
@@ -126,8 +213,14 @@ class Genetic(Driver):
 
         alleles = self._make_alleles()
 
-        genome = G1DList.G1DList(len(alleles))
-        genome.setParams(allele=alleles)
+        if self.n_procs > 1 and hasattr(os, 'fork'):
+            evaluator = _ConcurrentEvaluator(self, self.n_procs)
+            genome = _Chromosome(len(alleles))
+            genome.setParams(allele=alleles, concurrent_evaluator=evaluator)
+        else:
+            evaluator = None
+            genome = G1DList.G1DList(len(alleles))
+            genome.setParams(allele=alleles)
         genome.evaluator.set(self._run_model)
 
         genome.mutator.set(Mutators.G1DListMutatorAllele)
@@ -159,7 +252,15 @@ class Genetic(Driver):
         #GO
         ga.evolve(freq_stats=0)
 
-        self.best_individual = ga.bestIndividual()
+        best = ga.bestIndividual()
+        if evaluator is not None:
+            # Don't keep the evaluator (and this driver) in the result.
+            self.best_individual = G1DList.G1DList(best.genomeSize)
+            best.copy(self.best_individual)
+            self.best_individual.internalParams = dict(best.internalParams)
+            del self.best_individual.internalParams['concurrent_evaluator']
+        else:
+            self.best_individual = best
 
         #run it once to get the model into the optimal state
         self._run_model(self.best_individual)
@@ -11,6 +11,7 @@ from pyevolve import Selectors
 
 from openmdao.main.api import Assembly, Component, set_as_top, Driver
 from openmdao.lib.drivers.genetic import Genetic
+from openmdao.lib.casehandlers.api import ListCaseRecorder
 
 # pylint: disable-msg=E1101
 
@@ -116,6 +117,44 @@ class TestCase(unittest.TestCase):
         self.assertEqual(y, 0)
         self.assertEqual(z, 0)
 
+    def test_optimizeSphere_concurrent(self):
+        results = []
+        for n_procs in (1, 3):
+            random.seed(10)
+            Selectors.GRankSelector.cachePopID = None
+            Selectors.GRouletteWheel.cachePopID = None
+
+            top = set_as_top(Assembly())
+            top.add('driver', Genetic())
+            top.add('comp', SphereFunction())
+            top.driver.workflow.add('comp')
+            top.driver.add_objective("comp.total")
+
+            top.driver.add_parameter('comp.x')
+            top.driver.add_parameter('comp.y')
+            top.driver.add_parameter('comp.z')
+
+            top.driver.seed = 123
+            top.driver.mutation_rate = .02
+            top.driver.generations = 3
+            top.driver.elitism = True
+            top.driver.opt_type = "minimize"
+            top.driver.n_procs = n_procs
+            top.recorders = [ListCaseRecorder()]
+
+            top.run()
+
+            best = top.driver.best_individual
+            cases = sorted((case['comp.x'], case['comp.y'], case['comp.z'],
+                            case['comp.total'])
+                           for case in top.recorders[0].get_iterator())
+            results.append((best.score, [x for x in best], cases))
+
+            # The model is left in the optimal state.
+            self.assertEqual(top.comp.total, best.score)
+
+        self.assertEqual(results[0], results[1])
+
     def test_optimizeSpherearray_nolowhigh(self):
         self.top.add('comp', SphereFunctionArray())
         self.top.driver.workflow.add('comp')
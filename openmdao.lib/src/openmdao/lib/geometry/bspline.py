@@ -1,14 +1,14 @@
 import cPickle
+import hashlib
 import os.path
 
-from numpy import linspace, hstack, dstack, less ,less_equal, logical_and, \
-    array, empty, matrix, dot
-    
-from scipy.optimize import fsolve, newton
+from numpy import linspace, hstack, dstack, array, asarray, ascontiguousarray, \
+    atleast_1d, arange, searchsorted, clip, empty, zeros, ones, where
+
 from scipy.sparse import csr_matrix
 
-class Bspline(object): 
-    def __init__(self,controls,points,order=3): #controls and points are 2-d arrays of points 
+class Bspline(object):
+    def __init__(self,controls,points,order=3): #controls and points are 2-d arrays of points
 
         self.controls = controls
         self.order = order
@@ -17,99 +17,123 @@ class Bspline(object):
         self.knots =  hstack(([0,]*(self.degree),
                               hstack((linspace(0,1,self.n-self.order+2),[1,]*(self.degree)))
                              ))
-        self.__b_cache = {} #uses for memoizing the b_jn function
-        self.max_x = max(points[:,0]) 
+        self.max_x = max(points[:,0])
 
-        #see if we can 
-        h1 = str(hash(tuple(points.flatten()))).replace("-","n")
-        h2 = str(hash(tuple(controls.flatten()))).replace("-","n")
-        pkl_file_name = "%s__%s.bspline_pkl"%(h1,h2)
+        #B only depends on the x values of the points and controls, so cache
+        #it under a hash of their contents
+        pkl_file_name = "%s.bspline_pkl"%self._content_hash(points)
         pkl_folder = "pyBspline_pkl"
         pkl_file_name = os.path.join(pkl_folder,pkl_file_name)
-        if not os.path.exists(pkl_folder): 
+        if not os.path.exists(pkl_folder):
             os.mkdir(pkl_folder)
-        if os.path.exists(pkl_file_name): 
-
-            self.B = cPickle.load(open(pkl_file_name))
-        else: 
+        if os.path.exists(pkl_file_name):
+            self.B = cPickle.load(open(pkl_file_name,'rb'))
+        else:
             self.B = self._calc_jacobian(points)
-            cPickle.dump(self.B,open(pkl_file_name,'w'))
-
-   
-    def _calc_jacobian(self,points):                       
-        #pre-calculate the B matrix
-        n_p = points.shape[0]
-        B = matrix(empty((n_p,self.n))) #1 row per point, one column per control_point
-        
-        r = range(0,self.n)
-        for i,p in enumerate(points): 
-            t = self.find(p[0])
-            for j in r: 
-                B[i,j] = self.b_jn_wrapper(j,self.degree,t)    
-                
-        #self.B = csr_matrix(B)
-        self.B = B
+            cPickle.dump(self.B,open(pkl_file_name,'wb'),cPickle.HIGHEST_PROTOCOL)
+
+    def _content_hash(self,points):
+        """returns a hex digest that is the same for any run with the same
+        point and control x values and order"""
+        sha = hashlib.sha1()
+        sha.update(str(self.order))
+        for x in (points[:,0], self.controls[:,0]):
+            x = ascontiguousarray(x,dtype=float)
+            sha.update(str(x.shape))
+            sha.update(x.tostring())
+        return sha.hexdigest()
+
+    def _calc_jacobian(self,points):
+        #pre-calculate the B matrix, 1 row per point, one column per control_point
+        t = self.find(points[:,0])
+        self.B = self.basis(t)
         return self.B
-                    
+
     def calc(self,C,points=None):
         self.controls = C
-        if points: 
+        if points is not None:
             self.B = self._calc_jacobian(points)
-            
-        return array(self.B.dot(C))     
-                    
-     
+
+        return array(self.B.dot(C))
+
+
     def find(self,X):
-        """returns the parametric coordinate that matches the given x location""" 
-        
-        try:     
-            return array([fsolve(lambda f: self(f)[:,0][0] - x,[x/self.max_x,],xtol=1e-5) for x in X])[:,0]
-        except TypeError:
-            return fsolve(lambda f: self(f)[:,0] - X,[X/self.max_x,],xtol=1e-5)
-                 
-        
-    def b_jn(self,j,n,t):         
-        t_j   = self.knots[j]
-        t_j1  = self.knots[j+1]
-        t_jn  = self.knots[j+n]
-        t_jn1 = self.knots[j+n+1]
-        
-        if n==0:       
-            return logical_and(less_equal(t_j,t),less(t,t_j1))                
-        
-        if t_jn-t_j:     
-            q1 = (t-t_j)/(t_jn-t_j)
-        else: 
-            q1 = 0    
-            
-        if t_jn1-t_j1: 
-            q2 = (t_jn1-t)/(t_jn1-t_j1)
-        else: 
-            q2 = 0
-                
-        B = q1*self.b_jn(j,n-1,t) + q2*self.b_jn(j+1,n-1,t)   
-        
-        return B
-        
-    #dirty hack to fix some weird corner case that shows up    
-    def b_jn_wrapper(self,j,n,t): 
-        tuple_t = tuple(t)
-        try: 
-            return self.__b_cache[(j,n,tuple_t)]
-        except KeyError:     
-            B = self.b_jn(j,n,t)
-            if j == self.n-1: 
-                try: 
-                    B[t==1]=1 #anywhere t=1, set B = 1
-                except TypeError: 
-                    B = 1   
-            self.__b_cache[(j,n,tuple_t)] = B         
-            return B 
-        
-    def __call__(self,t): 
-        rng = range(0,self.n)
-        b = [self.b_jn_wrapper(i,self.degree,t) for i in rng]
-        X = dot(self.controls[:,0],b)
-        Y = dot(self.controls[:,1],b)
-        return dstack((X,Y))[0]     
-        
\ No newline at end of file
+        """returns the parametric coordinate that matches the given x location"""
+
+        #all points are solved at once with newton's method, falling back
+        #to bisection wherever a step would leave the bracketing interval
+        X = atleast_1d(asarray(X,dtype=float))
+        cx = asarray(self.controls[:,0],dtype=float)
+        tol = 1e-12*max(abs(cx).max(),1.)
+        lo = zeros(X.shape)
+        hi = ones(X.shape)
+        t = clip(X/self.max_x,0.,1.)
+        for i in xrange(100):
+            span, N, dN = self._basis_funs(t)
+            cols = span[:,None]-self.degree+arange(self.order)
+            f = (N*cx[cols]).sum(axis=1) - X
+            if (abs(f) <= tol).all():
+                break
+            df = (dN*cx[cols]).sum(axis=1)
+            lo = where(f<0,t,lo)
+            hi = where(f>0,t,hi)
+            df = where(df>0,df,1.)
+            t_new = t - f/df
+            bisect = (t_new<=lo) | (t_new>=hi)
+            t_new = where(bisect,0.5*(lo+hi),t_new)
+            if (abs(t_new-t) <= 1e-15).all():
+                break
+            t = t_new
+        return t
+
+    def basis(self,t):
+        """returns a sparse (len(t) x n) matrix of the basis functions, with
+        `order` nonzeros per row"""
+        t = atleast_1d(asarray(t,dtype=float))
+        span, N, dN = self._basis_funs(t)
+        indices = span[:,None]-self.degree+arange(self.order)
+        indptr = arange(0,len(t)*self.order+1,self.order)
+        return csr_matrix((N.ravel(),indices.ravel(),indptr),shape=(len(t),self.n))
+
+    def _basis_funs(self,t):
+        """returns the knot span index of each parameter in `t`, and the
+        `order` basis functions that are nonzero there and their derivatives
+        as (len(t) x order) arrays (de Boor's triangular scheme, done for
+        every parameter at once)"""
+        p = self.degree
+        knots = self.knots
+        t = clip(t,0.,1.)
+        #the last basis function is 1 at t=1
+        span = clip(searchsorted(knots,t,side='right')-1,p,self.n-1)
+
+        N = ones((len(t),self.order))
+        left = empty((len(t),self.order))
+        right = empty((len(t),self.order))
+        for j in xrange(1,p+1):
+            N_prev = N[:,:j].copy()
+            left[:,j] = t-knots[span+1-j]
+            right[:,j] = knots[span+j]-t
+            saved = zeros(len(t))
+            for r in xrange(j):
+                temp = N[:,r]/(right[:,r+1]+left[:,j-r])
+                N[:,r] = saved+right[:,r+1]*temp
+                saved = left[:,j-r]*temp
+            N[:,j] = saved
+
+        #derivatives from the degree p-1 functions
+        dN = zeros((len(t),self.order))
+        if p > 0:
+            for r in xrange(self.order):
+                if r > 0:
+                    denom = knots[span+r]-knots[span+r-p]
+                    dN[:,r] += p*N_prev[:,r-1]/where(denom>0,denom,1.)
+                if r < p:
+                    denom = knots[span+r+1]-knots[span+r+1-p]
+                    dN[:,r] -= p*N_prev[:,r]/where(denom>0,denom,1.)
+        return span, N, dN
+
+    def __call__(self,t):
+        b = self.basis(t)
+        X = b.dot(self.controls[:,0])
+        Y = b.dot(self.controls[:,1])
+        return dstack((X,Y))[0]
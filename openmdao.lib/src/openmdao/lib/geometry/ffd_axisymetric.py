@@ -89,8 +89,8 @@ class Body(object):
 
         #calculate derivatives
         #in polar coordinates
-        self.dP_bar_xqdC = np.array(self.x_mag*self.bs.B.flatten())
-        self.dP_bar_rqdC = np.array(self.r_mag*self.bs.B.flatten())
+        self.dP_bar_xqdC = np.array(self.x_mag*self.bs.B.toarray().flatten())
+        self.dP_bar_rqdC = np.array(self.r_mag*self.bs.B.toarray().flatten())
 
         #Project Polar derivatives into revolved cartisian coordinates
         self.dXqdC = self.dP_bar_xqdC.reshape(-1,self.n_controls)
@@ -221,14 +221,14 @@ class Shell(object):
 
         #calculate derivatives
         #in polar coordinates
-        self.dPo_bar_xqdCc = np.array(self.x_mag*self.bsc_o.B.flatten())
-        self.dPo_bar_rqdCc = np.array(self.r_mag*self.bsc_o.B.flatten())
+        self.dPo_bar_xqdCc = np.array(self.x_mag*self.bsc_o.B.toarray().flatten())
+        self.dPo_bar_rqdCc = np.array(self.r_mag*self.bsc_o.B.toarray().flatten())
 
-        self.dPi_bar_xqdCc = np.array(self.x_mag*self.bsc_i.B.flatten())
-        self.dPi_bar_rqdCc = np.array(self.r_mag*self.bsc_i.B.flatten())
+        self.dPi_bar_xqdCc = np.array(self.x_mag*self.bsc_i.B.toarray().flatten())
+        self.dPi_bar_rqdCc = np.array(self.r_mag*self.bsc_i.B.toarray().flatten())
 
-        self.dPo_bar_rqdCt = np.array(self.r_mag*self.bst_o.B.flatten())
-        self.dPi_bar_rqdCt = -1*np.array(self.r_mag*self.bst_i.B.flatten())
+        self.dPo_bar_rqdCt = np.array(self.r_mag*self.bst_o.B.toarray().flatten())
+        self.dPi_bar_rqdCt = -1*np.array(self.r_mag*self.bst_i.B.toarray().flatten())
 
         #Project Polar derivatives into revolved cartisian coordinates
         self.dXoqdCc = self.dPo_bar_xqdCc.reshape(-1,self.n_c_controls)
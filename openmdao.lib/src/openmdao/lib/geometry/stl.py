@@ -1,3 +1,4 @@
+import re
 import struct
 import copy
 import time
@@ -29,49 +30,44 @@ ASCII_FACET = """  facet normal  {face[0]:e}  {face[1]:e}  {face[2]:e}
 
 BINARY_HEADER ="80sI"
 BINARY_FACET = "12fH"
+#numpy equivalent of BINARY_FACET, for reading and writing all facets at once
+BINARY_DTYPE = np.dtype([('facet', '<f4', (12,)), ('attribute', '<u2')])
+
+_ASCII_NORMAL = re.compile(r"normal\s+(\S+)\s+(\S+)\s+(\S+)")
+_ASCII_VERTEX = re.compile(r"vertex\s+(\S+)\s+(\S+)\s+(\S+)")
 
 
 def parse_ascii_stl(f):
     """expects a filelike object, and returns a nx12 array. One row for every facet in the STL file."""
 
-    stack = []
-    facets = []
-    line = f.readline()
-    while line:
-
-
-        if "facet normal" in line:
-
-            stack.extend(map(float,line.strip().split()[2:5]))
-            line = f.readline() #"outer loop"
-            #vertecies
-            line = f.readline()
-            stack.extend(map(float,line.strip().split()[1:4]))
-            line = f.readline()
-            stack.extend(map(float,line.strip().split()[1:4]))
-            line = f.readline()
-            stack.extend(map(float,line.strip().split()[1:4]))
-            line = f.readline() #"end loop"
-            line = f.readline() #'endfacet'
+    #tokenize the whole file at once rather than line by line
+    text = f.read()
+    normals = np.array(_ASCII_NORMAL.findall(text), dtype=float).reshape((-1,3))
+    vertices = np.array(_ASCII_VERTEX.findall(text), dtype=float).reshape((-1,9))
+    if len(vertices) != len(normals):
+        raise ValueError("STL file has %d facet normals but %d vertices"
+                         % (len(normals), 3*len(vertices)))
 
-            facets.append(stack)
-            stack = []
-
-        line = f.readline()
-
-    return np.array(facets)
+    return np.hstack((normals, vertices))
 
 def parse_binary_stl(f):
 
     header,n_triangles = struct.unpack(BINARY_HEADER,f.read(84))
 
-    facets = []
+    #read every facet with one structured array, instead of one unpack per facet
+    data = np.frombuffer(f.read(n_triangles*BINARY_DTYPE.itemsize),
+                         dtype=BINARY_DTYPE, count=n_triangles)
 
-    for i in xrange(0,n_triangles):
-        facet = struct.unpack(BINARY_FACET,f.read(50))
-        facets.append(facet[:12])
+    return data['facet'].astype(float)
 
-    return np.array(facets)
+def build_binary_stl(facets):
+    """returns a list of strings of binary data for the stl file with the given
+    nx12 array of facets"""
+
+    data = np.zeros(len(facets), dtype=BINARY_DTYPE)
+    if len(facets):
+        data['facet'] = facets
+    return [struct.pack(BINARY_HEADER,b'Binary STL Writer',len(facets)), data.tostring()]
 
 
 class STL(object):
@@ -100,7 +96,7 @@ class STL(object):
         if os.path.exists(pkl_file_name):
             self.facets, self.stl_i0, self.stl_i1, self.p_count, self.stl_indecies, \
             self.stl_i0, self.points, self.point_indecies, \
-            self.triangles = cPickle.load(open(pkl_file_name))
+            self.triangles = cPickle.load(open(pkl_file_name,'rb'))
             return
 
         ascii = (stl_file.readline().strip().split()[0] == 'solid')
@@ -111,53 +107,39 @@ class STL(object):
         else:
             self.facets = parse_binary_stl(stl_file)
 
-        #list of points and the associated index from the facet array
-        points = []
-        stl_indecies = []
-        point_indecies = [] #same size as stl_indecies, but points to locations in the points data
+        #extract the 3 points from each facet into one 3*n_facets set of (x,y,z)
+        #    points and keep track of the original indcies at the same time so
+        #    I can reconstruct the stl file later
+        n_facets = len(self.facets)
+        vertices = self.facets[:,3:].reshape((-1,3)) if n_facets else np.zeros((0,3))
 
         #stl files have duplicate points, which we don't want to compute on
         #so instead we keep a mapping between duplicates and their index in
-        #the point array
-        point_locations = {}
-        triangles = [] #used to track connectivity information
+        #the point array. Points are numbered in order of first appearance.
+        #(adding 0. turns any -0. into 0., so they are treated as duplicates)
+        #each row is viewed as a single opaque value so np.unique can
+        #compare whole points
+        rows = np.ascontiguousarray(vertices + 0.)
+        rows = rows.view(np.dtype((np.void, rows.dtype.itemsize*3))).ravel()
+        unique, first, inverse = np.unique(rows, return_index=True,
+                                           return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        point_indecies = rank[inverse] #points to locations in the points data
+
+        self.p_count = len(first)
+        self.points = vertices[first[order]]
+        self.point_indecies = point_indecies
+        self.triangles = point_indecies.reshape((-1,3)) #connectivity information
 
-        #extract the 9 points from each facet into one 3*n_facets set of (x,y,z)
-        #    points and keep track of the original indcies at the same time so
-        #    I can reconstruct the stl file later
-        column = np.arange(3,12,dtype=np.int)
-        row_base = np.ones(9,dtype=np.int)
-
-        p_count = 0 #I'm using this to avoid calling len(points) a lot
-        for i,facet in enumerate(self.facets):
-            row = row_base*i
-            ps = facet[3:].reshape((3,3))
-            triangle = []
-            for p in ps:
-                t_p = tuple(p)
-                try:
-                    p_index = point_locations[t_p]
-                    point_indecies.append(p_index) #we already have that point, so just point back to it
-                    triangle.append(p_index)
-                except KeyError:
-                    points.append(p)
-                    point_locations[t_p] = p_count
-                    point_indecies.append(p_count)
-                    triangle.append(p_count)
-                    p_count += 1
-            triangles.append(tuple(triangle))
-
-            index = np.vstack((row_base*i,column)).T.reshape((3,3,2))
-            stl_indecies.extend(index)
-
-        self.p_count = p_count
-        self.stl_indecies = np.array(stl_indecies)
+        stl_indecies = np.empty((3*n_facets,3,2), dtype=np.int)
+        stl_indecies[:,:,0] = np.repeat(np.arange(n_facets), 9).reshape((-1,3))
+        stl_indecies[:,:,1] = np.tile(np.arange(3,12).reshape((3,3)), (n_facets,1))
+        self.stl_indecies = stl_indecies
         #just need to re-shape these for the assignment call later
         self.stl_i0 = self.stl_indecies[:,:,0]
         self.stl_i1 = self.stl_indecies[:,:,1]
-        self.points = np.array(points)
-        self.point_indecies = point_indecies
-        self.triangles = np.array(triangles)
 
         #pickle for efficiency, instead of re-doing the load every time
         pkl_data = (self.facets,
@@ -170,7 +152,7 @@ class STL(object):
             self.point_indecies,
             self.triangles)
 
-        cPickle.dump(pkl_data,open(pkl_file_name,'w'))
+        cPickle.dump(pkl_data,open(pkl_file_name,'wb'),cPickle.HIGHEST_PROTOCOL)
 
 
     def copy(self):
@@ -197,12 +179,7 @@ class STL(object):
     def _build_binary_stl(self):
         """returns a string of binary binary data for the stl file"""
 
-        lines = [struct.pack(BINARY_HEADER,b'Binary STL Writer',len(self.facets)),]
-        for facet in self.facets:
-            facet = list(facet)
-            facet.append(0) #need to pad the end with a unsigned short byte
-            lines.append(struct.pack(BINARY_FACET,*facet))
-        return lines
+        return build_binary_stl(self.facets)
 
     def get_facets(self):
         """returns a n,3 array of facets with the x,y,z coordinates of each vertex"""
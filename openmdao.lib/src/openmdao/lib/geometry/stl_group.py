@@ -1,9 +1,8 @@
-import struct
 import string
 
 import numpy as np
 
-from stl import ASCII_FACET, BINARY_HEADER, BINARY_FACET
+from stl import ASCII_FACET, build_binary_stl
 
 from ffd_axisymetric import Body, Shell
 
@@ -165,12 +164,7 @@ class STLGroup(Component):
     def _build_binary_stl(self, facets):
         """returns a string of binary binary data for the stl file"""
 
-        lines = [struct.pack(BINARY_HEADER,b'Binary STL Writer',len(facets)),]
-        for facet in facets:
-            facet = list(facet)
-            facet.append(0) #need to pad the end with a unsigned short byte
-            lines.append(struct.pack(BINARY_FACET,*facet))
-        return lines
+        return build_binary_stl(facets)
 
     def writeSTL(self, file_name, ascii=False):
         """outputs an STL file"""
@@ -0,0 +1,74 @@
+# pylint: disable-msg=C0111,C0103
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from openmdao.lib.geometry.bspline import Bspline
+
+
+class BsplineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.startdir = os.getcwd()
+        self.tempdir = tempfile.mkdtemp(prefix='test_bspline-')
+        os.chdir(self.tempdir)
+
+    def tearDown(self):
+        os.chdir(self.startdir)
+        if not os.environ.get('OPENMDAO_KEEPDIRS', False):
+            try:
+                shutil.rmtree(self.tempdir)
+            except OSError:
+                pass
+
+    def test_basis(self):
+        controls = np.array(zip(np.linspace(0, 3, 8), np.zeros(8)))
+        points = np.zeros((50, 3))
+        points[:, 0] = np.linspace(0, 3, 50)**2 / 3.
+
+        bs = Bspline(controls, points)
+
+        # only `order` nonzeros per row, and they form a partition of unity
+        self.assertEqual(bs.B.shape, (50, 8))
+        self.assertEqual(bs.B.nnz, 50*3)
+        np.testing.assert_allclose(bs.B.sum(axis=1), 1., atol=1e-14)
+
+        # the parametric inversion reproduces the point locations
+        np.testing.assert_allclose(bs.B.dot(controls[:, 0]), points[:, 0],
+                                   atol=1e-10)
+        np.testing.assert_allclose(bs(bs.find(points[:, 0]))[:, 0],
+                                   points[:, 0], atol=1e-10)
+
+        # end points of the curve are the end control points
+        np.testing.assert_allclose(bs(np.array([0., 1.])), controls[[0, -1]])
+
+        # moving one control point only moves nearby points
+        C = controls.copy()
+        C[3, 1] = 1.
+        moved = bs.calc(C)[:, 1]
+        self.assertTrue(moved.max() > 0.)
+        self.assertTrue((moved[points[:, 0] < 0.5] == 0.).all())
+
+    def test_cache(self):
+        controls = np.array(zip(np.linspace(0, 1, 5), np.zeros(5)))
+        points = np.random.RandomState(0).rand(20, 3)
+
+        bs = Bspline(controls, points)
+        self.assertEqual(len(os.listdir('pyBspline_pkl')), 1)
+
+        # same contents give the same cache entry
+        bs2 = Bspline(controls.copy(), points.copy())
+        self.assertEqual(len(os.listdir('pyBspline_pkl')), 1)
+        self.assertEqual(abs(bs2.B - bs.B).max(), 0.)
+
+        bs3 = Bspline(controls, points[:10])
+        self.assertEqual(len(os.listdir('pyBspline_pkl')), 2)
+        self.assertEqual(bs3.B.shape, (10, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# pylint: disable-msg=C0111,C0103
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from openmdao.lib.geometry import stl
+
+
+# two triangles of a unit square, sharing an edge
+FACETS = np.array([[0., 0., 1., 0., 0., 0., 1., 0., 0., 1., 1., 0.],
+                   [0., 0., 1., 0., 0., 0., 1., 1., 0., 0., 1., -0.]])
+
+
+class STLTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.startdir = os.getcwd()
+        self.tempdir = tempfile.mkdtemp(prefix='test_stl-')
+        os.chdir(self.tempdir)
+
+    def tearDown(self):
+        os.chdir(self.startdir)
+        if not os.environ.get('OPENMDAO_KEEPDIRS', False):
+            try:
+                shutil.rmtree(self.tempdir)
+            except OSError:
+                pass
+
+    def test_binary(self):
+        with open('square.stl', 'wb') as f:
+            f.write("".join(stl.build_binary_stl(FACETS)))
+        self.assertEqual(os.path.getsize('square.stl'), 84 + 2*50)
+
+        with open('square.stl', 'rb') as f:
+            facets = stl.parse_binary_stl(f)
+        np.testing.assert_array_equal(facets, FACETS)
+
+        geom = stl.STL('square.stl')
+        np.testing.assert_array_equal(geom.points, [[0., 0., 0.],
+                                                    [1., 0., 0.],
+                                                    [1., 1., 0.],
+                                                    [0., 1., 0.]])
+        self.assertEqual(geom.p_count, 4)
+        np.testing.assert_array_equal(geom.triangles, [[0, 1, 2], [0, 2, 3]])
+
+        # writing back out gives the same file
+        with open('square.stl', 'rb') as f:
+            self.assertEqual("".join(geom._build_binary_stl()), f.read())
+
+    def test_ascii(self):
+        geom = stl.STL.__new__(stl.STL)
+        geom.facets = FACETS
+        with open('square.stl', 'w') as f:
+            f.write("\n".join(geom._build_ascii_stl()))
+
+        with open('square.stl', 'r') as f:
+            facets = stl.parse_ascii_stl(f)
+        np.testing.assert_array_equal(facets, FACETS)
+
+        geom = stl.STL('square.stl')
+        self.assertEqual(geom.p_count, 4)
+        np.testing.assert_array_equal(geom.triangles, [[0, 1, 2], [0, 2, 3]])
+
+        # moving a point moves it in every facet that uses it
+        points = geom.points.copy()
+        points[2] = [2., 2., 0.]
+        geom.update_points(points)
+        facets = geom.get_facets()
+        np.testing.assert_array_equal(facets[0, 9:], [2., 2., 0.])
+        np.testing.assert_array_equal(facets[1, 6:9], [2., 2., 0.])
+
+
+if __name__ == "__main__":
+    unittest.main()
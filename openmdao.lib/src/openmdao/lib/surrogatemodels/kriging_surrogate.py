@@ -1,17 +1,28 @@
 """ Surrogate model based on Kriging. """
-from math import log, e, sqrt
+import os
+from multiprocessing import Pool
+from random import uniform
 
 # pylint: disable-msg=E0611,F0401
-from numpy import array, zeros, dot, ones, eye, abs, vstack, exp, \
-                  sum, log10
-from numpy.linalg import det, linalg, lstsq
-from scipy.linalg import cho_factor, cho_solve
+from numpy import array, zeros, dot, ones, eye, abs, vstack, hstack, exp, \
+                  sum, log, log10, sqrt, newaxis, diag, outer, triu, \
+                  triu_indices, diag_indices
+from numpy.linalg import det, linalg, lstsq, pinv
+from scipy.linalg import cho_factor, cho_solve, cholesky, solve_triangular
 from scipy.optimize import minimize
 
 from openmdao.main.api import Container
 from openmdao.main.interfaces import implements, ISurrogate
 from openmdao.main.uncertain_distributions import NormalDistribution
 
+_POOL_STATE = None
+
+
+def _optimize_pool_start(thetas):
+    """Run one of the hyperparameter optimizations in a pool worker."""
+    surrogate, bounds = _POOL_STATE
+    return surrogate._optimize(thetas, bounds)
+
 
 class KrigingSurrogate(Container):
     """Surrogate Modeling method based on the simple Kriging interpolation.
@@ -26,6 +37,10 @@ class KrigingSurrogate(Container):
         self.n = None       # number of training points
         self.thetas = None
         self.nugget = 0     # nugget smoothing parameter from [Sasena, 2002]
+        self.n_restarts = 0 # extra random starting points for training
+        self.n_procs = 1    # processes used to run the restarts
+        self.retune_interval = 10   # points added by update() before the
+                                    # thetas are trained again
 
         self.R = None
         self.R_fact = None
@@ -41,55 +56,53 @@ class KrigingSurrogate(Container):
         """Calculates a predicted value of the response based on the current
         trained model for the supplied list of inputs.
         """
+        f, RMSE = self._predict_many([new_x])
+        return NormalDistribution(f[0], RMSE[0])
+
+    def predict_many(self, new_X):
+        """Calculates predicted values of the response for a whole batch of
+        inputs at once. `new_X` holds one point per row. Returns a tuple of
+        arrays containing the mean and the RMSE of each prediction.
+        """
+        return self._predict_many(new_X)
+
+    def _predict_many(self, new_X):
+        """Batched Kriging predictor shared by `predict` and `predict_many`.
+        """
         if self.m is None:  # untrained surrogate
             raise RuntimeError("KrigingSurrogate has not been trained, so no "
                                "prediction can be made")
-        r = zeros(self.n)
-        X, Y = self.X, self.Y
         thetas = 10.**self.thetas
-        XX = array(X)
-        new_x = array(new_x)
-        for i in range(self.n):
-            r[i] = sum(thetas*(XX[i] - new_x)**2.)
+        XX = array(self.X, dtype=float)
+        Y = array(self.Y)
+        new_X = array(new_X, dtype=float).reshape(-1, self.m)
+
+        # weighted distance from every new point (rows) to every training
+        # point (columns), accumulated one dimension at a time to keep the
+        # memory at one entry per pair.
+        r = zeros((len(new_X), self.n))
+        for j in range(self.m):
+            r += thetas[j]*(XX[:, j] - new_X[:, j:j+1])**2.
         r = exp(-r)
 
         one = ones(self.n)
+        rhs = hstack([(Y-dot(one, self.mu))[:, newaxis], one[:, newaxis], r.T])
         if self.R_fact is not None:
             #---CHOLESKY DECOMPOSTION ---
-            #f = self.mu+dot(r,cho_solve(self.R_fact,Y-dot(one,self.mu)))
-            #term1 = dot(r,cho_solve(self.R_fact,r))
-            #term2 = (1.0-dot(one,cho_solve(self.R_fact,r)))**2./dot(one,cho_solve(self.R_fact,one))
-
-            rhs = vstack([(Y-dot(one, self.mu)), r, one]).T
             R_fact = (self.R_fact[0].T, not self.R_fact[1])
-            cho = cho_solve(R_fact, rhs).T
-
-            f = self.mu + dot(r, cho[0])
-            term1 = dot(r, cho[1])
-            term2 = (1.0 - dot(one, cho[1]))**2./dot(one, cho[2])
-
+            sol = cho_solve(R_fact, rhs)
         else:
             #-----LSTSQ-------
-            rhs = vstack([(Y-dot(one, self.mu)), r, one]).T
-            lsq = lstsq(self.R.T, rhs)[0].T
+            sol = lstsq(self.R.T, rhs)[0]
+
+        f = self.mu + dot(r, sol[:, 0])
+        term1 = sum(r.T*sol[:, 2:], 0)
+        term2 = (1.0 - dot(one, sol[:, 2:]))**2./dot(one, sol[:, 1])
 
-            f = self.mu + dot(r, lsq[0])
-            term1 = dot(r, lsq[1])
-            term2 = (1.0 - dot(one, lsq[1]))**2./dot(one, lsq[2])
-            """
-      #-----LSTSQ-------
-      rhs = vstack([(Y-dot(one, self.mu)), r, one]).T
-      lsq = lstsq(self.R.T, rhs)[0].T
-
-      f = self.mu + dot(r, lsq[0])
-      term1 = dot(r, lsq[1])
-      term2 = (1.0 - dot(one, lsq[1]))**2./dot(one, lsq[2])
-      """
         MSE = self.sig2*(1.0 - term1 + term2)
         RMSE = sqrt(abs(MSE))
 
-        dist = NormalDistribution(f, RMSE)
-        return dist
+        return f, RMSE
 
     def train(self, X, Y):
         """Train the surrogate model with the given set of inputs and outputs."""
@@ -103,47 +116,145 @@ class KrigingSurrogate(Container):
                 self.Y.append(out)
             else: "duplicate training point" """
 
-        self.X = X
-        self.Y = Y
+        self.X = array(X, dtype=float)
+        self.Y = array(Y, dtype=float)
         self.m = len(X[0])
         self.n = len(X)
+        self._n_updated = 0
+        self._calculate_distances()
+
+        bounds = [(log10(1e-2), log10(3))]*self.m
+        starts = [zeros(self.m)]
+        for i in xrange(self.n_restarts):
+            starts.append(array([uniform(low, high) for low, high in bounds]))
+
+        if self.n_procs > 1 and len(starts) > 1 and hasattr(os, 'fork'):
+            results = self._optimize_parallel(starts, bounds)
+        else:
+            results = [self._optimize(start, bounds) for start in starts]
+
+        best = min(results, key=lambda result: result[1])
+        self.thetas = best[0]
+        #print self.thetas
+        self._calculate_log_likelihood()
+
+    def update(self, X, Y):
+        """Add new training points to an already trained model. The thetas
+        are held fixed and the existing Cholesky factor of R is extended
+        with the new rows, unless `retune_interval` points have been added
+        since the last full training, in which case the model is trained
+        again from scratch."""
+
+        if self.m is None:
+            self.train(X, Y)
+            return
+
+        X = array(X, dtype=float).reshape(-1, self.m)
+        Y = array(Y, dtype=float).reshape(-1)
+        all_X = vstack([self.X, X])
+        all_Y = hstack([self.Y, Y])
+
+        n_updated = self._n_updated + len(X)
+        if self.retune_interval and n_updated >= self.retune_interval:
+            self.train(all_X, all_Y)
+            return
+
+        thetas = 10.**self.thetas
+        old_X = self.X
+        self.X, self.Y = all_X, all_Y
+        self.n = len(all_X)
+        self._n_updated = n_updated
+        self._dist = None
+
+        # correlations of the new points with the old ones (r) and with
+        # each other (R_new)
+        r = zeros((len(old_X), len(X)))
+        R_new = zeros((len(X), len(X)))
+        for j in range(self.m):
+            r += thetas[j]*(old_X[:, j:j+1] - X[:, j])**2.
+            R_new += thetas[j]*(X[:, j:j+1] - X[:, j])**2.
+        r = exp(-r)*(1.0 - self.nugget)
+        R_new = exp(-R_new)*(1.0 - self.nugget)
+        R_new[diag_indices(len(X))] = 1.0
+
+        self.R = vstack([hstack([self.R, r]), hstack([r.T, R_new])])
+
+        if self.R_fact is not None:
+            # R = U^T U, so the border of the new factor comes from one
+            # triangular solve and a small Cholesky factorization.
+            U = triu(self.R_fact[0].T if self.R_fact[1] else self.R_fact[0])
+            try:
+                U_12 = solve_triangular(U, r, trans='T')
+                U_22 = cholesky(R_new - dot(U_12.T, U_12))
+            except (linalg.LinAlgError, ValueError):
+                pass
+            else:
+                U = vstack([hstack([U, U_12]),
+                            hstack([zeros(U_12.T.shape), U_22])])
+                self.R_fact = (U, False)
+                try:
+                    self._solve_cholesky()
+                    return
+                except (linalg.LinAlgError, ValueError):
+                    pass
+
+        # New points made R ill-conditioned, so refactor from scratch.
+        self._calculate_log_likelihood()
 
-        thetas = zeros(self.m)
-        #print "initial guess", thetas
+    def _optimize(self, thetas, bounds):
+        """Maximize the log likelihood from the starting point `thetas`,
+        using its analytic gradient. Returns the optimal thetas and the
+        corresponding negative log likelihood."""
 
         def _calcll(thetas):
             ''' Callback function'''
             self.thetas = thetas
-            self._calculate_log_likelihood()
-            return -self.log_likelihood
+            self._calculate_log_likelihood(gradient=True)
+            return -self.log_likelihood, -self.log_likelihood_grad
 
-        #if self.thetas == None:
-        #self.thetas = fmin(_calcll, thetas, disp=False, ftol=0.0001)
-        def lowerBound(log10t):
-            return log10t - log10(self.thetas)
+        result = minimize(_calcll, thetas, method='L-BFGS-B', jac=True,
+                          bounds=bounds, options={'ftol': 1e-12})
+        return result.x, float(result.fun)
 
-        def upperBound(log10t):
-            return log10(self.thetas) - log10t
+    def _optimize_parallel(self, starts, bounds):
+        """Run the optimizations from all of the starting points concurrently
+        in a pool of forked processes."""
 
-        cons = []
-        for i in xrange(self.m):
-            cons.append({'type': 'ineq', 'fun': lambda log10t: log10t[i] - log10(1e-2)})  # min
-            cons.append({'type': 'ineq', 'fun': lambda log10t: log10(3) - log10t[i]})     # max
+        global _POOL_STATE
 
-        self.thetas = minimize(_calcll, thetas, method='COBYLA', constraints=cons, tol=1e-8).x
-        #print self.thetas
-        self._calculate_log_likelihood()
+        _POOL_STATE = (self, bounds)
+        pool = Pool(processes=min(self.n_procs, len(starts)))
+        try:
+            return pool.map(_optimize_pool_start, starts)
+        finally:
+            pool.close()
+            pool.join()
+            _POOL_STATE = None
+
+    def _calculate_distances(self):
+        """The squared distances between training points don't depend on
+        thetas, so compute them once for the upper triangle of R."""
+
+        self._pairs = triu_indices(self.n, 1)
+        self._dist = (self.X[self._pairs[0]] - self.X[self._pairs[1]])**2.
+
+    def _calculate_log_likelihood(self, gradient=False):
+        """Update R and its factorization for the current thetas and compute
+        the concentrated log likelihood. If `gradient` is True, its
+        derivatives with respect to log10(thetas) are stored in
+        `log_likelihood_grad` as well."""
 
-    def _calculate_log_likelihood(self):
         #if self.m == None:
         #    Give error message
+        if self._dist is None:
+            self._calculate_distances()
+
         R = zeros((self.n, self.n))
-        X, Y = array(self.X), array(self.Y)
+        Y = array(self.Y)
         thetas = 10.**self.thetas
 
         #weighted distance formula
-        for i in range(self.n):
-            R[i, i+1:self.n] = e**(-sum(thetas*(X[i] - X[i+1:self.n])**2., 1))
+        R[self._pairs] = exp(-dot(self._dist, thetas))
 
         R = R*(1.0 - self.nugget)
         R = R + R.T + eye(self.n)
@@ -152,17 +263,7 @@ class KrigingSurrogate(Container):
         one = ones(self.n)
         try:
             self.R_fact = cho_factor(R)
-            rhs = vstack([Y, one]).T
-            R_fact = (self.R_fact[0].T, not self.R_fact[1])
-            cho = cho_solve(R_fact, rhs).T
-
-            self.mu = dot(one, cho[0])/dot(one, cho[1])
-            ymdotone = Y - dot(one, self.mu)
-            self.sig2 = dot(ymdotone, cho_solve(self.R_fact,
-                                                (ymdotone)))/self.n
-            #self.log_likelihood = -self.n/2.*log(self.sig2)-1./2.*log(abs(det(self.R)+1.e-16))-sum(thetas)
-            self.log_likelihood = -self.n/2.*log(self.sig2) - \
-                                  1./2.*log(abs(det(self.R) + 1.e-16))
+            alpha, R_inv = self._solve_cholesky(gradient)
 
         except (linalg.LinAlgError, ValueError):
             #------LSTSQ---------
@@ -172,10 +273,43 @@ class KrigingSurrogate(Container):
             lsq = lstsq(self.R.T, rhs)[0].T
             self.mu = dot(one, lsq[0])/dot(one, lsq[1])
             ymdotone = Y - dot(one, self.mu)
-            self.sig2 = dot(ymdotone, lstsq(self.R, ymdotone)[0])/self.n
+            alpha = lstsq(self.R, ymdotone)[0]
+            self.sig2 = dot(ymdotone, alpha)/self.n
             self.log_likelihood = -self.n/2.*log(self.sig2) - \
                                    1./2.*log(abs(det(self.R) + 1.e-16))
             #print self.log_likelihood
+            if gradient:
+                R_inv = pinv(R)
+
+        if gradient:
+            # d(ll)/dR = (alpha*alpha^T/sig2 - R^-1)/2, and each pair in the
+            # upper triangle appears twice in the symmetric sum.
+            dll_dR = (outer(alpha, alpha)/self.sig2 - R_inv)[self._pairs]
+            dll_dR *= R[self._pairs]
+            self.log_likelihood_grad = -log(10.)*thetas*dot(dll_dR, self._dist)
+
+    def _solve_cholesky(self, gradient=False):
+        """Compute mu, sig2 and the log likelihood from the Cholesky factor
+        of R. Returns R^-1*(Y - mu), and R^-1 if `gradient` is True."""
+
+        Y = self.Y
+        one = ones(self.n)
+        rhs = vstack([Y, one]).T
+        R_fact = (self.R_fact[0].T, not self.R_fact[1])
+        cho = cho_solve(R_fact, rhs).T
+
+        self.mu = dot(one, cho[0])/dot(one, cho[1])
+        ymdotone = Y - dot(one, self.mu)
+        alpha = cho_solve(self.R_fact, ymdotone)
+        self.sig2 = dot(ymdotone, alpha)/self.n
+        #self.log_likelihood = -self.n/2.*log(self.sig2)-1./2.*log(abs(det(self.R)+1.e-16))-sum(thetas)
+        log_det = 2.*sum(log(diag(self.R_fact[0])))
+        self.log_likelihood = -self.n/2.*log(self.sig2) - 1./2.*log_det
+
+        R_inv = None
+        if gradient:
+            R_inv = cho_solve(self.R_fact, eye(self.n))
+        return alpha, R_inv
 
 
 class FloatKrigingSurrogate(KrigingSurrogate):
@@ -186,6 +320,10 @@ class FloatKrigingSurrogate(KrigingSurrogate):
         dist = super(FloatKrigingSurrogate, self).predict(new_x)
         return dist.mu
 
+    def predict_many(self, new_X):
+        """Returns an array with the predicted mean at each row of `new_X`."""
+        return self._predict_many(new_X)[0]
+
     def get_uncertain_value(self, value):
         """Returns a float"""
         return float(value)
@@ -3,13 +3,21 @@
 import unittest
 import random
 
-from numpy import array, linspace, sin, cos, pi
+from numpy import array, linspace, sin, cos, pi, log10
 from scipy.optimize import minimize
 
-from openmdao.lib.surrogatemodels.kriging_surrogate import KrigingSurrogate
+from openmdao.lib.surrogatemodels.kriging_surrogate import KrigingSurrogate, \
+                                                         FloatKrigingSurrogate
 from openmdao.main.uncertain_distributions import NormalDistribution
 
 
+# 2D training points, with a smooth response.
+TRAIN_X = array([[-2., 0.], [-0.5, 1.5], [1., 3.], [8.5, 4.5], [-3.5, 6.],
+                 [4., 7.5], [-5., 9.], [5.5, 10.5], [10., 12.], [7., 13.5],
+                 [2.5, 15.]])
+TRAIN_Y = sin(TRAIN_X[:, 0]) + cos(TRAIN_X[:, 1])
+
+
 class KrigingSurrogateTests(unittest.TestCase):
 
     def setUp(self):
@@ -54,8 +62,7 @@ class KrigingSurrogateTests(unittest.TestCase):
             y = (x[1]-(5.1/(4.*pi**2.))*x[0]**2.+5.*x[0]/pi-6.)**2.+10.*(1.-1./(8.*pi))*cos(x[0])+10.
             return y
 
-        x = array([[-2., 0.], [-0.5, 1.5], [1., 3.], [8.5, 4.5], [-3.5, 6.], [4., 7.5], [-5., 9.], [5.5, 10.5],
-                   [10., 12.], [7., 13.5], [2.5, 15.]])
+        x = TRAIN_X
         y = array([bran(case) for case in x])
 
         krig1 = KrigingSurrogate()
@@ -65,8 +72,110 @@ class KrigingSurrogateTests(unittest.TestCase):
 
         pred = krig1.predict([5., 5.])
 
-        self.assertAlmostEqual(5.79, pred.sigma, places=0)
-        self.assertAlmostEqual(25.34, pred.mu, places=1)
+        self.assertAlmostEqual(14.51, pred.sigma, places=0)
+        self.assertAlmostEqual(18.76, pred.mu, places=1)
+        self.assertAlmostEqual(-39.3132, krig1.log_likelihood, places=3)
+
+    def test_log_likelihood_gradient(self):
+        x, y = TRAIN_X, TRAIN_Y
+
+        krig1 = KrigingSurrogate()
+        krig1.train(x, y)
+
+        thetas = array([-0.7, -1.2])
+        krig1.thetas = thetas
+        krig1._calculate_log_likelihood(gradient=True)
+        ll0 = krig1.log_likelihood
+        grad = krig1.log_likelihood_grad
+
+        for i in range(2):
+            krig1.thetas = thetas.copy()
+            krig1.thetas[i] += 1e-7
+            krig1._calculate_log_likelihood()
+            fd = (krig1.log_likelihood - ll0)/1e-7
+            self.assertAlmostEqual(fd, grad[i], places=4)
+
+    def test_restarts(self):
+        x, y = TRAIN_X, TRAIN_Y
+
+        krig1 = KrigingSurrogate()
+        krig1.train(x, y)
+
+        for n_procs in (1, 2):
+            krig2 = KrigingSurrogate()
+            krig2.n_restarts = 3
+            krig2.n_procs = n_procs
+            krig2.train(x, y)
+            self.assertTrue(krig2.log_likelihood >= krig1.log_likelihood - 1e-8)
+            self.assertTrue(all(krig2.thetas >= log10(1e-2)))
+            self.assertTrue(all(krig2.thetas <= log10(3)))
+
+    def test_predict_many(self):
+        x, y = TRAIN_X, TRAIN_Y
+        new_x = array([[-2., 0.], [5., 5.], [0.3, 11.], [9., 1.]])
+
+        # Second case is ill-conditioned and uses least squares.
+        x_lsq = array([[case] for case in linspace(0., 1., 40)])
+        y_lsq = sin(x_lsq).flatten()
+        new_x_lsq = array([[0.5], [0.123], [0.9]])
+
+        for x, y, new_x in ((x, y, new_x), (x_lsq, y_lsq, new_x_lsq)):
+            krig1 = KrigingSurrogate()
+            krig1.train(x, y)
+            mu, sigma = krig1.predict_many(new_x)
+            self.assertEqual(mu.shape, (len(new_x), ))
+            self.assertEqual(sigma.shape, (len(new_x), ))
+
+            for i, point in enumerate(new_x):
+                pred = krig1.predict(point)
+                self.assertAlmostEqual(pred.mu, mu[i], places=6)
+                self.assertAlmostEqual(pred.sigma, sigma[i], places=6)
+
+            krig2 = FloatKrigingSurrogate()
+            krig2.train(x, y)
+            mu2 = krig2.predict_many(new_x)
+            self.assertAlmostEqual(krig2.predict(new_x[1]), mu2[1], places=6)
+            self.assertAlmostEqual(mu2[1], mu[1], places=10)
+
+    def test_update(self):
+        x, y = TRAIN_X, TRAIN_Y
+
+        krig1 = KrigingSurrogate()
+        krig1.retune_interval = 3
+        krig1.train(x[:8], y[:8])
+        thetas = krig1.thetas.copy()
+
+        krig1.update(x[8:9], y[8:9])
+        krig1.update(x[9:10], y[9:10])
+        self.assertEqual(krig1.n, 10)
+        self.assertTrue(all(krig1.thetas == thetas))
+
+        # Same model as a full factorization with the same thetas.
+        krig2 = KrigingSurrogate()
+        krig2.X = x[:10]
+        krig2.Y = y[:10]
+        krig2.m = 2
+        krig2.n = 10
+        krig2.thetas = thetas
+        krig2._dist = None
+        krig2._calculate_log_likelihood()
+
+        self.assertAlmostEqual(krig1.mu, krig2.mu, places=10)
+        self.assertAlmostEqual(krig1.sig2, krig2.sig2, places=10)
+        self.assertAlmostEqual(krig1.log_likelihood, krig2.log_likelihood,
+                               places=8)
+        pred1 = krig1.predict([5., 5.])
+        pred2 = krig2.predict([5., 5.])
+        self.assertAlmostEqual(pred1.mu, pred2.mu, places=8)
+        self.assertAlmostEqual(pred1.sigma, pred2.sigma, places=8)
+
+        # The third point retunes the thetas.
+        krig1.update(x[10:], y[10:])
+        krig3 = KrigingSurrogate()
+        krig3.train(x, y)
+        self.assertEqual(krig1._n_updated, 0)
+        self.assertAlmostEqual(krig1.log_likelihood, krig3.log_likelihood,
+                               places=8)
 
     def test_get_uncertain_value(self):
         x = array([[0.05], [.25], [0.61], [0.95]])
@@ -2,7 +2,7 @@ import sys
 
 """ Some functions and objects that support the component-side derivative API.
 """
-from numpy import zeros, vstack, hstack
+from numpy import zeros, vstack, hstack, concatenate, result_type
 
 # pylint: disable=E0611,F0401
 from openmdao.main.array_helpers import flatten_slice, flattened_size
@@ -82,59 +82,21 @@ def applyJ(system, variables):
     scope = system.scope
 
     is_sys = ISystem.providedBy(obj)
+    ins, outs, resids = _deriv_vectors(system, is_sys)
+    variables = _as_set(variables)
 
     arg = {}
-    for item in system.list_states():
-
-        collapsed = scope.name2collapsed.get(item)
-        if collapsed not in variables:
-            continue
-
-        key = item
-        if not is_sys:
-            key = item.partition('.')[-1]
-        parent = system
-
-        while True:
-            if item in parent.vec['du']:
-                arg[key] = parent.vec['du'][item]
-                break
-            parent = parent._parent_system
-
-    for item in system.list_inputs():
-
-        collapsed = scope.name2collapsed.get(item)
-        if collapsed not in variables:
-            continue
-
-        key = item
-        if not is_sys:
-            key = item.partition('.')[-1]
-        parent = system
-
-        while True:
-            parent = parent._parent_system
-            if item in parent.vec['dp']:
-                arg[key] = parent.vec['dp'][item]
-                break
+    for collapsed, key, view in ins:
+        if collapsed in variables:
+            arg[key] = view
 
     result = {}
-    for item in system.list_outputs():
-
-        collapsed = scope.name2collapsed.get(item)
-        if collapsed not in variables:
-            continue
-
-        key = item
-        if not is_sys:
-            key = item.partition('.')[-1]
-        result[key] = system.rhs_vec[item]
+    for collapsed, key, rhs, sol in outs:
+        if collapsed in variables:
+            result[key] = rhs
 
-    for item in system.list_residuals():
-        key = item
-        if not is_sys:
-            key = item.partition('.')[-1]
-        result[key] = system.rhs_vec[item]
+    for key, rhs, sol in resids:
+        result[key] = rhs
 
     # Bail if this component is not connected in the graph
     if len(arg) == 0 or len(result) == 0:
@@ -201,56 +163,64 @@ def applyJ(system, variables):
     # the flattened output_keys with respect to the flattened input keys. We
     # need to find the start and end index of each input and output.
 
-    if obj._provideJ_bounds is None:
-        obj._provideJ_bounds = get_bounds(obj, input_keys, output_keys, J)
-    ibounds, obounds = obj._provideJ_bounds
-
-    for okey in result:
-
-        odx = None
-        if okey in obounds:
-            o1, o2, osh = obounds[okey]
-        else:
-            basekey, _, odx = okey.partition('[')
-            try:
-                o1, o2, osh = obounds[basekey]
-            except KeyError:
-                if obj.missing_deriv_policy == 'error':
-                    msg = "does not provide analytical derivatives" + \
-                          " for %s" % okey
-                    obj.raise_exception(msg, KeyError)
-                continue
-
-        tmp = result[okey]
-        used = set()
-        for ikey in arg:
+    plan_key = ('applyJ', frozenset(arg), frozenset(result))
+    plan = system._applyJ_cache.get(plan_key)
+    if plan is None:
+        if obj._provideJ_bounds is None:
+            obj._provideJ_bounds = get_bounds(obj, input_keys, output_keys, J)
+        ibounds, obounds = obj._provideJ_bounds
 
-            idx = None
-            if ikey in ibounds:
-                i1, i2, ish = ibounds[ikey]
-                if (i1, i2) in used:
-                    continue
-                used.add((i1, i2))
+        blocks = []
+        for okey in result:
+
+            odx = None
+            if okey in obounds:
+                o1, o2, osh = obounds[okey]
             else:
-                basekey, _, idx = ikey.partition('[')
+                basekey, _, odx = okey.partition('[')
                 try:
-                    i1, i2, ish = ibounds[basekey]
+                    o1, o2, osh = obounds[basekey]
                 except KeyError:
                     if obj.missing_deriv_policy == 'error':
                         msg = "does not provide analytical derivatives" + \
-                              " for %s" % ikey
+                              " for %s" % okey
                         obj.raise_exception(msg, KeyError)
                     continue
 
-                if (i1, i2, idx) in used or (i1, i2) in used:
-                    continue
-                used.add((i1, i2, idx))
-
-            Jsub = reduce_jacobian(J, i1, i2, idx, ish,
-                                      o1, o2, odx, osh)
-            #print ikey, okey, Jsub
-
-            tmp += Jsub.dot(arg[ikey])
+            used = set()
+            for ikey in arg:
+
+                idx = None
+                if ikey in ibounds:
+                    i1, i2, ish = ibounds[ikey]
+                    if (i1, i2) in used:
+                        continue
+                    used.add((i1, i2))
+                else:
+                    basekey, _, idx = ikey.partition('[')
+                    try:
+                        i1, i2, ish = ibounds[basekey]
+                    except KeyError:
+                        if obj.missing_deriv_policy == 'error':
+                            msg = "does not provide analytical derivatives" + \
+                                  " for %s" % ikey
+                            obj.raise_exception(msg, KeyError)
+                        continue
+
+                    if (i1, i2, idx) in used or (i1, i2) in used:
+                        continue
+                    used.add((i1, i2, idx))
+
+                Jsub = reduce_jacobian(J, i1, i2, idx, ish,
+                                          o1, o2, odx, osh)
+                #print ikey, okey, Jsub
+
+                blocks.append((okey, ikey, Jsub))
+
+        plan = _jacobian_plan(blocks, arg, result)
+        system._applyJ_cache[plan_key] = plan
+
+    _apply_plan(plan, arg, result)
 
     #print 'applyJ', obj.name, arg, result
 
@@ -264,62 +234,25 @@ def applyJT(system, variables):
     obj = system.inner()
     scope = system.scope
     is_sys = ISystem.providedBy(obj)
+    ins, outs, resids = _deriv_vectors(system, is_sys)
+    variables = _as_set(variables)
 
     arg = {}
-
-    for item in system.list_outputs():
+    for collapsed, key, rhs, sol in outs:
 
         # TODO - Linear GS needs these. Need to fix something there.
-        #collapsed = system.scope.name2collapsed.get(item)
         #if collapsed not in variables:
         #    continue
 
-        key = item
-        if not is_sys:
-            key = item.partition('.')[-1]
-        arg[key] = system.sol_vec[item]
+        arg[key] = sol
 
-    for item in system.list_residuals():
-
-        key = item
-        if not is_sys:
-            key = item.partition('.')[-1]
-        arg[key] = system.sol_vec[item]
+    for key, rhs, sol in resids:
+        arg[key] = sol
 
     result = {}
-    for item in system.list_states():
-
-        collapsed = scope.name2collapsed.get(item)
-        if collapsed not in variables:
-            continue
-
-        key = item
-        if not is_sys:
-            key = item.partition('.')[-1]
-
-        parent = system
-        while True:
-            if item in parent.vec['du']:
-                result[key] = parent.vec['du'][item]
-                break
-            parent = parent._parent_system
-
-    for item in system.list_inputs():
-
-        collapsed = scope.name2collapsed.get(item)
-        if collapsed not in variables:
-            continue
-
-        key = item
-        if not is_sys:
-            key = item.partition('.')[-1]
-
-        parent = system
-        while True:
-            parent = parent._parent_system
-            if item in parent.vec['dp']:
-                result[key] = parent.vec['dp'][item]
-                break
+    for collapsed, key, view in ins:
+        if collapsed in variables:
+            result[key] = view
 
     # Bail if this component is not connected in the graph
     if len(arg) == 0 or len(result) == 0:
@@ -384,54 +317,62 @@ def applyJT(system, variables):
     # The Jacobian from provideJ is a 2D array containing the derivatives of
     # the flattened output_keys with respect to the flattened input keys. We
     # need to find the start and end index of each input and output.
-    if obj._provideJ_bounds is None:
-        obj._provideJ_bounds = get_bounds(obj, input_keys, output_keys, J)
-    obounds, ibounds = obj._provideJ_bounds
-
-    used = set()
-    for okey in result:
-        odx = None
-        if okey in obounds:
-            o1, o2, osh = obounds[okey]
-            if (o1, o2) in used:
-                continue
-            used.add((o1, o2))
-        else:
-            basekey, _, odx = okey.partition('[')
-            try:
-                o1, o2, osh = obounds[basekey]
-            except KeyError:
-                if obj.missing_deriv_policy == 'error':
-                    msg = "does not provide analytical derivatives for" + \
-                          "%s" % okey
-                    obj.raise_exception(msg, KeyError)
-                continue
-
-            if (o1, o2, odx) in used or (o1, o2) in used:
-                continue
-            used.add((o1, o2, odx))
-
-        tmp = result[okey]
-        for ikey in arg:
-            idx = None
-            if ikey in ibounds:
-                i1, i2, ish = ibounds[ikey]
+    plan_key = ('applyJT', frozenset(arg), frozenset(result))
+    plan = system._applyJ_cache.get(plan_key)
+    if plan is None:
+        if obj._provideJ_bounds is None:
+            obj._provideJ_bounds = get_bounds(obj, input_keys, output_keys, J)
+        obounds, ibounds = obj._provideJ_bounds
+
+        blocks = []
+        used = set()
+        for okey in result:
+            odx = None
+            if okey in obounds:
+                o1, o2, osh = obounds[okey]
+                if (o1, o2) in used:
+                    continue
+                used.add((o1, o2))
             else:
-                basekey, _, idx = ikey.partition('[')
+                basekey, _, odx = okey.partition('[')
                 try:
-                    i1, i2, ish = ibounds[basekey]
+                    o1, o2, osh = obounds[basekey]
                 except KeyError:
                     if obj.missing_deriv_policy == 'error':
                         msg = "does not provide analytical derivatives for" + \
-                               "%s" % ikey
+                              "%s" % okey
                         obj.raise_exception(msg, KeyError)
                     continue
 
-            Jsub = reduce_jacobian(J, o1, o2, odx, osh,
-                                      i1, i2, idx, ish).T
-            #print ikey, okey, Jsub
-
-            tmp += Jsub.dot(arg[ikey])
+                if (o1, o2, odx) in used or (o1, o2) in used:
+                    continue
+                used.add((o1, o2, odx))
+
+            for ikey in arg:
+                idx = None
+                if ikey in ibounds:
+                    i1, i2, ish = ibounds[ikey]
+                else:
+                    basekey, _, idx = ikey.partition('[')
+                    try:
+                        i1, i2, ish = ibounds[basekey]
+                    except KeyError:
+                        if obj.missing_deriv_policy == 'error':
+                            msg = "does not provide analytical derivatives for" + \
+                                   "%s" % ikey
+                            obj.raise_exception(msg, KeyError)
+                        continue
+
+                Jsub = reduce_jacobian(J, o1, o2, odx, osh,
+                                          i1, i2, idx, ish).T
+                #print ikey, okey, Jsub
+
+                blocks.append((okey, ikey, Jsub))
+
+        plan = _jacobian_plan(blocks, arg, result)
+        system._applyJ_cache[plan_key] = plan
+
+    _apply_plan(plan, arg, result)
 
     #print 'applyJT', obj.name, arg, result
 
@@ -483,6 +424,114 @@ def applyMinvT(obj, inputs, shape_cache):
 
     return inputs
 
+def _as_set(variables):
+    """Returns `variables` in a form that supports fast membership tests."""
+    if isinstance(variables, (set, frozenset, dict)):
+        return variables
+    return set(variables)
+
+def _deriv_vectors(system, is_sys):
+    """Locates the entries in the derivative vectors that applyJ and applyJT
+    need for `system`. Returns a list of (collapsed, key, view) for the
+    states and inputs, a list of (collapsed, key, rhs, sol) for the outputs
+    and a list of (key, rhs, sol) for the residuals. The result is cached
+    on the system until it is linearized again.
+    """
+
+    cache = system._applyJ_cache
+    try:
+        mode, rhs_vec, vectors = cache['vectors']
+        if mode == system.mode and rhs_vec is system.rhs_vec:
+            return vectors
+    except KeyError:
+        pass
+
+    name2collapsed = system.scope.name2collapsed
+
+    def _key(item):
+        if is_sys:
+            return item
+        return item.partition('.')[-1]
+
+    ins = []
+    for item in system.list_states():
+        parent = system
+        while item not in parent.vec['du']:
+            parent = parent._parent_system
+        ins.append((name2collapsed.get(item), _key(item),
+                    parent.vec['du'][item]))
+
+    for item in system.list_inputs():
+        parent = system._parent_system
+        while item not in parent.vec['dp']:
+            parent = parent._parent_system
+        ins.append((name2collapsed.get(item), _key(item),
+                    parent.vec['dp'][item]))
+
+    outs = [(name2collapsed.get(item), _key(item),
+             system.rhs_vec[item], system.sol_vec[item])
+            for item in system.list_outputs()]
+
+    resids = [(_key(item), system.rhs_vec[item], system.sol_vec[item])
+              for item in system.list_residuals()]
+
+    vectors = (ins, outs, resids)
+    cache['vectors'] = (system.mode, system.rhs_vec, vectors)
+    return vectors
+
+def _jacobian_plan(blocks, arg, result):
+    """Assembles the (okey, ikey, Jsub) blocks of a Jacobian product into a
+    single matrix so that applying it takes one matvec. Returns a tuple of
+    the matrix, the arg keys in column order and a list of (okey, start,
+    end) giving the rows for each result key, or None if there are no
+    blocks.
+    """
+    if not blocks:
+        return None
+
+    ikeys = []
+    cols = {}
+    ncol = 0
+    okeys = []
+    rows = {}
+    nrow = 0
+    for okey, ikey, Jsub in blocks:
+        if ikey not in cols:
+            size = arg[ikey].size
+            cols[ikey] = (ncol, ncol+size)
+            ikeys.append(ikey)
+            ncol += size
+        if okey not in rows:
+            size = result[okey].size
+            rows[okey] = (nrow, nrow+size)
+            okeys.append((okey, nrow, nrow+size))
+            nrow += size
+
+    matrix = zeros((nrow, ncol),
+                   dtype=result_type(*[Jsub for _, _, Jsub in blocks]))
+    for okey, ikey, Jsub in blocks:
+        o1, o2 = rows[okey]
+        i1, i2 = cols[ikey]
+        matrix[o1:o2, i1:i2] = Jsub.reshape((o2-o1, i2-i1))
+
+    return matrix, ikeys, okeys
+
+def _apply_plan(plan, arg, result):
+    """Adds the product of the matrix in `plan` and the `arg` vectors into
+    the `result` vectors.
+    """
+    if plan is None:
+        return
+
+    matrix, ikeys, okeys = plan
+    if len(ikeys) == 1:
+        product = matrix.dot(arg[ikeys[0]])
+    else:
+        product = matrix.dot(concatenate([arg[ikey] for ikey in ikeys]))
+
+    for okey, start, end in okeys:
+        result[okey] += product[start:end]
+
 def get_bounds(obj, input_keys, output_keys, J):
     """ Returns a pair of dictionaries that contain the stop and end index
     for each input and output in a pair of lists.
@@ -51,6 +51,19 @@ class GradientOptions(VariableTree):
                         desc='Set to absolute, relative, '
                         'or scaled to the bounds (high-low) step sizes',
                         framework_var=True)
+    fd_num_procs = Int(1, low=1,
+                       desc='Number of local processes used to evaluate '
+                       'finite difference columns concurrently. Each '
+                       'worker is forked with a copy of the current model '
+                       'state. Not used under MPI.',
+                       framework_var=True)
+    fd_coloring = Enum('off', ['off', 'graph', 'probe'],
+                       desc="Perturb structurally independent inputs "
+                       "together during finite difference. 'graph' takes "
+                       "the Jacobian sparsity from the connectivity of the "
+                       "model, 'probe' takes it from the nonzeros of the "
+                       "first full finite difference.",
+                       framework_var=True)
 
     force_fd = Bool(False, desc="Set to True to force finite difference "
                                 "of this driver's entire workflow in a"
@@ -80,7 +93,8 @@ class GradientOptions(VariableTree):
     #                          framework_var=True)
 
     # Linear Solver settings
-    lin_solver = Enum('scipy_gmres', ['scipy_gmres', 'petsc_ksp', 'linear_gs'],
+    lin_solver = Enum('scipy_gmres', ['scipy_gmres', 'petsc_ksp', 'linear_gs',
+                                      'direct_sparse'],
                       desc='Method to use for gradient calculation',
                       framework_var=True)
 
@@ -91,6 +105,11 @@ class GradientOptions(VariableTree):
                                framework_var=True)
     maxiter = Int(100, desc='Maximum number of iterations for the linear solver.',
                   framework_var=True)
+    block_rhs = Bool(False, desc='Set to True to let scipy_gmres assemble '
+                     'and factor small systems once, then solve all '
+                     'right-hand sides of calc_gradient together, whenever '
+                     'that takes no more Jacobian products than GMRES.',
+                     framework_var=True)
 
     iprint = Enum(0, [0, 1], desc="Set to 1 to print out residual of the linear solver",
                   framework_var=True)
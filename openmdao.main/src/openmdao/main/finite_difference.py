@@ -2,15 +2,54 @@
 """
 
 # pylint: disable=E0611,F0401
+import os
+from itertools import izip
+from multiprocessing import Pool
 from sys import float_info
 
+import networkx as nx
+
 from openmdao.main.array_helpers import flattened_size
 from openmdao.main.interfaces import IVariableTree
 from openmdao.main.mp_support import has_interface
 from openmdao.main.mpiwrap import MPI
 from openmdao.util.graph import base_var
 
-from numpy import ndarray, zeros, ones, unravel_index, complex128
+from numpy import ndarray, zeros, ones, unravel_index, complex128, argsort
+
+# State shared with forked pool workers during a parallel solve.
+_POOL_STATE = None
+
+
+def _solve_pool_group(group):
+    """Evaluate one group of Jacobian columns in a pool worker."""
+    fd_solver, outputs, iterbase = _POOL_STATE
+    return fd_solver._solve_group(group, outputs, iterbase)
+
+
+def color_columns(sparsity):
+    """Greedy coloring of the columns of a boolean sparsity pattern. Columns
+    that share a color have no nonzero rows in common, so they can be
+    perturbed simultaneously. Returns an array with the color of each
+    column."""
+
+    ncols = sparsity.shape[1]
+    colors = zeros(ncols, dtype=int)
+    masks = []
+
+    # Densest columns first tends to give fewer colors.
+    for col in argsort(-sparsity.sum(axis=0), kind='mergesort'):
+        rows = sparsity[:, col]
+        for color, mask in enumerate(masks):
+            if not (mask & rows).any():
+                mask |= rows
+                break
+        else:
+            color = len(masks)
+            masks.append(rows.copy())
+        colors[col] = color
+
+    return colors
 
 
 class FiniteDifference(object):
@@ -40,6 +79,10 @@ class FiniteDifference(object):
         self.step_type = options.fd_step_type
         self.step_type_custom = {}
         self.relative_threshold = 1.0e-4
+        self.num_procs = options.fd_num_procs
+        self.coloring = 'off' if MPI else options.fd_coloring
+        self.sparsity = None
+        self.colors = None
 
         dgraph = self.scope._depgraph
         driver_params = []
@@ -136,10 +179,12 @@ class FiniteDifference(object):
             self.high[j] = high
             self.low[j] = low
 
+        self.out_bounds = {}
         out_size = 0
         for src in self.outputs:
             val = self.scope.get(src)
             width = flattened_size(src, val)
+            self.out_bounds[src] = (out_size, out_size+width)
             out_size += width
 
         # Size our Jacobian
@@ -165,6 +210,7 @@ class FiniteDifference(object):
         else:
             self.J = zeros((out_size, in_size))
 
+        self.in_size = in_size
         self.y_base = zeros((out_size,))
         self.y = zeros((out_size,))
         self.y2 = zeros((out_size,))
@@ -184,6 +230,61 @@ class FiniteDifference(object):
 
         uvec.set_to_array(self.y_base, outputs)
 
+        if self.coloring == 'graph' and self.sparsity is None:
+            self.sparsity = self._get_graph_sparsity()
+
+        columns = self._get_columns()
+        groups = self._get_groups(columns)
+
+        if self.num_procs > 1 and len(groups) > 1 and not MPI and \
+           hasattr(os, 'fork'):
+            jacobians = self._solve_parallel(groups, outputs, iterbase)
+        else:
+            jacobians = [self._solve_group(group, outputs, iterbase)
+                         for group in groups]
+
+        # The first solve in probe mode determines the sparsity pattern
+        # for all subsequent ones.
+        if self.coloring == 'probe' and self.sparsity is None:
+            self.sparsity = zeros((len(self.y), self.in_size), dtype=bool)
+            probe = True
+        else:
+            probe = False
+
+        columns = [column for group in groups for column in group]
+        jacobians = [Jfd for group_J in jacobians for Jfd in group_J]
+
+        for (src, i1, i, form, fd_step), Jfd in izip(columns, jacobians):
+
+            if probe:
+                self.sparsity[:, i] = Jfd != 0.0
+
+            # Pack Jacobian in either an array or a dictionary.
+            if self.return_format == 'dict':
+                start = end = 0
+                for okey in outputs:
+
+                    sz = uvec[okey].size
+                    end += sz
+                    #print Jfd, start, end, i, self.J
+                    self.J[okey][src][:, i-i1] = Jfd[start:end]
+                    start += sz
+            else:
+                self.J[:, i] = Jfd
+
+        # Restore final inputs/outputs.
+        uvec.set_from_array(self.y_base, outputs)
+        uvec.set_to_scope(self.scope)
+
+        #print 'after FD', self.J
+        return self.J
+
+    def _get_columns(self):
+        """Return a list of (src, i1, i, form, fd_step) tuples, one for each
+        column of the Jacobian. The finite difference form and stepsize are
+        resolved here so that the columns can be evaluated independently."""
+
+        columns = []
         for j, src, in enumerate(self.inputs):
 
             # Users can customize relative/absolute step type per variable.
@@ -232,105 +333,192 @@ class FiniteDifference(object):
                     if current_val + fd_step > bound_val:
                         form = 'backward'
 
-                #--------------------
-                # Forward difference
-                #--------------------
-                if form == 'forward':
+                columns.append((src, i1, i, form, fd_step))
 
-                    # Step
-                    self.set_value(src, fd_step, i-i1)
+        return columns
 
-                    self.system.run(iterbase)
-                    self.get_outputs(self.y, outputs)
+    def _get_groups(self, columns):
+        """Partition the columns into groups whose inputs can be perturbed
+        together in a single run. Without a sparsity pattern, each column is
+        its own group."""
 
-                    # Forward difference
-                    Jfd = (self.y - self.y_base)/fd_step
+        if self.sparsity is None:
+            return [[column] for column in columns]
 
-                    # Undo step
-                    self.set_value(src, -fd_step, i-i1)
+        if self.colors is None:
+            self.colors = color_columns(self.sparsity)
 
-                #--------------------
-                # Backward difference
-                #--------------------
-                elif form == 'backward':
+        groups = {}
+        for column in columns:
+            # Columns that were switched to a different form near a bound
+            # can't share a run with the others.
+            key = (self.colors[column[2]], column[3])
+            groups.setdefault(key, []).append(column)
 
-                    # Step
-                    self.set_value(src, -fd_step, i-i1)
+        return [groups[key] for key in sorted(groups)]
 
-                    self.system.run(iterbase)
-                    self.get_outputs(self.y, outputs)
+    def _get_graph_sparsity(self):
+        """Return a conservative sparsity pattern for the Jacobian, based on
+        the connectivity of the system's graph. Outputs that can't be
+        reached from an input don't depend on it. Anything that can't be
+        located in the graph is assumed to be dense."""
 
-                    # Backward difference
-                    Jfd = (self.y_base - self.y)/fd_step
+        graph = self.system._reduced_graph
 
-                    # Undo step
-                    self.set_value(src, fd_step, i-i1)
+        def names(nodes):
+            """Variable names for a set of (possibly collapsed) nodes."""
+            found = set()
+            for node in nodes:
+                found.add(node)
+                if isinstance(node, tuple):
+                    found.add(node[0])
+            return found
 
-                #--------------------
-                # Central difference
-                #--------------------
-                elif form == 'central':
+        known = names(graph.nodes_iter())
 
-                    # Forward Step
-                    self.set_value(src, fd_step, i-i1)
+        sparsity = zeros((len(self.y), self.in_size), dtype=bool)
 
-                    self.system.run(iterbase)
-                    self.get_outputs(self.y, outputs)
+        for srcs in self.inputs:
 
-                    # Backward Step
-                    self.set_value(src, -2.0*fd_step, i-i1)
+            # Support for parameter groups
+            if isinstance(srcs, basestring):
+                srcs = [srcs]
 
-                    self.system.run(iterbase)
-                    self.get_outputs(self.y2, outputs)
+            i1, i2 = self.in_bounds[srcs[0]]
 
-                    # Central difference
-                    Jfd = (self.y - self.y2)/(2.0*fd_step)
+            if all(src in graph for src in srcs):
+                reached = set()
+                for src in srcs:
+                    reached.update(names(nx.descendants(graph, src)))
+            else:
+                reached = known
 
-                    # Undo step
-                    self.set_value(src, fd_step, i-i1)
+            for okey in self.outputs:
+                if okey in reached or okey not in known:
+                    o1, o2 = self.out_bounds[okey]
+                    sparsity[o1:o2, i1:i2] = True
 
-                #--------------------
-                # Complex Step
-                #--------------------
-                elif form == 'complex_step':
+        return sparsity
 
-                    complex_step = fd_step
-                    yc = zeros(len(self.y), dtype=complex128)
-                    self.system.set_complex_step(True)
+    def _solve_group(self, group, outputs, iterbase):
+        """Perturb the input elements for a group of columns, run the
+        system, and return the corresponding columns of the Jacobian. The
+        model is returned to its original state afterwards."""
 
-                    # Step
-                    self.set_value_complex(src, complex_step, i-i1)
+        form = group[0][3]
 
-                    self.system.run(iterbase)
-                    self.get_complex_outputs(yc)
+        #--------------------
+        # Forward difference
+        #--------------------
+        if form == 'forward':
 
-                    # Forward difference
-                    Jfd = (yc/fd_step).imag
+            # Step
+            for src, i1, i, form, fd_step in group:
+                self.set_value(src, fd_step, i-i1)
 
-                    # Undo step
-                    self.set_value_complex(src, complex_step, i-i1,
-                                           undo_complex=True)
-                    self.system.set_complex_step(False)
+            self.system.run(iterbase)
+            self.get_outputs(self.y, outputs)
 
-                # Pack Jacobian in either an array or a dictionary.
-                if self.return_format == 'dict':
-                    start = end = 0
-                    for okey in outputs:
+            # Forward difference
+            delta = self.y - self.y_base
 
-                        sz = uvec[okey].size
-                        end += sz
-                        #print Jfd, start, end, i, self.J
-                        self.J[okey][src][:, i-i1] = Jfd[start:end]
-                        start += sz
-                else:
-                    self.J[:, i] = Jfd
+            # Undo step
+            for src, i1, i, form, fd_step in group:
+                self.set_value(src, -fd_step, i-i1)
 
-        # Restore final inputs/outputs.
-        uvec.set_from_array(self.y_base, outputs)
-        uvec.set_to_scope(self.scope)
+        #--------------------
+        # Backward difference
+        #--------------------
+        elif form == 'backward':
 
-        #print 'after FD', self.J
-        return self.J
+            # Step
+            for src, i1, i, form, fd_step in group:
+                self.set_value(src, -fd_step, i-i1)
+
+            self.system.run(iterbase)
+            self.get_outputs(self.y, outputs)
+
+            # Backward difference
+            delta = self.y_base - self.y
+
+            # Undo step
+            for src, i1, i, form, fd_step in group:
+                self.set_value(src, fd_step, i-i1)
+
+        #--------------------
+        # Central difference
+        #--------------------
+        elif form == 'central':
+
+            # Forward Step
+            for src, i1, i, form, fd_step in group:
+                self.set_value(src, fd_step, i-i1)
+
+            self.system.run(iterbase)
+            self.get_outputs(self.y, outputs)
+
+            # Backward Step
+            for src, i1, i, form, fd_step in group:
+                self.set_value(src, -2.0*fd_step, i-i1)
+
+            self.system.run(iterbase)
+            self.get_outputs(self.y2, outputs)
+
+            # Central difference
+            delta = (self.y - self.y2)/2.0
+
+            # Undo step
+            for src, i1, i, form, fd_step in group:
+                self.set_value(src, fd_step, i-i1)
+
+        #--------------------
+        # Complex Step
+        #--------------------
+        elif form == 'complex_step':
+
+            yc = zeros(len(self.y), dtype=complex128)
+            self.system.set_complex_step(True)
+
+            # Step
+            for src, i1, i, form, fd_step in group:
+                self.set_value_complex(src, fd_step, i-i1)
+
+            self.system.run(iterbase)
+            self.get_complex_outputs(yc)
+
+            # Forward difference
+            delta = yc.imag
+
+            # Undo step
+            for src, i1, i, form, fd_step in group:
+                self.set_value_complex(src, fd_step, i-i1,
+                                       undo_complex=True)
+            self.system.set_complex_step(False)
+
+        if len(group) == 1:
+            return [delta/group[0][4]]
+
+        # Unpack the simultaneous perturbation using the sparsity pattern.
+        return [delta*self.sparsity[:, i]/fd_step
+                for src, i1, i, form, fd_step in group]
+
+    def _solve_parallel(self, groups, outputs, iterbase):
+        """Evaluate the groups of Jacobian columns concurrently in a pool of
+        forked processes. Each worker inherits a copy of the current model
+        state, so nothing but the column specifications and the resulting
+        columns need to be passed between processes."""
+
+        global _POOL_STATE
+
+        _POOL_STATE = (self, outputs, iterbase)
+        pool = Pool(processes=min(self.num_procs, len(groups)))
+        chunksize = max(1, len(groups) // (4*self.num_procs))
+        try:
+            return pool.map(_solve_pool_group, groups, chunksize)
+        finally:
+            pool.close()
+            pool.join()
+            _POOL_STATE = None
 
     def get_outputs(self, x, outputs):
         """Return matrix of flattened values from output edges."""
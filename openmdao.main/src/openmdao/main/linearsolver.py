@@ -7,7 +7,9 @@ import traceback
 
 # pylint: disable=E0611, F0401
 import numpy as np
-from scipy.sparse.linalg import gmres, LinearOperator
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse import coo_matrix
+from scipy.sparse.linalg import gmres, splu, LinearOperator
 
 from openmdao.main.mpiwrap import MPI, PETSc, get_norm
 from openmdao.util.graph import fix_single_tuple
@@ -67,6 +69,11 @@ class LinearSolver(object):
         form = self.indent + '[%s]    %s: %s   %d | %.9g %.9g'
         print form % (self.drv_name, solver, self.ln_string, iteration, res, res/res0)
 
+    def reset(self):
+        """ Called after the system has been linearized. Solvers that keep
+        information derived from the Jacobian should discard it here."""
+        pass
+
     def _norm(self):
         """ Computes the norm of the linear residual """
         system = self._system
@@ -105,6 +112,10 @@ class ScipyGMRES(LinearSolver):
 
     ln_string = 'GMRES'
 
+    # Largest system that calc_gradient will assemble as a dense matrix in
+    # order to solve all right-hand sides with a single factorization.
+    max_direct_size = 2000
+
     def __init__(self, system):
         """ Set up ScipyGMRES object """
         super(ScipyGMRES, self).__init__(system)
@@ -142,6 +153,22 @@ class ScipyGMRES(LinearSolver):
         if system.mode == 'adjoint':
             outputs, inputs = inputs, outputs
 
+        # Gather the right-hand sides so that they can be solved as a block
+        # if that turns out to be cheaper.
+        rhs_indices = []
+        for param in inputs:
+
+            if isinstance(param, tuple):
+                param = param[0]
+
+            if system.mode == 'adjoint' and param in self.custom_jacs:
+                continue
+
+            rhs_indices.extend(system.vec['u'].indices(system, param))
+
+        dxs = self.solve_block(rhs_indices)
+        k = 0
+
         # If Forward mode, solve linear system for each parameter
         # If Adjoint mode, solve linear system for each requested output
         j = 0
@@ -161,12 +188,16 @@ class ScipyGMRES(LinearSolver):
 
             for irhs in in_indices:
 
-                RHS[irhs] = 1.0
+                if dxs is None:
+                    RHS[irhs] = 1.0
 
-                # Call GMRES to solve the linear system
-                dx = self.solve(RHS)
+                    # Call GMRES to solve the linear system
+                    dx = self.solve(RHS)
 
-                RHS[irhs] = 0.0
+                    RHS[irhs] = 0.0
+                else:
+                    dx = dxs[:, k]
+                    k += 1
 
                 i = 0
                 for item in outputs:
@@ -224,6 +255,44 @@ class ScipyGMRES(LinearSolver):
         #print system.name, 'Linear solution vec', -dx
         return dx
 
+    def solve_block(self, rhs_indices):
+        """ Solve for the unit right-hand sides given by rhs_indices all at
+        once by assembling the operator and factoring it. Assembly takes one
+        matrix-vector product per unknown, while GMRES needs at least two
+        per right-hand side (the initial residual and one iteration), so
+        this is only done when it can't take more products than GMRES.
+        Returns an array with one solution per column, or None if the
+        right-hand sides should be solved one at a time."""
+
+        n_edge = self.A.shape[0]
+        if not self.options.block_rhs or len(rhs_indices) < 2 or \
+           2*len(rhs_indices) < n_edge or n_edge > self.max_direct_size:
+            return None
+
+        lu, piv = lu_factor(self.assemble(), check_finite=False)
+
+        # Leave singular systems to GMRES.
+        if not np.all(np.diag(lu)):
+            return None
+
+        return lu_solve((lu, piv), np.eye(n_edge)[:, rhs_indices],
+                        check_finite=False)
+
+    def assemble(self):
+        """ Return the operator as a dense matrix, built one column at a time
+        by applying it to each unit vector."""
+
+        n_edge = self.A.shape[0]
+        matrix = np.zeros((n_edge, n_edge))
+        arg = np.zeros(n_edge)
+
+        for icol in xrange(n_edge):
+            arg[icol] = 1.0
+            matrix[:, icol] = self.mult(arg)
+            arg[icol] = 0.0
+
+        return matrix
+
 
     def mult(self, arg):
         """ GMRES Callback: applies Jacobian matrix. Mode is determined by the
@@ -247,6 +316,198 @@ class ScipyGMRES(LinearSolver):
         return system.rhs_vec.array[:]
 
 
+class DirectSparseSolver(ScipyGMRES):
+    """ Assembles the Jacobian of the system into a sparse matrix once per
+    linearization, factors it with SuperLU, and back-substitutes for every
+    right-hand side. The matrix is built from Jacobian-vector products, with
+    structurally independent columns sharing a product. If the assembled
+    matrix can't be factored, this falls back to GMRES. This is a serial
+    solver, so it should never be used in an MPI setting.
+    """
+
+    ln_string = 'DIRECT'
+
+    def __init__(self, system):
+        """ Set up DirectSparseSolver object """
+        super(DirectSparseSolver, self).__init__(system)
+        self.lu = None
+        self._colorings = {}
+
+    def reset(self):
+        """ Discard the factorization of the previous linearization. """
+        self.lu = None
+
+    def factor(self):
+        """ Return the LU factorization of the assembled Jacobian, or False
+        if it couldn't be factored."""
+
+        if self.lu is None:
+            system = self._system
+            try:
+                self.lu = splu(self.assemble_sparse())
+            except RuntimeError as err:
+                logger.debug("In '%s', falling back to GMRES: %s",
+                             system.name, err)
+                self.lu = False
+
+        return self.lu
+
+    def solve_block(self, rhs_indices):
+        """ Back-substitute for all of the unit right-hand sides given by
+        rhs_indices. Returns an array with one solution per column."""
+
+        lu = self.factor()
+        if not lu:
+            return None
+
+        n_edge = self.A.shape[0]
+        rhs = np.zeros((n_edge, len(rhs_indices)))
+        rhs[rhs_indices, np.arange(len(rhs_indices))] = 1.0
+        return lu.solve(rhs)
+
+    def solve(self, arg):
+        """ Solve the coupled equations for a new state vector that nulls the
+        residual. Used by the Newton solvers."""
+
+        lu = self.factor()
+        if not lu:
+            return super(DirectSparseSolver, self).solve(arg)
+
+        return lu.solve(np.asarray(arg, dtype=float))
+
+    def sparsity(self):
+        """ Return the structural nonzeros of the operator as a sparse
+        boolean matrix in CSC format. Every output or residual of a simple
+        subsystem is assumed to depend on all of its inputs and states."""
+
+        system = self._system
+        uvec = system.vec['u']
+        n_edge = self.A.shape[0]
+
+        def indices(names):
+            """ Flat vector indices for a list of variable names. """
+            idxs = []
+            for name in names:
+                try:
+                    idxs.append(uvec.indices(system, name))
+                except KeyError:
+                    pass
+            if idxs:
+                return np.concatenate(idxs)
+            return np.zeros(0, dtype=int)
+
+        diag = np.arange(n_edge)
+        rows = [diag]
+        cols = [diag]
+        for sub in system.simple_subsystems():
+            ins = indices(sub.list_inputs() + sub.list_states())
+            outs = indices(sub.list_outputs() + sub.list_residuals())
+            rows.append(np.repeat(outs, len(ins)))
+            cols.append(np.tile(ins, len(outs)))
+
+        rows = np.concatenate(rows)
+        cols = np.concatenate(cols)
+        if system.mode == 'adjoint':
+            rows, cols = cols, rows
+
+        pattern = coo_matrix((np.ones(len(rows), dtype=np.int8),
+                              (rows, cols)), shape=(n_edge, n_edge))
+        return pattern.tocsc().astype(bool)
+
+    def coloring(self):
+        """ Return the sparsity pattern and a greedy coloring of its columns
+        such that columns with the same color share no rows. Both are cached
+        per mode, since they only depend on the structure of the system."""
+
+        mode = self._system.mode
+        if mode not in self._colorings:
+            pattern = self.sparsity()
+            n_edge = pattern.shape[1]
+
+            # Columns that share a row are neighbors.
+            conflicts = (pattern.T * pattern).tocsr()
+            colors = -np.ones(n_edge, dtype=int)
+            forbidden = np.zeros(n_edge+1, dtype=bool)
+            nnz = np.diff(pattern.indptr)
+
+            for col in np.argsort(-nnz, kind='mergesort'):
+                neighbors = conflicts.indices[conflicts.indptr[col]:
+                                              conflicts.indptr[col+1]]
+                used = colors[neighbors]
+                used = used[used >= 0]
+                forbidden[used] = True
+                colors[col] = np.argmin(forbidden)
+                forbidden[used] = False
+
+            self._colorings[mode] = (pattern, colors)
+
+        return self._colorings[mode]
+
+    def assemble_sparse(self):
+        """ Return the operator as a sparse matrix in CSC format. One
+        Jacobian-vector product is needed per color. The result is checked
+        against a product with a random vector, and if the structural
+        sparsity missed anything, the matrix is rebuilt one column at a
+        time instead."""
+
+        system = self._system
+        n_edge = self.A.shape[0]
+        pattern, colors = self.coloring()
+
+        rows = []
+        cols = []
+        data = []
+        for color in xrange(colors.max()+1 if n_edge else 0):
+            in_color = np.flatnonzero(colors == color)
+            arg = np.zeros(n_edge)
+            arg[in_color] = 1.0
+            result = self.mult(arg)
+
+            sub = pattern[:, in_color]
+            rows.append(sub.indices)
+            cols.append(np.repeat(in_color, np.diff(sub.indptr)))
+            data.append(result[sub.indices])
+
+        matrix = self._build(rows, cols, data)
+
+        arg = np.random.RandomState(0).uniform(size=n_edge)
+        expected = self.mult(arg)
+        if not np.allclose(matrix.dot(arg), expected, rtol=1e-8,
+                           atol=1e-10*max(np.abs(expected).max(), 1.0)):
+            logger.debug("In '%s', the structural sparsity of the Jacobian "
+                         "is incomplete. Assembling it one column at a "
+                         "time.", system.name)
+
+            rows = []
+            cols = []
+            data = []
+            arg = np.zeros(n_edge)
+            for icol in xrange(n_edge):
+                arg[icol] = 1.0
+                result = self.mult(arg)
+                arg[icol] = 0.0
+
+                nonzero = np.flatnonzero(result)
+                rows.append(nonzero)
+                cols.append(np.repeat(icol, len(nonzero)))
+                data.append(result[nonzero])
+
+            matrix = self._build(rows, cols, data)
+
+        return matrix
+
+    def _build(self, rows, cols, data):
+        """ Build a CSC matrix from lists of COO triplet arrays. """
+
+        n_edge = self.A.shape[0]
+        if rows:
+            rows = np.concatenate(rows)
+            cols = np.concatenate(cols)
+            data = np.concatenate(data)
+        return coo_matrix((data, (rows, cols)),
+                          shape=(n_edge, n_edge)).tocsc()
+
+
 class PETSc_KSP(LinearSolver):
     """ PETSc's KSP solver with preconditioning. MPI is supported."""
 
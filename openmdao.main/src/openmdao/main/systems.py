@@ -12,7 +12,8 @@ from openmdao.main.mpiwrap import MPI, MPI_info, PETSc, get_norm, make_idx_array
                                   to_idx_array, idx_arr_type
 from openmdao.main.exceptions import RunStopped
 from openmdao.main.finite_difference import FiniteDifference, DirectionalFD
-from openmdao.main.linearsolver import ScipyGMRES, PETSc_KSP, LinearGS
+from openmdao.main.linearsolver import ScipyGMRES, PETSc_KSP, LinearGS, \
+                                      DirectSparseSolver
 from openmdao.main.mp_support import has_interface
 from openmdao.main.interfaces import IDriver, IAssembly, IImplicitComponent, \
                                      ISolver, IPseudoComp, IComponent, ISystem
@@ -786,16 +787,18 @@ class System(object):
 
             solver_choice = self.options.lin_solver
 
-            # scipy_gmres not supported in MPI, so swap with
-            # petsc KSP.
-            if MPI and solver_choice=='scipy_gmres':
-                solver_choice = 'petsc_ksp'
-                msg = "scipy_gmres optimizer not supported in MPI. " + \
+            # scipy_gmres and direct_sparse not supported in MPI, so swap
+            # with petsc KSP.
+            if MPI and solver_choice in ('scipy_gmres', 'direct_sparse'):
+                msg = "%s optimizer not supported in MPI. " % solver_choice + \
                       "Using petsc_ksp instead."
+                solver_choice = 'petsc_ksp'
                 self.options.parent._logger.warning(msg)
 
             if solver_choice == 'scipy_gmres':
                 self.ln_solver = ScipyGMRES(self)
+            elif solver_choice == 'direct_sparse':
+                self.ln_solver = DirectSparseSolver(self)
             elif solver_choice == 'petsc_ksp':
                 self.ln_solver = PETSc_KSP(self)
             elif solver_choice == 'linear_gs':
@@ -807,6 +810,9 @@ class System(object):
         for subsystem in self.local_subsystems():
             subsystem.linearize()
 
+        if self.ln_solver is not None:
+            self.ln_solver.reset()
+
     def set_complex_step(self, complex_step=False):
         """ Toggles complex_step plumbing for this system and all
         local subsystems.
@@ -990,8 +996,35 @@ class SimpleSystem(System):
         self.mpi.requested_cpus = cpus
         self._comp = comp
         self.J = None
+        self._applyJ_cache = {}
         self._mapped_resids = {}
         self.distrib_idxs = {}
+        self._vec_outs = None
+
+    def setup_vectors(self, arrays=None, state_resid_map=None):
+        self._vec_outs = None
+        vecs = super(SimpleSystem, self).setup_vectors(arrays, state_resid_map)
+
+        # Array outputs with 'vector_view' metadata are replaced by views
+        # into the u vector, avoiding copies to and from the component.
+        if self._comp is not None and self.is_active():
+            cname = self._comp.name
+            for node in self._get_vec_outs():
+                comp, _, vname = node[0].partition('.')
+                if comp == cname and '.' not in vname and '[' not in vname \
+                   and self._comp.get_metadata(vname, 'vector_view'):
+                    self.vec['u'].bind_to_scope(self.scope, node)
+        return vecs
+
+    def _get_vec_outs(self):
+        """Return the output nodes copied into the u vector after a run.
+        They're found once per setup rather than on every run.
+        """
+        if self._vec_outs is None:
+            graph = self.scope._reduced_graph
+            self._vec_outs = [n for n in graph.successors(self.name)
+                                  if n in self.vector_vars]
+        return self._vec_outs
 
     def setup_sizes(self):
         super(SimpleSystem, self).setup_sizes()
@@ -1162,14 +1195,11 @@ class SimpleSystem(System):
 
         if self.is_active():
             #print "    runsys", str(self.name)
-            graph = self.scope._reduced_graph
-
             self._comp.set_itername('%s-%s' % (iterbase, self.name))
             self._comp.run(case_uuid=case_uuid)
 
             # put component outputs in u vector
-            vnames = [n for n in graph.successors(self.name)
-                                   if n in self.vector_vars]
+            vnames = self._get_vec_outs()
             self.vec['u'].set_from_scope(self.scope, vnames)
 
             if self.complex_step is True:
@@ -1180,8 +1210,6 @@ class SimpleSystem(System):
         internal solve (for implicit comps.)
         """
         if self.is_active():
-            graph = self.scope._reduced_graph
-
             vec = self.vec
             vec['f'].array[:] = vec['u'].array[:]
 
@@ -1189,8 +1217,7 @@ class SimpleSystem(System):
             self._comp.run(case_uuid=case_uuid)
 
             # put component outputs in u vector
-            vnames = [n for n in graph.successors(self.name)
-                                   if n in self.vector_vars]
+            vnames = self._get_vec_outs()
             self.vec['u'].set_from_scope(self.scope, vnames)
 
             if self.complex_step is True:
@@ -1206,6 +1233,7 @@ class SimpleSystem(System):
 
     def linearize(self):
         """ Linearize this component. """
+        self._applyJ_cache = {}
         self.J = self._comp.linearize(first=True)
 
     def applyJ(self, variables):
@@ -1458,6 +1486,7 @@ class AssemblySystem(SimpleSystem):
     def linearize(self):
         """ Calculates and saves the Jacobian for this subassy. """
 
+        self._applyJ_cache = {}
         inner_system = self._comp._system
         options = self._comp.driver.gradient_options
 
@@ -2311,6 +2340,7 @@ class OpaqueSystem(SimpleSystem):
         Jacobian.
         """
 
+        self._applyJ_cache = {}
         inner_system = self._inner_system
         inputs = self.list_inputs() + self.list_states()
         outputs = self.list_outputs()
@@ -2508,6 +2538,9 @@ class TransparentDriverSystem(DriverSystem):
         for subsystem in self.local_subsystems():
             subsystem.linearize()
 
+        if self.ln_solver is not None:
+            self.ln_solver.reset()
+
     def solve_linear(self, options=None):
         """ Single linear solve solution applied to whatever input is sitting
         in the RHS vector."""
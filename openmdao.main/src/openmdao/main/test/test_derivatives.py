@@ -1080,6 +1080,34 @@ Max RelError: [^ ]+ for comp.f_xy / comp.x
             self.fail("check_gradient() output doesn't match expected")
 
 
+    def test_relinearize(self):
+
+        top = set_as_top(Assembly())
+        top.add('comp', Paraboloid())
+        top.add('driver', SimpleDriver())
+        top.driver.workflow.add(['comp'])
+        top.driver.add_parameter('comp.x', low=-1000, high=1000)
+        top.driver.add_parameter('comp.y', low=-1000, high=1000)
+        top.driver.add_objective('comp.f_xy')
+
+        for mode in ['forward', 'adjoint']:
+            top.comp.x = 3
+            top.comp.y = 5
+            top.run()
+
+            J = top.driver.calc_gradient(outputs=['comp.f_xy'], mode=mode)
+            assert_rel_error(self, J[0, 0], 5.0, 0.0001)
+            assert_rel_error(self, J[0, 1], 21.0, 0.0001)
+
+            # The new Jacobian must be used, not the one from last time.
+            top.comp.x = 0
+            top.comp.y = 0
+            top.run()
+
+            J = top.driver.calc_gradient(outputs=['comp.f_xy'], mode=mode)
+            assert_rel_error(self, J[0, 0], -6.0, 0.0001)
+            assert_rel_error(self, J[0, 1], 8.0, 0.0001)
+
     def test_input_as_output(self):
 
         top = set_as_top(Assembly())
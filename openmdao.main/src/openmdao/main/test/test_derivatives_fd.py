@@ -417,6 +417,98 @@ class TestFiniteDifference(unittest.TestCase):
         systems = top._system.dump(stream=None)
         self.assertTrue('FD_' not in systems)
 
+    def test_fd_num_procs(self):
+
+        top = set_as_top(Assembly())
+        top.add('comp', ArrayComp2D())
+        top.add('comp2', MyComp())
+        top.connect('comp.y[0][1]', 'comp2.x1')
+        top.driver.workflow.add(['comp', 'comp2'])
+        top.driver.gradient_options.force_fd = True
+        top.comp.x = np.array([[1.0, 2.0], [3.0, 4.0]])
+
+        top.run()
+
+        inputs = ['comp.x', 'comp2.x2', 'comp2.x3']
+        outputs = ['comp.y', 'comp2.y']
+
+        for form in ['forward', 'central', 'complex_step']:
+            top.driver.gradient_options.fd_form = form
+
+            top.driver.gradient_options.fd_num_procs = 1
+            J_serial = top.driver.calc_gradient(inputs, outputs)
+            J_dict_serial = top.driver.calc_gradient(inputs, outputs,
+                                                     return_format='dict')
+
+            top.driver.gradient_options.fd_num_procs = 3
+            J = top.driver.calc_gradient(inputs, outputs)
+            J_dict = top.driver.calc_gradient(inputs, outputs,
+                                              return_format='dict')
+
+            self.assertEqual(J.shape, J_serial.shape)
+            assert_rel_error(self, np.linalg.norm(J - J_serial), 0.0, 1e-6)
+            for okey in outputs:
+                for ikey in inputs:
+                    diff = J_dict[okey][ikey] - J_dict_serial[okey][ikey]
+                    assert_rel_error(self, np.linalg.norm(diff), 0.0, 1e-6)
+
+        # Model state is untouched by the workers.
+        assert_rel_error(self, top.comp.y[0][1], 46.0, 1e-12)
+        self.assertEqual(top.comp2.x1, 46.0)
+
+    def test_fd_coloring(self):
+
+        top = set_as_top(Assembly())
+        top.add('comp', ArrayComp2D())
+        names = ['comp1', 'comp2', 'comp3']
+        for name in names:
+            top.add(name, MyComp())
+        top.driver.workflow.add(['comp'] + names)
+        top.driver.gradient_options.force_fd = True
+        top.comp.x = np.array([[1.0, 2.0], [3.0, 4.0]])
+
+        inputs = ['comp.x', 'comp1.x2', 'comp2.x1', 'comp3.x1', 'comp3.x2']
+        outputs = ['comp.y', 'comp1.y', 'comp2.y', 'comp3.y']
+
+        for form in ['forward', 'central', 'complex_step']:
+            top.run()
+            top.driver.gradient_options.fd_form = form
+            top.driver.gradient_options.fd_coloring = 'off'
+            J_base = top.driver.calc_gradient(inputs, outputs)
+
+            for coloring in ['graph', 'probe']:
+                top.driver.gradient_options.fd_coloring = coloring
+                J = top.driver.calc_gradient(inputs, outputs)
+                assert_rel_error(self, np.linalg.norm(J - J_base), 0.0, 1e-6)
+
+        # Each element of comp.x needs its own run, but the remaining inputs
+        # can share them.
+        top.run()
+        top.driver.gradient_options.fd_form = 'forward'
+        top.driver.gradient_options.fd_coloring = 'off'
+        J_base = top.driver.calc_gradient(inputs, outputs)
+
+        top.driver.gradient_options.fd_coloring = 'graph'
+        count = top.comp3.exec_count
+        J = top.driver.calc_gradient(inputs, outputs)
+        self.assertEqual(top.comp3.exec_count - count, 4)
+        assert_rel_error(self, np.linalg.norm(J - J_base), 0.0, 1e-6)
+
+        # Subsequent calls in probe mode reuse the pattern from the first.
+        top.driver.gradient_options.fd_coloring = 'probe'
+        count = top.comp3.exec_count
+        top.driver._calc_gradient(inputs, outputs, force_regen=True)
+        self.assertEqual(top.comp3.exec_count - count, 8)
+        count = top.comp3.exec_count
+        J = top.driver._calc_gradient(inputs, outputs)
+        self.assertEqual(top.comp3.exec_count - count, 4)
+        assert_rel_error(self, np.linalg.norm(J - J_base), 0.0, 1e-6)
+
+        J = top.driver.calc_gradient(inputs, outputs, return_format='dict')
+        assert_rel_error(self, J['comp.y']['comp.x'][2, 3], 8.0, 1e-4)
+        assert_rel_error(self, J['comp3.y']['comp3.x2'][0, 0], 4.2, 1e-4)
+        self.assertEqual(J['comp2.y']['comp3.x1'][0, 0], 0.0)
+
 if __name__ == '__main__':
     import nose
     import sys
@@ -165,6 +165,105 @@ class Testcase_Scipy_Gmres(unittest.TestCase):
         assert_rel_error(self, J[0, 0], 5.0, 0.0001)
         assert_rel_error(self, J[0, 1], 21.0, 0.0001)
 
+    def test_scipy_gmres_block_solve(self):
+
+        top = set_as_top(Assembly())
+        top.add('comp', ArrayComp2D())
+        top.add('comp2', ArrayComp2D())
+        top.connect('comp.y', 'comp2.x')
+        top.driver.workflow.add(['comp', 'comp2'])
+        top.driver.gradient_options.block_rhs = True
+        top.comp.x = np.array([[1.0, 2.0], [3.0, 4.0]])
+        top.run()
+
+        A = top.comp.provideJ()
+
+        # Eight adjoint right-hand sides on twelve unknowns is cheaper to
+        # factor than to solve one at a time.
+        J = top.driver.calc_gradient(inputs=['comp.x'],
+                                     outputs=['comp2.y', 'comp.y'],
+                                     mode='adjoint')
+        diff = J - np.vstack((A.dot(A), A))
+        assert_rel_error(self, np.linalg.norm(diff), 0.0, 1e-8)
+
+        J = top.driver.calc_gradient(inputs=['comp.x'],
+                                     outputs=['comp2.y', 'comp.y'],
+                                     mode='adjoint', return_format='dict')
+        diff = J['comp2.y']['comp.x'] - A.dot(A)
+        assert_rel_error(self, np.linalg.norm(diff), 0.0, 1e-8)
+
+        # The block solution matches individual GMRES solves.
+        solver = top.driver.workflow._system.ln_solver
+        rhs_indices = range(8)
+        dxs = solver.solve_block(rhs_indices)
+        self.assertEqual(dxs.shape, (12, 8))
+        for k, irhs in enumerate(rhs_indices):
+            rhs = np.zeros(12)
+            rhs[irhs] = 1.0
+            diff = dxs[:, k] - solver.solve(rhs)
+            assert_rel_error(self, np.linalg.norm(diff), 0.0, 1e-6)
+
+        self.assertEqual(solver.solve_block(rhs_indices[:4]), None)
+
+        top.driver.gradient_options.block_rhs = False
+        self.assertEqual(solver.solve_block(rhs_indices), None)
+
+
+class Testcase_Direct_Sparse(unittest.TestCase):
+    """ Test direct sparse linear solver. """
+
+    def test_direct_sparse_chain(self):
+
+        top = set_as_top(Assembly())
+        top.add('comp', ArrayComp2D())
+        top.add('comp2', ArrayComp2D())
+        top.connect('comp.y', 'comp2.x')
+        top.driver.workflow.add(['comp', 'comp2'])
+        top.driver.gradient_options.lin_solver = 'direct_sparse'
+        top.comp.x = np.array([[1.0, 2.0], [3.0, 4.0]])
+        top.run()
+
+        A = top.comp.provideJ()
+
+        for mode in ('forward', 'adjoint'):
+            J = top.driver.calc_gradient(inputs=['comp.x'],
+                                         outputs=['comp2.y', 'comp.y'],
+                                         mode=mode)
+            diff = J - np.vstack((A.dot(A), A))
+            assert_rel_error(self, np.linalg.norm(diff), 0.0, 1e-8)
+
+            solver = top.driver.workflow._system.ln_solver
+            self.assertTrue(solver.lu)
+
+            # The assembled matrix matches the operator.
+            matrix = solver.assemble_sparse().todense()
+            diff = matrix - solver.assemble()
+            assert_rel_error(self, np.linalg.norm(diff), 0.0, 1e-12)
+
+            # Independent columns share a product.
+            pattern, colors = solver.coloring()
+            self.assertTrue(colors.max() + 1 < pattern.shape[1])
+
+    def test_direct_sparse_newton(self):
+
+        top = set_as_top(Sellar_MDA_subbed_connected())
+        top.subdriver.gradient_options.lin_solver = 'direct_sparse'
+        top.driver.gradient_options.lin_solver = 'direct_sparse'
+        top.run()
+
+        assert_rel_error(self, top.d1.y2, top.d2.y2, 1e-6)
+
+        J = top.driver.calc_gradient(mode='forward')
+        J_adj = top.driver.calc_gradient(mode='adjoint')
+
+        top.driver.gradient_options.lin_solver = 'scipy_gmres'
+        top.subdriver.gradient_options.lin_solver = 'scipy_gmres'
+        top.run()
+        J_gmres = top.driver.calc_gradient(mode='forward')
+
+        assert_rel_error(self, J[0, 0], J_gmres[0, 0], 1e-6)
+        assert_rel_error(self, J_adj[0, 0], J_gmres[0, 0], 1e-6)
+
 
 class Testcase_Linear_GS(unittest.TestCase):
     """ Test Linear Gauss Siedel linear solver. """
@@ -61,6 +61,8 @@ class ArchitectureAssemblyTest(unittest.TestCase):
         del data
 
         os.remove(cds_path)
+        if os.path.exists(cds_path+'.idx'):
+            os.remove(cds_path+'.idx')
 
 class ProblemFormulationTest(unittest.TestCase):
 
@@ -1,7 +1,11 @@
 
 import unittest
+
+import numpy as np
+
 from openmdao.main.api import set_as_top, Assembly, Component
-from openmdao.main.datatypes.api import Float
+from openmdao.main.datatypes.api import Array, Float, List, Str
+from openmdao.main.vecwrapper import SerialScatter
 
 class Simple(Component):
 
@@ -18,6 +22,36 @@ class Simple(Component):
         self.d = self.a - self.b
 
 
+class ArrayComp(Component):
+
+    x = Array(np.zeros((2, 2)), iotype='in')
+    y = Array(np.zeros((2, 2)), iotype='out')
+
+    def execute(self):
+        self.y = 2.0 * self.x
+
+
+class NoFlatComp(Component):
+
+    names = List(iotype='in')
+    label = Str(iotype='in')
+    names_out = List(iotype='out')
+    label_out = Str(iotype='out')
+
+    def execute(self):
+        self.names_out = self.names + ['x']
+        self.label_out = self.label + 'x'
+
+
+class ViewComp(Component):
+
+    x = Array(np.zeros((2, 2)), iotype='in')
+    y = Array(np.zeros((2, 2)), iotype='out', vector_view=True)
+
+    def execute(self):
+        self.y[:] = 3.0 * self.x
+
+
 def _nested_model():
     top = set_as_top(Assembly())
     top.add('sub', Assembly())
@@ -83,7 +117,138 @@ class VecWrapperTestCase(unittest.TestCase):
                               ('comp4.d', ('comp6.a',))]))
                 
         self.assertEqual(top.sub._system.vec['u'].array.size, 15)
+
+    def test_scope_transfer(self):
+        top = set_as_top(Assembly())
+        top.add('comp1', ArrayComp())
+        top.add('comp2', ArrayComp())
+        top.add('comp3', Simple())
+        top.connect('comp1.y', 'comp2.x')
+        top.connect('comp2.y[0, 1]', 'comp3.a')
+        top.driver.workflow.add(['comp1', 'comp2', 'comp3'])
+        top.comp1.x = np.array([[1., 2.], [3., 4.]])
+        top.run()
+
+        uvec = top._system.vec['u']
+        self.assertEqual(list(uvec['comp1.y']), [2., 4., 6., 8.])
+        self.assertEqual(list(uvec['comp3.a']), [8.])
+        self.assertEqual(top.comp3.a, 8.)
+        self.assertEqual(top.comp3.c, 10.)
+
+        # Plans are cached per vector and reused.
+        plans = dict(uvec._plans)
+        self.assertTrue(plans)
+        top.comp1.x = np.array([[0., 1.], [0., 1.]])
+        top.run()
+        self.assertEqual(list(uvec['comp1.y']), [0., 2., 0., 2.])
+        self.assertEqual(top.comp3.a, 4.)
+        for key, plan in uvec._plans.items():
+            if key in plans:
+                self.assertTrue(plan is plans[key])
+
+        uvec['comp1.y'] = np.array([5., 6., 7., 8.])
+        uvec['comp3.a'] = 3.
+        uvec.set_to_scope(top)
+        self.assertEqual(top.comp2.x.tolist(), [[5., 6.], [7., 8.]])
+        self.assertEqual(top.comp3.a, 3.)
+        self.assertEqual(top.comp2.y[0, 1], 3.)
+        top.comp1.y = np.array([[1., 1.], [2., 2.]])
+        uvec.set_from_scope(top)
+        self.assertEqual(list(uvec['comp1.y']), [1., 1., 2., 2.])
+        top.comp2.y = np.array([[1., 9.], [2., 2.]])
+        uvec.set_from_scope(top)
+        self.assertEqual(list(uvec['comp3.a']), [9.])
+
+        # A configuration change discards the vectors and their plans.
+        top.add('comp4', Simple())
+        top.connect('comp3.c', 'comp4.a')
+        top.driver.workflow.add('comp4')
+        top.run()
+        self.assertFalse(top._system.vec['u'] is uvec)
+        self.assertEqual(top.comp4.c, 8.)
  
+    def test_vector_view(self):
+        top = set_as_top(Assembly())
+        top.add('comp1', ArrayComp())
+        top.add('comp2', ViewComp())
+        top.add('comp3', ArrayComp())
+        top.connect('comp1.y', 'comp2.x')
+        top.connect('comp2.y', 'comp3.x')
+        top.driver.workflow.add(['comp1', 'comp2', 'comp3'])
+        top.comp1.x = np.array([[1., 2.], [3., 4.]])
+        top.run()
+
+        uvec = top._system.vec['u']
+        self.assertTrue(np.may_share_memory(top.comp2.y, uvec.array))
+        self.assertFalse(np.may_share_memory(top.comp1.y, uvec.array))
+        self.assertEqual(list(uvec['comp2.y']), [6., 12., 18., 24.])
+        self.assertEqual(top.comp3.y.tolist(), [[12., 24.], [36., 48.]])
+
+        # In-place updates go straight to the vector.
+        comp2_y = top.comp2.y
+        top.comp1.x = np.array([[1., 1.], [1., 1.]])
+        top.run()
+        self.assertTrue(top.comp2.y is comp2_y)
+        self.assertEqual(list(uvec['comp2.y']), [6., 6., 6., 6.])
+        self.assertEqual(top.comp3.y.tolist(), [[12., 12.], [12., 12.]])
+
+        # Replacing the array still works, it's just copied.
+        top.comp2.y = np.array([[1., 2.], [3., 4.]])
+        uvec.set_from_scope(top)
+        self.assertEqual(list(uvec['comp2.y']), [1., 2., 3., 4.])
+
+    def test_noflat_transfer(self):
+        top = set_as_top(Assembly())
+        for name in ('comp1', 'comp2', 'comp3'):
+            top.add(name, NoFlatComp())
+            top.driver.workflow.add(name)
+        for dest in ('comp2', 'comp3'):
+            top.connect('comp1.names_out', dest+'.names')
+            top.connect('comp1.label_out', dest+'.label')
+        top.run()
+
+        # Each destination gets its own copy of a mutable value.
+        self.assertEqual(top.comp2.names, ['x'])
+        self.assertEqual(top.comp3.names, ['x'])
+        self.assertFalse(top.comp2.names is top.comp3.names)
+        self.assertEqual(top.comp2.label, 'x')
+        self.assertEqual(top.comp3.label, 'x')
+
+    def test_serial_scatter(self):
+        src = np.arange(80.)
+        src_idxs = np.array(range(0, 40) + range(45, 80) + [3])
+        dest_idxs = np.array(range(76))
+        scatter = SerialScatter(src, src_idxs, np.zeros(76), dest_idxs)
+        self.assertEqual(len(scatter.runs), 3)
+
+        dest = np.zeros(76)
+        scatter.scatter(src, dest, False, 'forward')
+        self.assertEqual(dest.tolist(), src[src_idxs].tolist())
+
+        # Adjoint accumulates repeated sources.
+        result = np.zeros(80)
+        scatter.scatter(np.ones(76), result, True, 'adjoint')
+        expected = np.zeros(80)
+        np.add.at(expected, src_idxs, 1.)
+        self.assertEqual(result.tolist(), expected.tolist())
+
+        # Scattered indices with repeats go through bincount.
+        src_idxs = np.array([5, 1, 5, 7, 1, 5])
+        scatter = SerialScatter(src, src_idxs, np.zeros(6), np.arange(6))
+        self.assertEqual(scatter.runs, None)
+        result = np.zeros(80)
+        scatter.scatter(np.arange(6.), result, True, 'adjoint')
+        self.assertEqual(result[[1, 5, 7]].tolist(), [5., 7., 3.])
+        self.assertEqual(result.sum(), 15.)
+
+        # A repeated connection is only transferred once.
+        scatter = SerialScatter(src, [0, 1, 0, 1, 2], np.zeros(3),
+                                [0, 1, 0, 1, 2])
+        self.assertEqual(scatter.src_idxs, slice(0, 3, 1))
+        result = np.zeros(80)
+        scatter.scatter(np.ones(3), result, True, 'adjoint')
+        self.assertEqual(result.sum(), 3.)
+
 
 if __name__ == "__main__":
     unittest.main()
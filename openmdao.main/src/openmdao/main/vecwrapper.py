@@ -7,14 +7,24 @@ from openmdao.main.mpiwrap import MPI, create_petsc_vec, PETSc, make_idx_array,
 from openmdao.main.array_helpers import offset_flat_index, \
                                         get_flat_index_start, get_val_and_index, get_shape, \
                                         get_flattened_index, to_slice, to_indices
-from openmdao.main.interfaces import IImplicitComponent
+from openmdao.main.interfaces import IImplicitComponent, IComponent, \
+                                     IContainerProxy, IOverrideSet
 from openmdao.main.datatypes.file import FileRef
 
-from openmdao.util.typegroups import int_types
+from openmdao.util.typegroups import int_types, complex_or_real_types
 from openmdao.util.graph import base_var
 
 ViewInfo = namedtuple('ViewInfo', 'view, start, idxs, size, hide')
 
+# SerialScatter copies contiguous runs as blocks if they average at least
+# this many entries, otherwise it uses fancy indexing.
+MIN_RUN_LENGTH = 16
+
+# Non-flat values of these types can't be modified in place, so they're
+# shared between source and destinations rather than copied.
+_IMMUTABLE_TYPES = (basestring, bool, int, long, float, complex,
+                    type(None))
+
 
 class VecWrapperBase(object):
     """A wrapper object for a local vector, a distributed PETSc vector,
@@ -25,6 +35,8 @@ class VecWrapperBase(object):
         self.array = array
         self.name = name
         self._info = OrderedDict() # dict of ViewInfos
+        self._plans = {} # cached transfer plans, see _get_plan
+        self._bound = {} # scope arrays that are views into our array
 
         # create the PETSc vector
         self.petsc_vec = create_petsc_vec(system.mpi.comm,
@@ -53,6 +65,7 @@ class VecWrapperBase(object):
         info = self._info[base]
         newinfo = ViewInfo(info.view, info.start, info.idxs, info.size, True)
         self._info[name] = newinfo
+        self._plans.clear()
 
     def _add_subview(self, scope, name):
         var = scope._var_meta[name]
@@ -66,6 +79,7 @@ class VecWrapperBase(object):
             substart = get_flat_index_start(sub_idx)
             self._info[name] = ViewInfo(base.view, substart, to_slice(idx),
                                         len(to_indices(idx, base.view)), True)
+            self._plans.clear()
 
             if self.array[sub_idx].size != sz:
                 raise RuntimeError("size mismatch: in system %s, view for %s is %s, idx=%s, size=%d" %
@@ -171,6 +185,31 @@ class VecWrapperBase(object):
             self[name] = arr[start:end]
             start += size
 
+    def _get_plan(self, scope, vnames, dests):
+        """Return the transfer plan between our array and `scope` for
+        `vnames`, a list of ``(name, view, idxs, accessors, bound)``, where
+        `bound` is the scope array sharing our storage (see
+        :meth:`VecWrapper.bind_to_scope`) or None.  `dests` is a
+        function returning the scope paths for a name. Plans are built on
+        first use and live as long as this vector, which is rebuilt
+        whenever the configuration changes.
+        """
+        key = (id(scope), dests, None if vnames is None else tuple(vnames))
+        plan = self._plans.get(key)
+        if plan is None:
+            if vnames is None:
+                vnames = self.keys()
+            else:
+                vnames = [n for n in vnames if n in self]
+            plan = []
+            for name in vnames:
+                info = self._info[name]
+                plan.append((name, info.view, info.idxs,
+                             [_accessor(scope, path) for path in dests(name)],
+                             self._bound.get(name)))
+            self._plans[key] = plan
+        return plan
+
     def _is_var_idx(self, info, idx):
         if isinstance(info.idxs, slice):
             if info.idxs.step == 1 or info.idxs.step is None:
@@ -292,16 +331,50 @@ class VecWrapper(VecWrapperBase):
         """Get the named values from the given scope and set flattened
         versions of them in our array.
         """
-        if vnames is None:
-            vnames = self.keys()
-        else:
-            vnames = [n for n in vnames if n in self]
-
-        for name in vnames:
-            if isinstance(name, tuple):
-                self[name] = scope.get_flattened_value(name[0]).real
-            else:
-                self[name] = scope.get_flattened_value(name).real
+        for name, view, idxs, accessors, bound in \
+                self._get_plan(scope, vnames, _src_path):
+            path, obj, attr, shape = accessors[0]
+            if obj is not None:
+                try:
+                    if shape is None:
+                        view[idxs] = getattr(obj, attr).real
+                    else:
+                        val = getattr(obj, attr)
+                        if val is not bound:  # Else already in our array.
+                            view[idxs] = val.real.ravel()
+                    continue
+                except Exception:
+                    pass  # Let the general case report the problem.
+            self[name] = scope.get_flattened_value(path).real
+
+    def bind_to_scope(self, scope, name):
+        """Replace the array variable for `name` in `scope` with a view
+        into our array holding the same values, so the vector and the
+        variable share storage and nothing is copied between them as long
+        as the variable is updated in place.  Returns True if the variable
+        could be bound.
+        """
+        path = name[0] if isinstance(name, tuple) else name
+        path, obj, attr, shape = _accessor(scope, path)
+        if obj is None or shape is None:
+            return False
+
+        info = self._info[name]
+        val = getattr(obj, attr)
+        if val.dtype.kind != 'f' or val.size != info.size or \
+           info.idxs != slice(None):
+            return False
+
+        bound = info.view.view()
+        try:
+            bound.shape = shape  # Fails rather than copy.
+        except AttributeError:
+            return False
+        bound[:] = val
+        setattr(obj, attr, bound)
+        self._bound[name] = bound
+        self._plans.clear()
+        return True
 
     def set_from_scope_complex(self, scope, vnames=None):
         """Get the named values from the given scope and set flattened
@@ -322,22 +395,7 @@ class VecWrapper(VecWrapperBase):
         """Pull values for the given set of names out of our array
         and set them into the given scope.
         """
-        if vnames is None:
-            vnames = self.keys()
-        else:
-            vnames = [n for n in vnames if n in self]
-
-        for name in vnames:
-            if isinstance(name, tuple):
-                array_val = self[name]
-                scope.set_flattened_value(name[0], array_val)
-                for dest in name[1]:
-                    if dest != name[0]:
-                        scope.set_flattened_value(dest, array_val)
-                        #print "scope set", dest, array_val
-            else:
-                scope.set_flattened_value(name, self[name])
-                #print "scope set", name, self[name]
+        _set_to_scope(scope, self._get_plan(scope, vnames, _all_paths))
 
 
 class InputVecWrapper(VecWrapperBase):
@@ -406,20 +464,7 @@ class InputVecWrapper(VecWrapperBase):
         """Pull values for the given set of names out of our array
         and set them into the given scope.
         """
-        if vnames is None:
-            vnames = self.keys()
-        else:
-            vnames = [n for n in vnames if n in self]
-
-        for name in vnames:
-            array_val = self[name]
-            if isinstance(name, tuple):
-                for dest in name[1]:
-                    scope.set_flattened_value(dest, array_val)
-                    #print "scope set", dest, array_val
-            else:
-                scope.set_flattened_value(name, array_val)
-                #print "scope set", name, array_val
+        _set_to_scope(scope, self._get_plan(scope, vnames, _dest_paths))
 
     def set_to_scope_complex(self, scope, vnames=None):
         """Pull values for the given set of names out of our array
@@ -468,6 +513,8 @@ class DataTransfer(object):
         self.scatter = None
         self.scatter_conns = scatter_conns
         self.noflat_vars = sorted(noflat_vars)
+        self._noflat_xfers = [(src, [dest for dest in dests if dest != src])
+                              for src, dests in self.noflat_vars]
 
         if not (MPI or scatter_conns or noflat_vars):
             return  # no data to xfer
@@ -580,15 +627,20 @@ class DataTransfer(object):
                                 system.scope.reraise_exception("cannot set '%s' from '%s'" %
                                                                (dest, src), sys.exc_info())
             else:
-                for src, dests in self.noflat_vars:
+                scope = system.scope
+                for src, dests in self._noflat_xfers:
+                    # Values that can't change in place are shared, others
+                    # are copied (if their metadata says so) per destination.
+                    fetch = True
                     for dest in dests:
-                        if src != dest:
-                            try:
-                                system.scope.set(dest,
-                                                 system.scope.get_attr_w_copy(src))
-                            except Exception:
-                                system.scope.reraise_exception("cannot set '%s' from '%s'" %
-                                                               (dest, src), sys.exc_info())
+                        try:
+                            if fetch:
+                                val = scope.get_attr_w_copy(src)
+                                fetch = not isinstance(val, _IMMUTABLE_TYPES)
+                            scope.set(dest, val)
+                        except Exception:
+                            scope.reraise_exception("cannot set '%s' from '%s'" %
+                                                    (dest, src), sys.exc_info())
 
     def dump(self, system, srcvec, destvec, nest=0, stream=sys.stdout):
         if not self.scatter_conns:
@@ -616,18 +668,93 @@ class DataTransfer(object):
 
 
 class SerialScatter(object):
+    """Transfers data between two local arrays. The transfer is planned
+    once: index arrays that are mostly contiguous become a list of block
+    copies, and reverse (adjoint) transfers that accumulate into the same
+    source entry more than once are summed with ``bincount``.
+    """
     def __init__(self, srcvec, src_idxs, destvec, dest_idxs):
-        self.src_idxs = to_slice(src_idxs)
-        self.dest_idxs = to_slice(dest_idxs)
         self.svec = srcvec
         self.dvec = destvec
+        self.runs = None
+        self._sums = None
+
+        if not (isinstance(src_idxs, slice) or isinstance(dest_idxs, slice)):
+            # The same connection may show up more than once (an array
+            # connected in full and by element). That's harmless going
+            # forward but would be summed twice in reverse.
+            src_idxs, dest_idxs = _unique_pairs(src_idxs, dest_idxs)
+
+        self.src_idxs = to_slice(src_idxs)
+        self.dest_idxs = to_slice(dest_idxs)
+
+        if isinstance(self.src_idxs, slice) and \
+           isinstance(self.dest_idxs, slice):
+            return
+
+        src = numpy.asarray(src_idxs, dtype=int)
+        dest = numpy.asarray(dest_idxs, dtype=int)
+
+        runs = _contiguous_runs(src, dest)
+        if len(runs) * MIN_RUN_LENGTH <= len(src):
+            self.runs = runs  # Runs handle repeated sources in order.
+        else:
+            uniq, inverse = numpy.unique(src, return_inverse=True)
+            if len(uniq) < len(src):
+                self._sums = (uniq, inverse)
 
     def scatter(self, srcvec, destvec, addv, mode):
         if addv is True:
-            destvec[self.src_idxs] += srcvec[self.dest_idxs]
+            if self.runs is not None:
+                for src, dest in self.runs:
+                    destvec[src] += srcvec[dest]
+            elif self._sums is not None:
+                uniq, inverse = self._sums
+                destvec[uniq] += numpy.bincount(inverse,
+                                                weights=srcvec[self.dest_idxs],
+                                                minlength=len(uniq))
+            else:
+                destvec[self.src_idxs] += srcvec[self.dest_idxs]
+        elif self.runs is not None:
+            for src, dest in self.runs:
+                destvec[dest] = srcvec[src]
         else:
             destvec[self.dest_idxs] = srcvec[self.src_idxs]
 
+
+def _unique_pairs(src, dest):
+    """Return `src` and `dest` index arrays with any repeated
+    ``(src, dest)`` pairs removed, keeping the original order.
+    """
+    src = numpy.asarray(src, dtype=int)
+    dest = numpy.asarray(dest, dtype=int)
+    if len(src) < 2:
+        return src, dest
+    pairs = numpy.empty(len(src), dtype=[('src', int), ('dest', int)])
+    pairs['src'] = src
+    pairs['dest'] = dest
+    first = numpy.unique(pairs, return_index=True)[1]
+    if len(first) == len(src):
+        return src, dest
+    first.sort()
+    return src[first], dest[first]
+
+
+def _contiguous_runs(src, dest):
+    """Return a list of ``(src_slice, dest_slice)`` covering the index
+    arrays `src` and `dest` in runs where both increase by one.
+    """
+    if len(src) == 0:
+        return []
+    breaks = numpy.nonzero((numpy.diff(src) != 1) |
+                           (numpy.diff(dest) != 1))[0] + 1
+    starts = [0] + breaks.tolist()
+    ends = breaks.tolist() + [len(src)]
+    return [(slice(src[start], src[start]+end-start),
+             slice(dest[start], dest[start]+end-start))
+            for start, end in zip(starts, ends)]
+
+
 def merge_idxs(src_idxs, dest_idxs):
     """Return source and destination index arrays, built up from
     smaller index arrays and combined in order of ascending source
@@ -665,6 +792,85 @@ def idx_merge(idxs):
                 return numpy.concatenate(idxs)
     return idxs
 
+def _src_path(name):
+    """Return the scope path read for a vector entry."""
+    if isinstance(name, tuple):
+        return [name[0]]
+    return [name]
+
+
+def _all_paths(name):
+    """Return the scope paths set from a VecWrapper entry."""
+    if isinstance(name, tuple):
+        return [name[0]]+[dest for dest in name[1] if dest != name[0]]
+    return [name]
+
+
+def _dest_paths(name):
+    """Return the scope paths set from an InputVecWrapper entry."""
+    if isinstance(name, tuple):
+        return list(name[1])
+    return [name]
+
+
+def _accessor(scope, path):
+    """Return ``(path, obj, attr, shape)`` where `attr` of `obj` is the
+    variable `path` in `scope` and `shape` is its array shape (None for a
+    scalar). `obj` is None if the variable can't be accessed directly, in
+    which case get_flattened_value/set_flattened_value must be used.
+    """
+    generic = (path, None, None, None)
+    if '[' in path:
+        return generic
+
+    parent, _, attr = path.rpartition('.')
+    if parent:
+        if '.' in parent:
+            return generic
+        obj = getattr(scope, parent, None)
+        if not IComponent.providedBy(obj):
+            return generic
+    else:
+        obj = scope
+
+    if IContainerProxy.providedBy(obj) or IOverrideSet.providedBy(obj):
+        return generic
+
+    try:
+        val = getattr(obj, attr)
+    except AttributeError:
+        return generic
+
+    if isinstance(val, int_types):
+        return generic
+    elif isinstance(val, complex_or_real_types):
+        return (path, obj, attr, None)
+    elif isinstance(val, ndarray) and val.dtype.kind in 'fc':
+        return (path, obj, attr, val.shape)
+    return generic
+
+
+def _set_to_scope(scope, plan):
+    """Set values from a vector into `scope` according to `plan`."""
+    for name, view, idxs, accessors, bound in plan:
+        array_val = view[idxs]
+        for path, obj, attr, shape in accessors:
+            if bound is not None and obj is not None and \
+               getattr(obj, attr) is bound:
+                bound = None
+                continue  # Already shares our array.
+            if obj is not None:
+                try:
+                    if shape is None:
+                        setattr(obj, attr, array_val[0])
+                    else:
+                        setattr(obj, attr, array_val.reshape(shape))
+                    continue
+                except Exception:
+                    pass  # Let the general case report the problem.
+            scope.set_flattened_value(path, array_val)
+
+
 def _filter(scope, lst):
     filtered = _filter_subs(lst)
     filtered = _filter_flat(scope, filtered)
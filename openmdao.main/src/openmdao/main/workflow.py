@@ -344,14 +344,27 @@ class Workflow(object):
 
         return record
 
-    def _record_case(self, case_uuid, err):
-        """ Record case in all recorders. """
-        driver = self.parent
-        scope = driver.parent
-        top = scope
+    def _record_case(self, case_uuid, err, data=None):
+        """ Record case in all recorders. `data` is an (inputs, outputs)
+        tuple from :meth:`_case_data`, gathered now if not given. """
+        top = self.parent
         while top.parent is not None:
             top = top.parent
 
+        if data is None:
+            data = self._case_data()
+        inputs, outputs = data
+
+        for recorder in top.recorders:
+            recorder.record(self.parent, inputs, outputs, err,
+                            case_uuid, self.parent._case_uuid)
+
+    def _case_data(self):
+        """ Return the (inputs, outputs) values to be recorded for the
+        current case. """
+        driver = self.parent
+        scope = driver.parent
+
         inputs = []
         outputs = []
 
@@ -406,10 +419,7 @@ class Workflow(object):
             except Exception as exc:
                 scope.raise_exception("Can't get '%s' for recording: %s"
                                       % (name, exc), RuntimeError)
-        # Record.
-        for recorder in top.recorders:
-            recorder.record(driver, inputs, outputs, err,
-                            case_uuid, self.parent._case_uuid)
+        return inputs, outputs
 
     def _iterbase(self):
         """ Return base for 'iteration coordinates'. """
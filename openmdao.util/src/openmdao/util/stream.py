@@ -229,6 +229,35 @@ class Stream(object):
 
         return data.reshape(shape, order=order) if reshape else data
 
+    def map_floats(self, shape, order='C'):
+        """
+        Returns floats as a copy-on-write :class:`numpy.memmap` of `shape`
+        onto the underlying file and positions the stream after them.
+        Data is only read from the file as it is accessed, and changes to
+        the array are never written back. Requires `binary` data. The file
+        must not be modified while the returned array is in use.
+
+        shape: tuple(int)
+            Dimensions of returned array.
+
+        order: string
+            If 'C', the data is in row-major order.
+            If 'Fortran', the data is in column-major order.
+        """
+        if not self.binary:
+            raise RuntimeError('memory mapping requires binary data')
+
+        dtype = numpy.dtype(numpy.float32 if self.single_precision
+                                          else numpy.float64)
+        dtype = dtype.newbyteorder('>' if self.big_endian else '<')
+        if order == 'Fortran':
+            order = 'F'
+        offset = self.file.tell()
+        data = numpy.memmap(self.file, dtype=dtype, mode='c', offset=offset,
+                            shape=shape, order=order)
+        self.file.seek(offset + data.nbytes)
+        return data
+
     def read_recordmark(self):
         """ Returns value of next recordmark. """
         fmt = '>' if self.big_endian else '<'
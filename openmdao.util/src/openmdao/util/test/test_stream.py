@@ -569,6 +569,56 @@ class TestCase(unittest.TestCase):
             new_data = stream.read_floats((5, 2), order='Fortran')
         numpy.testing.assert_array_equal(new_data, arr2d)
 
+    def test_map_floats(self):
+        logging.debug('')
+        logging.debug('test_map_floats')
+
+        data = numpy.arange(10, dtype=numpy.float64)
+        arr2d = data.reshape((5, 2))
+
+        # Big-endian, column-major, followed by more data.
+        with open(self.filename, 'wb') as out:
+            stream = Stream(out, binary=True, big_endian=True)
+            stream.write_floats(arr2d, order='Fortran')
+            stream.write_int(42)
+        with open(self.filename, 'rb') as inp:
+            stream = Stream(inp, binary=True, big_endian=True)
+            new_data = stream.map_floats((5, 2), order='Fortran')
+            self.assertTrue(isinstance(new_data, numpy.memmap))
+            self.assertEqual(stream.read_int(), 42)
+        numpy.testing.assert_array_equal(new_data, arr2d)
+
+        # Changes to the array aren't written to the file.
+        new_data += 1.
+        numpy.testing.assert_array_equal(new_data, arr2d+1.)
+        with open(self.filename, 'rb') as inp:
+            stream = Stream(inp, binary=True, big_endian=True)
+            numpy.testing.assert_array_equal(
+                stream.read_floats((5, 2), order='Fortran'), arr2d)
+
+        # Single precision unformatted record.
+        with open(self.filename, 'wb') as out:
+            stream = Stream(out, binary=True, single_precision=True,
+                            unformatted=True)
+            stream.write_floats(data, full_record=True)
+        with open(self.filename, 'rb') as inp:
+            stream = Stream(inp, binary=True, single_precision=True,
+                            unformatted=True)
+            reclen = stream.read_recordmark()
+            new_data = stream.map_floats(len(data))
+            self.assertEqual(stream.read_recordmark(), reclen)
+        numpy.testing.assert_array_equal(new_data, data)
+
+        # Text.
+        with open(self.filename, 'w') as out:
+            stream = Stream(out)
+            stream.write_floats(data)
+        with open(self.filename, 'r') as inp:
+            stream = Stream(inp)
+            assert_raises(self, 'stream.map_floats(len(data))',
+                          globals(), locals(), RuntimeError,
+                          'memory mapping requires binary data')
+
     def test_misc(self):
         logging.debug('')
         logging.debug('test_misc')